@@ -3,9 +3,8 @@
 import time
 import pandas as pd
 import utils.common
-import utils.async_utils
 from utils.logging import logger
-from utils.byte_genie import ByteGenie
+from utils.byte_genie import ByteGenie, ByteGenieResponses
 
 # ## init byte-genie
 
@@ -74,17 +73,23 @@ df_document_urls.to_csv(f"/tmp/document-urls_cement-companies.csv", index=False)
 # ## Extract document info for downloaded documents
 
 # ### make api calls
-tasks = [
-    bg_async.async_extract_doc_info(
-        doc_name=doc_name
-    )
-    for doc_name in doc_names
-]
-doc_info_responses = utils.async_utils.run_async_tasks(tasks)
+doc_info_results = bg_async.map(
+    'extract_doc_info',
+    [{'doc_name': doc_name} for doc_name in doc_names],
+    concurrency=16,
+)
+
+# ### check failed calls
+"""
+`doc_info_results.get_failure_report()` lists inputs whose calls failed, with their errors,
+and `doc_info_results.get_retry_kwargs()` returns the inputs worth retrying (e.g. after timeouts),
+which can be passed to `bg_async.map()` again.
+"""
+logger.info(f"{len(doc_info_results.get_failure_report())} failed calls for document info")
 
 # ### Retrieve output from API responses
-df_doc_info = [resp.get_output() for resp in doc_info_responses]
-df_doc_info = [pd.DataFrame(df) for df in df_doc_info]
+df_doc_info = doc_info_results.get_output()
+df_doc_info = [pd.DataFrame(df) for df in df_doc_info if df is not None]
 df_doc_info = pd.concat(df_doc_info)
 
 # ### check available output
@@ -124,14 +129,11 @@ df_doc_info = pd.read_csv(tmp_file)
 doc_years = df_doc_info['doc_year'].unique().tolist()
 
 # ### convert years to numeric
-tasks = [
-    bg_sync.async_extract_text_years(
-        text=str(yr)
-    )
-    for yr in doc_years
-]
-extract_year_responses = utils.async_utils.run_async_tasks(tasks)
-df_years_num = [pd.DataFrame(resp.get_output()) for resp in extract_year_responses]
+extract_year_results = bg_sync.map(
+    'extract_text_years',
+    [{'text': str(yr)} for yr in doc_years],
+)
+df_years_num = [pd.DataFrame(df) for df in extract_year_results.get_output() if df is not None]
 df_years_num = pd.concat(df_years_num)
 """
 Sample of numeric years, `df_years_num.to_dict('records')`
@@ -326,8 +328,6 @@ This will allow us to only filter out the most relevant portions of each documen
 """
 
 responses = []
-output_files = []
-missing_files = []
 ## loop over every document
 for doc_num, doc_name in enumerate(doc_names):
     ## loop over types of keyphrases (quantitative or qualitative)
@@ -345,14 +345,12 @@ for doc_num, doc_name in enumerate(doc_names):
                 frac_rows_to_keep=frac_rows_to_keep,
             )
             responses = responses + [resp]
-            ## if output file exists
-            if resp.check_output_file_exists():
-                ## add output file to output_files
-                output_files = output_files + [resp.get_output_file()]
-            ## if output file does not exist
-            else:
-                ## add output file to missing_files
-                missing_files = missing_files + [resp.get_output_file()]
+
+## check output files of all responses at once, packing many files per api request
+outputs_ready = ByteGenieResponses(responses=responses).wait_for_outputs(wait_time_max=0)
+## split output files into available and missing files
+output_files = [resp.get_output_file() for resp, ready in zip(responses, outputs_ready) if ready]
+missing_files = [resp.get_output_file() for resp, ready in zip(responses, outputs_ready) if not ready]
 
 # ### check available output files for ranked data
 logger.info(f"{len(output_files)} available output files for ranked data")
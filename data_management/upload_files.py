@@ -1,7 +1,5 @@
 # # Upload local files
 
-import os
-import base64
 import pandas as pd
 from utils.byte_genie import ByteGenie
 
@@ -33,31 +31,21 @@ while the rest of the code can continue doing other things.
 # ## Specify the directory containing files to upload
 directory = r'/tmp/sample-files'
 
-# ## Get all file names in the directory
-file_names = os.listdir(directory)
-
-# Generate the fileContents and names arrays
-contents = []
-filenames = []
-
-for file_name in file_names:
-    file_path = os.path.join(directory, file_name)
-    with open(file_path, 'rb') as file:
-        content = file.read()
-        data = base64.b64encode(content)
-        data_with_prefix = "data:;base64," + data.decode('utf-8')
-        contents.append(data_with_prefix)
-        filenames.append(file_name)
-
 # ## upload files
-resp = bg_sync.upload_data(
-    contents=contents,
-    filenames=filenames,
-    username=bg_sync.read_username()
+"""
+`upload_files()` streams file contents from disk while uploading them, so memory use stays bounded, 
+even for large files; files are split into batches of up to `max_batch_size` bytes (and `max_batch_files` files), 
+and up to `max_workers` batches are uploaded concurrently.
+"""
+resps = bg_sync.upload_files(
+    directory=directory,
+    username=bg_sync.read_username(),
+    max_batch_size=64 * 1024 ** 2,
+    max_workers=4,
 )
 
-# ## check resp
-resp.get_status()
+# ## check responses (one per batch)
+[resp.get_status() for resp in resps]
 
 # ## check your uploads
 
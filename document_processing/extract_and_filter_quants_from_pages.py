@@ -18,7 +18,7 @@ import uuid
 import numpy as np
 import pandas as pd
 import utils.common
-import utils.async_utils
+import utils.path_utils
 from utils.logging import logger
 from utils.byte_genie import ByteGenie
 
@@ -129,23 +129,24 @@ df_filtered_pages = pd.DataFrame(df_filtered_pages)
 Now that we have the page data files for all the pages of interest, we can extract and structure all the quants 
 from these pages, and finally filter the ones most relevant to the KPIs of interest.
 """
-structured_quants_responses = []
-for doc_num, doc_name in enumerate(doc_names):
-    logger.info(f"structuring quants for {doc_num}/{len(doc_names)}: {doc_name}")
-    tasks = [
-        bg_async.async_structure_page_quants(
+logger.info(f"structuring quants for {len(doc_names)} documents")
+## structure quants for all documents concurrently, with at most 8 calls at a time, to avoid rate limit errors
+structured_quants_results = bg_async.map(
+    'structure_page_quants',
+    [
+        dict(
             doc_name=doc_name,
             page_numbers=df_filtered_pages[
                 (df_filtered_pages['doc_name'] == doc_name) &
                 (df_filtered_pages['page_rank'] <= 2)
                 ]['pagenum'].unique().tolist()
         )
-    ]
-    structured_quants_responses_ = utils.async_utils.run_async_tasks(tasks)
-    structured_quants_responses = structured_quants_responses + structured_quants_responses_
-    # ## wait a little to avoid rate limit errors
-    # time.sleep(15)
-structured_quants_files = [resp.get_output() for resp in structured_quants_responses]
+        for doc_name in doc_names
+    ],
+    concurrency=8,
+)
+logger.info(f"{len(structured_quants_results.get_failure_report())} failed calls to structure quants")
+structured_quants_files = structured_quants_results.get_output()
 # missing_structured_quants_docnames = [doc_names[file_num] for file_num, file in enumerate(structured_quants_files) if file is None]
 structured_quants_files = [file for file in structured_quants_files if file is not None]
 """
@@ -171,18 +172,10 @@ Number of structured page quants files across all documents, `len(structured_qua
 df_structured_quants_files = pd.DataFrame()
 ## store quant files in the df
 df_structured_quants_files['file'] = structured_quants_files
-## add doc_name
-df_structured_quants_files['doc_name'] = [
-    file.split('entity=')[-1].split('/')[0]
-    for file in df_structured_quants_files['file']
-]
-## add page number
-df_structured_quants_files['pagenum'] = [
-    os.path.splitext(file)[0].split('_pagenum-')[-1].split('_')[0]
-    for file in df_structured_quants_files['file']
-]
-## convert pagenum to int
-df_structured_quants_files['pagenum'] = [int(p) for p in df_structured_quants_files['pagenum']]
+## parse doc_name and page number from file paths
+df_file_fields = utils.path_utils.parse_paths(df_structured_quants_files['file'])
+df_structured_quants_files['doc_name'] = df_file_fields['entity']
+df_structured_quants_files['pagenum'] = df_file_fields['pagenum'].astype(int)
 ## merge df_structured_quants_files with df_filtered_pages
 df_filtered_pages = pd.merge(
     left=df_filtered_pages,
@@ -210,16 +203,12 @@ These quant files aim to extract all the quants from the page,
 and will give us all the quants available on a page in a structured from.
 """
 
-tasks = [
-    bg_sync.async_read_file(
-        file=file,
-        add_file=1,
-    )
-    for file in structured_quants_files[:10]
-]
-df_structured_quants_sample = utils.async_utils.run_async_tasks(tasks)
-df_structured_quants_sample = [resp.get_output() for resp in df_structured_quants_sample]
-df_structured_quants_sample = [pd.DataFrame(df) for df in df_structured_quants_sample]
+df_structured_quants_sample = bg_sync.map(
+    'read_file',
+    [{'file': file, 'add_file': 1} for file in structured_quants_files[:10]],
+)
+df_structured_quants_sample = df_structured_quants_sample.get_output()
+df_structured_quants_sample = [pd.DataFrame(df) for df in df_structured_quants_sample if df is not None]
 df_structured_quants_sample = pd.concat(df_structured_quants_sample)
 ## filter over rows with non-empty values
 df_structured_quants_sample = df_structured_quants_sample[df_structured_quants_sample['value'] != '']
@@ -255,11 +244,12 @@ Now that we have all the quants extracted and structured from the most relevant
 we can do one more layer of ranking to rank quants by relevance to our KPIs.
 """
 ## identify the relevant quant files for each kpi, so we can rank them according to that kpi
-quants_ranking_responses = []
-for kpi_num, kpi in enumerate(kpis):
-    logger.info(f"Ranking quants for ({kpi_num}/{len(kpis)}): {kpi}")
-    tasks = [
-        bg_async.async_rank_data(
+logger.info(f"Ranking quants for {len(kpis)} kpis")
+## rank quants for all kpis concurrently, with at most 4 calls at a time, to avoid rate limit errors
+quants_ranking_results = bg_async.map(
+    'rank_data',
+    [
+        dict(
             attr=kpi,
             files=df_filtered_pages[
                 (df_filtered_pages['query'] == kpi) &
@@ -269,13 +259,13 @@ for kpi_num, kpi in enumerate(kpis):
             non_null_cols=['value'],
             cols_not_use=['context', 'relevant quote from text', 'pagenum', 'doc_name'],
         )
-    ]
-    quants_ranking_responses_ = utils.async_utils.run_async_tasks(tasks)
-    quants_ranking_responses = quants_ranking_responses + quants_ranking_responses_
-    # ## wait for some time to avoid rate limit errors
-    # time.sleep(2 * 60)
+        for kpi in kpis
+    ],
+    concurrency=4,
+)
+logger.info(f"{len(quants_ranking_results.get_failure_report())} failed calls to rank quants")
 ## get ranked quant files
-quants_ranking_files = [resp.get_output() for resp in quants_ranking_responses]
+quants_ranking_files = quants_ranking_results.get_output()
 quants_ranking_files = [file for file in quants_ranking_files if file is not None]
 ## flatten quants_ranking_files
 quants_ranking_files = [file for files in quants_ranking_files for file in files]
@@ -296,25 +286,21 @@ First 5 ranked quants files, `quants_ranking_files[:5]`
 """
 Let's read a few ranked quants files, to understand the data format
 """
-tasks = [
-    bg_sync.async_read_files(
-        files=quants_ranking_files,
-        add_file=1
-    )
-]
-df_quants_ranked = utils.async_utils.run_async_tasks(tasks)
-df_quants_ranked = [resp.get_output() for resp in df_quants_ranked]
-df_quants_ranked = [pd.DataFrame(df) for df in df_quants_ranked]
-df_quants_ranked = pd.concat(df_quants_ranked)
-## keep only relevant cols
+## relevant cols to keep
 cols = ['row_id', 'company name', 'category', 'value', 'variable', 'unit', 'date', 'variable description',
         'score', 'relevant quote from text', 'context', 'pagenum', 'doc_name', 'file']
-df_quants_ranked = df_quants_ranked[[col for col in df_quants_ranked.columns if col in cols]]
+## read ranked quant files into one dataframe, decoding responses as they arrive
+## (with frame_workers > 0, responses are decoded in worker processes, which needs an `if __name__ == '__main__':` guard)
+df_quants_ranked, failed_reads = bg_sync.read_files_frame(
+    files=quants_ranking_files,
+    add_file=1,
+    columns=cols,
+    return_failures=1,
+)
+logger.info(f"{len(failed_reads)} ranked quants files could not be read")
 df_quants_ranked = df_quants_ranked.drop_duplicates().reset_index(drop=True)
 ## get KPI
-df_quants_ranked['kpi'] = [
-    os.path.splitext(file)[0].split('_query-')[-1] for file in df_quants_ranked['file']
-]
+df_quants_ranked['kpi'] = utils.path_utils.parse_paths(df_quants_ranked['file'])['query'].values
 ## sort data by rank
 df_quants_ranked = df_quants_ranked.sort_values(['kpi', 'score'], ascending=False).reset_index(drop=True)
 ## filter over rows with non-empty values
@@ -17,7 +17,6 @@ import uuid
 import numpy as np
 import pandas as pd
 import utils.common
-import utils.async_utils
 from utils.logging import logger
 from utils.byte_genie import ByteGenie
 
@@ -132,9 +131,8 @@ qual_kpis = ['anti-corruption policies', 'anti-bribery policies']
 """
 Since, both KPIs are quite similar, we will summarise each page that is relevant to either KPI, both both KPIs.
 """
-text_summary_responses = []
-for doc_num, doc_name in enumerate(doc_names):
-    logger.info(f"Summarising pages for ({doc_num}/{len(doc_names)}): {doc_name}")
+text_summary_kwargs = []
+for doc_name in doc_names:
     ## get top 2 page numbers for the document that are most relevant to these KPIs
     page_numbers = df_filtered_pages[
         (df_filtered_pages['doc_name'] == doc_name) &
@@ -145,23 +143,19 @@ for doc_num, doc_name in enumerate(doc_names):
     if len(page_numbers) <= 0:
         logger.info(f'No pages in the document, {doc_name}, that are ranked in top 2 for {qual_kpis}')
         continue
-    ## define tasks
-    tasks = [
-        bg_async.async_summarise_pages(
-            doc_name=doc_name,
-            page_numbers=page_numbers,
-            summary_type='summarise by topics',
-            summary_topics=qual_kpis,
-        )
-    ]
-    ## run tasks
-    text_summary_responses_ = utils.async_utils.run_async_tasks(tasks)
-    text_summary_responses = text_summary_responses + text_summary_responses_
-    # ## wait for some time to avoid rate limit errors
-    # time.sleep(2 * 60)
+    text_summary_kwargs.append(dict(
+        doc_name=doc_name,
+        page_numbers=page_numbers,
+        summary_type='summarise by topics',
+        summary_topics=qual_kpis,
+    ))
+## summarise pages of all documents, with at most 4 calls at a time, to avoid rate limit errors
+logger.info(f"Summarising pages for {len(text_summary_kwargs)} documents")
+text_summary_results = bg_async.map('summarise_pages', text_summary_kwargs, concurrency=4)
+logger.info(f"{len(text_summary_results.get_failure_report())} failed calls to summarise pages")
 
 # ### Read text summary output
-text_summary_files = [resp.get_output() for resp in text_summary_responses]
+text_summary_files = text_summary_results.get_output()
 text_summary_files = [file for file in text_summary_files if file is not None]
 """
 Number of documents with text summary files, `len(text_summary_files)`: 43
@@ -179,15 +173,17 @@ Total number of text summary files: `len(text_summary_files)`: 103
 """
 
 # ### Read text summary files
-tasks = [
-    bg_sync.async_read_files(
-        files=text_summary_files,
-        add_file=1,
-    )
-]
-df_text_summary = utils.async_utils.run_async_tasks(tasks)
-df_text_summary = [resp.get_output() for resp in df_text_summary]
-df_text_summary = [pd.DataFrame(df) for df in df_text_summary]
+df_text_summary = bg_sync.map(
+    'read_files',
+    [
+        dict(
+            files=text_summary_files,
+            add_file=1,
+        )
+    ],
+)
+df_text_summary = df_text_summary.get_output()
+df_text_summary = [pd.DataFrame(df) for df in df_text_summary if df is not None]
 df_text_summary = pd.concat(df_text_summary)
 ## drop rows with empty summary
 df_text_summary = df_text_summary[df_text_summary['summary'] != ''].reset_index(drop=True)
@@ -229,11 +225,12 @@ A sample of df_text_summary_files, `df_text_summary[['doc_org_std', 'topic', 'su
 """
 
 # ### Rank text summaries by relevance to KPIs
-text_ranking_responses = []
-for kpi_num, kpi in enumerate(qual_kpis):
-    logger.info(f"Ranking text for ({kpi_num}/{len(qual_kpis)}): {kpi}")
-    tasks = [
-        bg_async.async_rank_data(
+logger.info(f"Ranking text for {len(qual_kpis)} kpis")
+## rank text for all kpis, with at most 2 calls at a time, to avoid rate limit errors
+text_ranking_results = bg_async.map(
+    'rank_data',
+    [
+        dict(
             attr=kpi,
             files=text_summary_files,
             method='llm-ranking',
@@ -241,13 +238,13 @@ for kpi_num, kpi in enumerate(qual_kpis):
             cols_to_use=['summary', 'relevant quote from text'],
             cols_not_use=['topic', 'context'],
         )
-    ]
-    text_ranking_responses_ = utils.async_utils.run_async_tasks(tasks)
-    text_ranking_responses = text_ranking_responses + text_ranking_responses_
-    # ## wait for some time to avoid rate limit errors
-    # time.sleep(15 * 60)
+        for kpi in qual_kpis
+    ],
+    concurrency=2,
+)
+logger.info(f"{len(text_ranking_results.get_failure_report())} failed calls to rank text")
 ## get ranked quant files
-text_ranking_files = [resp.get_output() for resp in text_ranking_responses]
+text_ranking_files = text_ranking_results.get_output()
 text_ranking_files = [file for file in text_ranking_files if file is not None]
 ## flatten text_ranking_files
 text_ranking_files = [file for files in text_ranking_files for file in files]
@@ -267,15 +264,17 @@ First 5 ranked text files, `text_ranking_files[:5]`
 
 
 # ### Read ranked text files
-tasks = [
-    bg_sync.async_read_files(
-        files=text_ranking_files,
-        add_file=1,
-    )
-]
-df_text_ranked = utils.async_utils.run_async_tasks(tasks)
-df_text_ranked = [resp.get_output() for resp in df_text_ranked]
-df_text_ranked = [pd.DataFrame(df) for df in df_text_ranked]
+df_text_ranked = bg_sync.map(
+    'read_files',
+    [
+        dict(
+            files=text_ranking_files,
+            add_file=1,
+        )
+    ],
+)
+df_text_ranked = df_text_ranked.get_output()
+df_text_ranked = [pd.DataFrame(df) for df in df_text_ranked if df is not None]
 df_text_ranked = pd.concat(df_text_ranked)
 """
 Number of rows in df_text_ranked, `len(df_text_ranked)`: 359
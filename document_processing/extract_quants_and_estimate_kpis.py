@@ -19,7 +19,6 @@ import uuid
 import numpy as np
 import pandas as pd
 import utils.common
-import utils.async_utils
 from utils.logging import logger
 from utils.byte_genie import ByteGenie
 
@@ -146,23 +145,24 @@ df_filtered_pages = pd.DataFrame(df_filtered_pages)
 Now that we have the page data files for all the pages of interest, we can extract and structure all the quants 
 from these pages, and finally filter the ones most relevant to the KPIs of interest.
 """
-structured_quants_responses = []
-for doc_num, doc_name in enumerate(doc_names):
-    logger.info(f"structuring quants for {doc_num}/{len(doc_names)}: {doc_name}")
-    tasks = [
-        bg_async.async_structure_page_quants(
+logger.info(f"structuring quants for {len(doc_names)} documents")
+## structure quants for all documents, with at most 4 calls at a time, to avoid rate limit errors
+structured_quants_results = bg_async.map(
+    'structure_page_quants',
+    [
+        dict(
             doc_name=doc_name,
             page_numbers=df_filtered_pages[
                 (df_filtered_pages['doc_name'] == doc_name) &
                 (df_filtered_pages['page_rank'] <= page_rank_threshold)
                 ]['pagenum'].unique().tolist()
         )
-    ]
-    structured_quants_responses_ = utils.async_utils.run_async_tasks(tasks)
-    structured_quants_responses = structured_quants_responses + structured_quants_responses_
-    # ## wait a little to avoid rate limit errors
-    # time.sleep(15)
-structured_quants_files = [resp.get_output() for resp in structured_quants_responses]
+        for doc_name in doc_names
+    ],
+    concurrency=4,
+)
+logger.info(f"{len(structured_quants_results.get_failure_report())} failed calls to structure quants")
+structured_quants_files = structured_quants_results.get_output()
 # missing_structured_quants_docnames = [doc_names[file_num] for file_num, file in enumerate(structured_quants_files) if file is None]
 structured_quants_files = [file for file in structured_quants_files if file is not None]
 """
@@ -227,16 +227,12 @@ These quant files aim to extract all the quants from the page,
 and will give us all the quants available on a page in a structured from.
 """
 
-tasks = [
-    bg_sync.async_read_file(
-        file=file,
-        add_file=1,
-    )
-    for file in structured_quants_files[:10]
-]
-df_structured_quants_sample = utils.async_utils.run_async_tasks(tasks)
-df_structured_quants_sample = [resp.get_output() for resp in df_structured_quants_sample]
-df_structured_quants_sample = [pd.DataFrame(df) for df in df_structured_quants_sample]
+df_structured_quants_sample = bg_sync.map(
+    'read_file',
+    [{'file': file, 'add_file': 1} for file in structured_quants_files[:10]],
+)
+df_structured_quants_sample = df_structured_quants_sample.get_output()
+df_structured_quants_sample = [pd.DataFrame(df) for df in df_structured_quants_sample if df is not None]
 df_structured_quants_sample = pd.concat(df_structured_quants_sample)
 ## filter over rows with non-empty values
 df_structured_quants_sample = df_structured_quants_sample[df_structured_quants_sample['value'] != '']
@@ -295,9 +291,8 @@ and remove the values from our data that are not needed for estimating our KPIs.
 """
 To avoid rate limit errors, we will trigger value estimation for one document at a time
 """
-value_estimation_responses = []
-for doc_num, doc_name in enumerate(doc_names):
-    logger.info(f"Running value estimation for ({doc_num}/{len(doc_names)}): {doc_name}")
+value_estimation_kwargs = []
+for doc_name in doc_names:
     ## structured quant files for the document
     quant_files = df_filtered_pages[
         (df_filtered_pages['doc_name'] == doc_name) &
@@ -305,9 +300,8 @@ for doc_num, doc_name in enumerate(doc_names):
         ]['file_quants'].unique().tolist()
     if len(quant_files) <= 0:
         logger.info(f"No files ranked in top {page_rank_threshold} in this document")
-    ## define tasks
-    tasks = [
-        bg_async.async_estimate_values(
+    value_estimation_kwargs = value_estimation_kwargs + [
+        dict(
             files=[quant_file],
             metrics_to_estimate=df_filtered_pages[
                 (df_filtered_pages['file_quants'] == quant_file) &
@@ -327,14 +321,13 @@ for doc_num, doc_name in enumerate(doc_names):
         )
         for quant_file in quant_files
     ]
-    ## run tasks
-    value_estimation_responses_ = utils.async_utils.run_async_tasks(tasks)
-    value_estimation_responses = value_estimation_responses + value_estimation_responses_
-    # ## wait for 30 sec for each file to avoid rate limits
-    # time.sleep(len(quant_files) * 15)
+## estimate values for all files, with at most 4 calls at a time, to avoid rate limit errors
+logger.info(f"Running value estimation for {len(value_estimation_kwargs)} files")
+value_estimation_results = bg_async.map('estimate_values', value_estimation_kwargs, concurrency=4)
+logger.info(f"{len(value_estimation_results.get_failure_report())} failed calls to estimate values")
 
 # ### Get estimated value files
-value_estimation_files = [resp.get_output() for resp in value_estimation_responses]
+value_estimation_files = value_estimation_results.get_output()
 value_estimation_files = [file for file in value_estimation_files if file is not None]
 ## flatten files
 value_estimation_files = [file for files in value_estimation_files for file in files]
@@ -351,15 +344,17 @@ First 5 estimated value files, `value_estimation_files[:5]`
 """
 
 # ### Read estimated value files
-tasks = [
-    bg_sync.async_read_files(
-        files=value_estimation_files,
-        add_file=1
-    )
-]
-df_estimated_kpi = utils.async_utils.run_async_tasks(tasks)
-df_estimated_kpi = [resp.get_output() for resp in df_estimated_kpi]
-df_estimated_kpi = [pd.DataFrame(df) for df in df_estimated_kpi]
+df_estimated_kpi = bg_sync.map(
+    'read_files',
+    [
+        dict(
+            files=value_estimation_files,
+            add_file=1
+        )
+    ],
+)
+df_estimated_kpi = df_estimated_kpi.get_output()
+df_estimated_kpi = [pd.DataFrame(df) for df in df_estimated_kpi if df is not None]
 df_estimated_kpi = pd.concat(df_estimated_kpi)
 ## keep only relevant columns
 cols_to_keep = [
@@ -543,20 +538,21 @@ df_estimated_kpi['full_description'] = [
     for row_num, row in list(df_estimated_kpi[['quantity name', 'quantity description']].iterrows())
 ]
 
-## define tasks
-tasks = [
-    bg_async.async_classify_texts(
-        texts=df_estimated_kpi['full_description'].unique().tolist(),
-        labels=kpis,
-        multi_class=0
-    )
-]
-## run tasks
-df_name_std = utils.async_utils.run_async_tasks(tasks)
+## classify texts
+df_name_std = bg_async.map(
+    'classify_texts',
+    [
+        dict(
+            texts=df_estimated_kpi['full_description'].unique().tolist(),
+            labels=kpis,
+            multi_class=0
+        )
+    ],
+)
 ## get output
-df_name_std = [resp.get_output() for resp in df_name_std]
+df_name_std = df_name_std.get_output()
 ## convert to dataframe
-df_name_std = [pd.DataFrame(df) for df in df_name_std]
+df_name_std = [pd.DataFrame(df) for df in df_name_std if df is not None]
 ## concatenate all dataframes
 df_name_std = pd.concat(df_name_std)
 ## filter over labels with max score
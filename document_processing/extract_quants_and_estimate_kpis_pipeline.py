@@ -16,7 +16,6 @@ import uuid
 import numpy as np
 import pandas as pd
 import utils.common
-import utils.async_utils
 from utils.logging import logger
 from utils.byte_genie import ByteGenie
 
@@ -81,17 +80,20 @@ file_rank_max = 3
 
 # <h2> Estimate KPI values </h2>
 
-tasks = [
-    bg_async.async_structure_quants_pipeline(
-        doc_name=doc_name,
-        keyphrases=keyphrases,
-        file_rank_max=file_rank_max,
-        attrs_to_estimate=attrs_to_estimate,
-    )
-    for doc_name in doc_names
-]
-structure_quants_responses = utils.async_utils.run_async_tasks(tasks)
-structured_quants = [resp.get_output(refresh=1) for resp in structure_quants_responses]
+structure_quants_results = bg_async.map(
+    'structure_quants_pipeline',
+    [
+        dict(
+            doc_name=doc_name,
+            keyphrases=keyphrases,
+            file_rank_max=file_rank_max,
+            attrs_to_estimate=attrs_to_estimate,
+        )
+        for doc_name in doc_names
+    ],
+)
+logger.info(f"{len(structure_quants_results.get_failure_report())} failed calls to structure quants")
+structured_quants = [resp.get_output(refresh=1) for resp in structure_quants_results.get_responses()]
 
 
 # <h2> Check structured_quants </h2>
@@ -49,15 +49,19 @@ df_contents = utils.common.read_file_contents(directory=pdf_folder)
 
 # ### upload files
 start_time = time.time()
-tasks = [
-    bg_async.async_upload_data(
-        contents=[df_contents['content'].tolist()[i]],
-        filenames=[df_contents['filename'].tolist()[i]],
-        username=bg_sync.read_username(),
-    )
-    for i in range(0, len(df_contents), 1)
-]
-upload_responses = utils.async_utils.run_async_tasks(tasks)
+upload_results = bg_async.map(
+    'upload_data',
+    [
+        dict(
+            contents=[df_contents['content'].tolist()[i]],
+            filenames=[df_contents['filename'].tolist()[i]],
+            username=bg_sync.read_username(),
+        )
+        for i in range(0, len(df_contents), 1)
+    ],
+)
+logger.info(f"{len(upload_results.get_failure_report())} failed uploads")
+upload_responses = upload_results.get_responses()
 end_time = time.time()
 logger.info(
     f"Time taken to upload {len(upload_responses)} documents: "
@@ -174,28 +178,28 @@ doc_names = [
 
 # ### extract page images from documents
 img_extraction_start_time = time.time()  # 1695212673.5361311
-tasks = [
-    bg_async.async_write_pdf_img(
-        doc_name=doc_name
-    )
-    for doc_num, doc_name in enumerate(doc_names)
-]
-write_img_responses = utils.async_utils.run_async_tasks(tasks)
+write_img_results = bg_async.map(
+    'write_pdf_img',
+    [{'doc_name': doc_name} for doc_name in doc_names],
+)
+logger.info(f"{len(write_img_results.get_failure_report())} failed calls to extract page images")
 """
 ocr_start_time
 1695410621.57586
 """
 
 # ### list extracted page images
-tasks = [
-    bg_sync.async_list_doc_files(
-        doc_name=doc_name,
-        file_pattern=f"*.png",
-        timeout=15 * 60,
-    )
-    for doc_num, doc_name in enumerate(doc_names)
-]
-img_files = utils.async_utils.run_async_tasks(tasks)
+img_files = bg_sync.map(
+    'list_doc_files',
+    [
+        dict(
+            doc_name=doc_name,
+            file_pattern=f"*.png",
+            timeout=15 * 60,
+        )
+        for doc_name in doc_names
+    ],
+)
 
 # ### check img files
 logger.info(f"{len(img_files[0].get_data())} img files found for {doc_names[0]}")
@@ -217,15 +221,17 @@ for doc_num, doc_name in enumerate(doc_names):
     responses = responses + [resp]
 
 # ### list OCR output files for text
-tasks = [
-    bg_sync.async_list_doc_files(
-        doc_name=doc_name,
-        file_pattern="data_type=semi-structured/**/variable_desc=text-blocks/**.csv"
-    )
-    for doc_name in doc_names
-]
-ocr_text_files = utils.async_utils.run_async_tasks(tasks)
-ocr_text_files = [resp.get_output() for resp in ocr_text_files if resp.get_output() is not None]
+ocr_text_files = bg_sync.map(
+    'list_doc_files',
+    [
+        dict(
+            doc_name=doc_name,
+            file_pattern="data_type=semi-structured/**/variable_desc=text-blocks/**.csv"
+        )
+        for doc_name in doc_names
+    ],
+)
+ocr_text_files = [files for files in ocr_text_files.get_output() if files is not None]
 """
 Number of documents with OCR text files, `len(ocr_text_files)`: 49
 Number of OCR text files for one document, `len(ocr_text_files[0])`: 8
@@ -241,15 +247,17 @@ Extracted text files contain page number from which the text was extracted, so t
 """
 
 # ### list OCR output files for tables
-tasks = [
-    bg_sync.async_list_doc_files(
-        doc_name=doc_name,
-        file_pattern="data_type=semi-structured/**variable_desc=table-cells/**.csv"
-    )
-    for doc_name in doc_names
-]
-ocr_table_files = utils.async_utils.run_async_tasks(tasks)
-ocr_table_files = [resp.get_output() for resp in ocr_table_files if resp.get_output() is not None]
+ocr_table_files = bg_sync.map(
+    'list_doc_files',
+    [
+        dict(
+            doc_name=doc_name,
+            file_pattern="data_type=semi-structured/**variable_desc=table-cells/**.csv"
+        )
+        for doc_name in doc_names
+    ],
+)
+ocr_table_files = [files for files in ocr_table_files.get_output() if files is not None]
 """
 Number of documents with OCR table output files, len(ocr_table_files): 48
 Number of OCR table files for one document, len(ocr_table_files[5]): 24
@@ -306,15 +314,17 @@ for doc_num, doc_name in enumerate(doc_names):
     segment_text_responses = segment_text_responses + [segment_text_resp]
 
 # ### list segment_text output
-tasks = [
-    bg_sync.async_list_doc_files(
-        doc_name=doc_name,
-        file_pattern="data_type=semi-structured/**/variable_desc=text-segments/**.csv"
-    )
-    for doc_name in doc_names
-]
-text_segment_files = utils.async_utils.run_async_tasks(tasks)
-text_segment_files = [resp.get_data() for resp in text_segment_files if resp.get_data() is not None]
+text_segment_files = bg_sync.map(
+    'list_doc_files',
+    [
+        dict(
+            doc_name=doc_name,
+            file_pattern="data_type=semi-structured/**/variable_desc=text-segments/**.csv"
+        )
+        for doc_name in doc_names
+    ],
+)
+text_segment_files = [resp.get_data() for resp in text_segment_files.get_responses() if resp.get_data() is not None]
 """
 Number of documents with text segment files available, len(text_segment_files): 45
 First 5 text segment files for first document, text_segment_files[0][:5]
@@ -337,12 +347,11 @@ len(text_segment_files)
 """
 
 # ### read a few text segments files
-tasks = [
-    bg_sync.async_read_file(file)
-    for file in text_segment_files[:5]
-]
-df_text_segments = utils.async_utils.run_async_tasks(tasks)
-df_text_segments = [pd.DataFrame(resp.get_data()) for resp in df_text_segments]
+df_text_segments = bg_sync.map(
+    'read_file',
+    [{'file': file} for file in text_segment_files[:5]],
+)
+df_text_segments = [pd.DataFrame(resp.get_data()) for resp in df_text_segments.get_responses()]
 df_text_segments = pd.concat(df_text_segments)
 """
 list(df_text_segments.columns)
@@ -359,45 +368,44 @@ df_text_segments['text'].tolist()[:5]
 
 # ## Rank text and table files by relevance to KPIs
 
+# ### limit embed_doc_data calls to 10 documents every 2 minutes, to avoid rate limit errors
+bg_async.set_rate_limit(
+    func='embed_doc_data',
+    rate=10 / (2 * 60),
+    burst=10,
+)
+
 # ### embed table files
-tasks = [
-    bg_async.async_embed_doc_data(
-        doc_name=doc_name,
-        file_pattern='data_type=semi-structured/**/variable_desc=orig-table/**.csv',
-        cols_to_use=None,
-    )
-    for doc_name in doc_names
-]
-## run tasks in batches of 10 documents at a time to avoid rate limit errors
-batch_size = 10
-wait_time = 2 * 60
-doc_emb_responses = []
-for task_num, task in enumerate(tasks):
-    logger.info(f"running task: {task_num}/{len(tasks)}")
-    doc_emb_response_ = utils.async_utils.run_async_tasks([task])
-    doc_emb_responses.append(doc_emb_response_)
-    if (task_num % batch_size == 0) and (task_num > 0):
-        time.sleep(wait_time)
+## bg_async rate limits embed_doc_data calls, so we stay within the allowed rate without idling
+logger.info(f"embedding tables for {len(doc_names)} documents")
+doc_emb_results = bg_async.map(
+    'embed_doc_data',
+    [
+        dict(
+            doc_name=doc_name,
+            file_pattern='data_type=semi-structured/**/variable_desc=orig-table/**.csv',
+            cols_to_use=None,
+        )
+        for doc_name in doc_names
+    ],
+)
+logger.info(f"{len(doc_emb_results.get_failure_report())} failed calls to embed tables")
 
 # ### embed text segment files
-tasks = [
-    bg_async.async_embed_doc_data(
-        doc_name=doc_name,
-        file_pattern='data_type=semi-structured/**/variable_desc=text-segments/**.csv',
-        cols_to_use=['text'],
-    )
-    for doc_name in doc_names
-]
-## run tasks in batches of 10 documents at a time to avoid rate limit errors
-batch_size = 10
-wait_time = 2 * 60
-doc_emb_responses = []
-for task_num, task in enumerate(tasks):
-    logger.info(f"running task: {task_num}/{len(tasks)}")
-    doc_emb_response_ = utils.async_utils.run_async_tasks([task])
-    doc_emb_responses.append(doc_emb_response_)
-    if (task_num % batch_size == 0) and (task_num > 0):
-        time.sleep(wait_time)
+## bg_async rate limits embed_doc_data calls, so we stay within the allowed rate without idling
+logger.info(f"embedding text segments for {len(doc_names)} documents")
+doc_emb_results = bg_async.map(
+    'embed_doc_data',
+    [
+        dict(
+            doc_name=doc_name,
+            file_pattern='data_type=semi-structured/**/variable_desc=text-segments/**.csv',
+            cols_to_use=['text'],
+        )
+        for doc_name in doc_names
+    ],
+)
+logger.info(f"{len(doc_emb_results.get_failure_report())} failed calls to embed text segments")
 
 # ## Rank tables by relevance to keyphrases
 """
@@ -422,20 +430,21 @@ kpis = [
 ]
 
 # ### score table similarity
-for doc_num, doc_name in enumerate(doc_names):
-    logger.info(f"running similarity scoring for ({doc_num}/{len(doc_names)}): {doc_name}")
-    try:
-        tasks = [
-            bg_async.async_score_doc_text_similarity(
-                doc_name=doc_name,
-                file_pattern='data_type=embeddings/**/variable_desc=orig-table/**.csv',
-                query=query,
-            )
-            for query in kpis
-        ]
-        score_table_sim_responses = utils.async_utils.run_async_tasks(tasks)
-    except Exception as e:
-        logger.warning(f"Error running similarity scoring for: {doc_name}")
+logger.info(f"running similarity scoring for {len(doc_names)} documents")
+score_table_sim_results = bg_async.map(
+    'score_doc_text_similarity',
+    [
+        dict(
+            doc_name=doc_name,
+            file_pattern='data_type=embeddings/**/variable_desc=orig-table/**.csv',
+            query=query,
+        )
+        for doc_name in doc_names
+        for query in kpis
+    ],
+)
+for failure in score_table_sim_results.get_failure_report():
+    logger.warning(f"Error running similarity scoring for: {failure['kwargs']['doc_name']}: {failure['error']}")
 
 # ## Rank text by relevance to KPIs
 """
@@ -443,43 +452,46 @@ Once we have the text segments extracted from documents, we can rank them by rel
 """
 
 # ### score text data by similarity
-for doc_num, doc_name in enumerate(doc_names):
-    logger.info(f"running similarity scoring for ({doc_num}/{len(doc_names)}): {doc_name}")
-    try:
-        tasks = [
-            bg_async.async_score_doc_text_similarity(
-                doc_name=doc_name,
-                file_pattern='data_type=embeddings/**/variable_desc=text-segments/**.csv',
-                query=query,
-            )
-            for query in kpis
-        ]
-        score_text_sim_responses = utils.async_utils.run_async_tasks(tasks)
-    except Exception as e:
-        logger.warning(f"Error running similarity scoring for: {doc_name}")
+logger.info(f"running similarity scoring for {len(doc_names)} documents")
+score_text_sim_results = bg_async.map(
+    'score_doc_text_similarity',
+    [
+        dict(
+            doc_name=doc_name,
+            file_pattern='data_type=embeddings/**/variable_desc=text-segments/**.csv',
+            query=query,
+        )
+        for doc_name in doc_names
+        for query in kpis
+    ],
+)
+for failure in score_text_sim_results.get_failure_report():
+    logger.warning(f"Error running similarity scoring for: {failure['kwargs']['doc_name']}: {failure['error']}")
 
 # ## filter most relevant table files
 """
 Once, the tables are scored by similarity to relevant KPIs, we can filter out the most relevant table files
 """
 
-## create tasks
-tasks = [
-    bg_async.async_filter_similarity_scored_data(
-        doc_name=doc_name,
-        file_pattern='data_type=similarity/**/variable_desc=orig-table/**.csv',
-        filter_what='files',
-        groupby_cols=['query'],
-        max_rows_to_keep=5,
-        filename_sfx='filtered-tables',
-    )
-    for doc_name in doc_names
-]
-## run tasks
-filtered_table_responses = utils.async_utils.run_async_tasks(tasks)
+## filter files
+filtered_table_results = bg_async.map(
+    'filter_similarity_scored_data',
+    [
+        dict(
+            doc_name=doc_name,
+            file_pattern='data_type=similarity/**/variable_desc=orig-table/**.csv',
+            filter_what='files',
+            groupby_cols=['query'],
+            max_rows_to_keep=5,
+            filename_sfx='filtered-tables',
+        )
+        for doc_name in doc_names
+    ],
+)
+logger.info(f"{len(filtered_table_results.get_failure_report())} failed calls to filter table files")
 
 # ### get filtered table files
-filtered_table_sim_files = [resp.get_output() for resp in filtered_table_responses]
+filtered_table_sim_files = filtered_table_results.get_output()
 filtered_table_sim_files = [file for file in filtered_table_sim_files if file is not None]
 """
 Number of filtered table files, `len(filtered_table_sim_files)`: 48
@@ -500,15 +512,12 @@ we can retrieve the most similar table files for each KPI from each document.
 """
 
 # ### Read filtered table similarity files
-tasks = [
-    bg_sync.async_read_file(
-        file=file
-    )
-    for file in filtered_table_sim_files
-]
-df_filtered_table_sim_files = utils.async_utils.run_async_tasks(tasks)
-df_filtered_table_sim_files = [resp.get_output() for resp in df_filtered_table_sim_files]
-df_filtered_table_sim_files = [pd.DataFrame(df) for df in df_filtered_table_sim_files]
+df_filtered_table_sim_files = bg_sync.map(
+    'read_file',
+    [{'file': file} for file in filtered_table_sim_files],
+)
+df_filtered_table_sim_files = df_filtered_table_sim_files.get_output()
+df_filtered_table_sim_files = [pd.DataFrame(df) for df in df_filtered_table_sim_files if df is not None]
 df_filtered_table_sim_files = pd.concat(df_filtered_table_sim_files)
 ## add doc_name to df
 df_filtered_table_sim_files['doc_name'] = [
@@ -543,16 +552,18 @@ As we kept max of 5 table files in `/filter_similarity_scored_data` api call, we
 Once, we have filtered the similarity-scored files, we need to get the underlying original-table that contain the tables data. 
 We can retrieve these files using `/list_corresponding_files` endpoint.
 """
-tasks = [
-    bg_sync.async_list_corresponding_files(
-        files=df_filtered_table_sim_files['file'].unique().tolist(),
-        data_type='semi-structured',
-        variable_desc='orig-table',
-        file_format='csv',
-    )
-]
-filtered_orig_table_files = utils.async_utils.run_async_tasks(tasks)
-filtered_orig_table_files = [resp.get_output() for resp in filtered_orig_table_files]
+filtered_orig_table_files = bg_sync.map(
+    'list_corresponding_files',
+    [
+        dict(
+            files=df_filtered_table_sim_files['file'].unique().tolist(),
+            data_type='semi-structured',
+            variable_desc='orig-table',
+            file_format='csv',
+        )
+    ],
+)
+filtered_orig_table_files = [files for files in filtered_orig_table_files.get_output() if files is not None]
 ## flatten filtered_orig_table_files
 filtered_orig_table_files = [file for files in filtered_orig_table_files for file in files]
 """
@@ -589,23 +600,25 @@ df_filtered_table_sim_files.to_csv(f"/tmp/df_filtered_table_sim_files.csv", inde
 Once, the text segments are scored by similarity to relevant KPIs, we can filter out the most relevant text files
 """
 
-## create tasks
-tasks = [
-    bg_async.async_filter_similarity_scored_data(
-        doc_name=doc_name,
-        file_pattern='data_type=similarity/**/variable_desc=text-segments/**.csv',
-        filter_what='files',
-        groupby_cols=['query'],
-        max_rows_to_keep=5,
-        filename_sfx='filtered-text',
-    )
-    for doc_name in doc_names
-]
-## run tasks
-filtered_text_responses = utils.async_utils.run_async_tasks(tasks)
+## filter files
+filtered_text_results = bg_async.map(
+    'filter_similarity_scored_data',
+    [
+        dict(
+            doc_name=doc_name,
+            file_pattern='data_type=similarity/**/variable_desc=text-segments/**.csv',
+            filter_what='files',
+            groupby_cols=['query'],
+            max_rows_to_keep=5,
+            filename_sfx='filtered-text',
+        )
+        for doc_name in doc_names
+    ],
+)
+logger.info(f"{len(filtered_text_results.get_failure_report())} failed calls to filter text files")
 
 # ### get filtered text files
-filtered_text_sim_files = [resp.get_output() for resp in filtered_text_responses]
+filtered_text_sim_files = filtered_text_results.get_output()
 filtered_text_sim_files = [file for file in filtered_text_sim_files if file is not None]
 """
 Number of documents with filtered text similarity files, `len(filtered_text_sim_files)`: 49
@@ -627,15 +640,12 @@ for each of our KPIs.
 """
 
 # ### Read filtered text similarity files
-tasks = [
-    bg_sync.async_read_file(
-        file=file
-    )
-    for file in filtered_text_sim_files
-]
-df_filtered_text_sim_files = utils.async_utils.run_async_tasks(tasks)
-df_filtered_text_sim_files = [resp.get_output() for resp in df_filtered_text_sim_files]
-df_filtered_text_sim_files = [pd.DataFrame(df) for df in df_filtered_text_sim_files]
+df_filtered_text_sim_files = bg_sync.map(
+    'read_file',
+    [{'file': file} for file in filtered_text_sim_files],
+)
+df_filtered_text_sim_files = df_filtered_text_sim_files.get_output()
+df_filtered_text_sim_files = [pd.DataFrame(df) for df in df_filtered_text_sim_files if df is not None]
 df_filtered_text_sim_files = pd.concat(df_filtered_text_sim_files)
 ## add doc_name to df
 df_filtered_text_sim_files['doc_name'] = [
@@ -679,18 +689,16 @@ we will now merge the document meta-data onto filtered files, to be able to rank
 """
 
 # ### trigger doc info extraction
-tasks = [
-    bg_async.async_extract_doc_info(
-        doc_name=doc_name,
-    )
-    for doc_name in doc_names
-]
-df_doc_info = utils.async_utils.run_async_tasks(tasks)
+doc_info_results = bg_async.map(
+    'extract_doc_info',
+    [{'doc_name': doc_name} for doc_name in doc_names],
+)
+logger.info(f"{len(doc_info_results.get_failure_report())} failed calls for document info")
 
 # ### read extracted doc info
-df_doc_info = [resp.get_output() for resp in df_doc_info]
+df_doc_info = doc_info_results.get_output()
 # convert to dataframe
-df_doc_info = [pd.DataFrame(df) for df in df_doc_info]
+df_doc_info = [pd.DataFrame(df) for df in df_doc_info if df is not None]
 df_doc_info = pd.concat(df_doc_info)
 logger.info(f"length of df_doc_info: {len(df_doc_info)}")
 """
@@ -855,8 +863,8 @@ df_filtered_sim_files['pagenum'] = [
 ]
 
 # ### define page reading tasks
-tasks = [
-    bg_async.async_read_page_data(
+page_data_kwargs = [
+    dict(
         doc_name=doc_name,
         page_numbers=df_filtered_sim_files[
             (df_filtered_sim_files['doc_name'] == doc_name) &
@@ -866,8 +874,9 @@ tasks = [
     for doc_name in doc_names
 ]
 # ### run tasks
-page_data_responses = utils.async_utils.run_async_tasks(tasks)
-page_data_files = [resp.get_output() for resp in page_data_responses]
+page_data_results = bg_async.map('read_page_data', page_data_kwargs)
+logger.info(f"{len(page_data_results.get_failure_report())} failed calls to read page data")
+page_data_files = page_data_results.get_output()
 page_data_files = [files for files in page_data_files if files is not None]
 ## flatten page_data_files
 page_data_files = [file for files in page_data_files for file in files]
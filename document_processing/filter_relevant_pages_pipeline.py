@@ -14,7 +14,6 @@ import uuid
 import numpy as np
 import pandas as pd
 import utils.common
-import utils.async_utils
 from utils.logging import logger
 from utils.byte_genie import ByteGenie
 
@@ -63,16 +62,19 @@ file_rank_max = 3
 
 # <h2> Filter pages </h2>
 
-tasks = [
-    bg_async.async_filter_pages_pipeline(
-        doc_name=doc_name,
-        keyphrases=keyphrases,
-        file_rank_max=file_rank_max
-    )
-    for doc_name in doc_names
-]
-filter_pages_responses = utils.async_utils.run_async_tasks(tasks)
-filtered_pages = [resp.get_output() for resp in filter_pages_responses]
+filter_pages_results = bg_async.map(
+    'filter_pages_pipeline',
+    [
+        dict(
+            doc_name=doc_name,
+            keyphrases=keyphrases,
+            file_rank_max=file_rank_max
+        )
+        for doc_name in doc_names
+    ],
+)
+logger.info(f"{len(filter_pages_results.get_failure_report())} failed calls to filter pages")
+filtered_pages = filter_pages_results.get_output()
 
 # <h2> Check filtered_pages </h2>
 # <p> Because `filtered_pages` is the output of a pipeline, it retains output from all the steps in that pipeline.
@@ -9,7 +9,6 @@ import time
 import base64
 import pandas as pd
 from PIL import Image
-import utils.async_utils
 from utils.logging import logger
 from utils.byte_genie import ByteGenie
 
@@ -46,25 +45,25 @@ See document_processing/upload_files.py (.ipynb) or data_management/upload_files
 # ## Extract page images
 
 # ### extract page images from documents
-tasks = [
-    bg_async.async_write_pdf_img(
-        doc_name=doc_name
-    )
-    for doc_num, doc_name in enumerate(doc_names)
-]
-write_img_responses = utils.async_utils.run_async_tasks(tasks)
+write_img_results = bg_async.map(
+    'write_pdf_img',
+    [{'doc_name': doc_name} for doc_name in doc_names],
+)
+logger.info(f"{len(write_img_results.get_failure_report())} failed calls to extract page images")
 
 
 # ### list extracted page images
-tasks = [
-    bg_sync.async_list_doc_files(
-        doc_name=doc_name,
-        file_pattern=f"*.png",
-        timeout=15 * 60,
-    )
-    for doc_name in doc_names
-]
-img_files = utils.async_utils.run_async_tasks(tasks)
+img_files = bg_sync.map(
+    'list_doc_files',
+    [
+        dict(
+            doc_name=doc_name,
+            file_pattern=f"*.png",
+            timeout=15 * 60,
+        )
+        for doc_name in doc_names
+    ],
+)
 """
 image files for the last document, img_files[-1].get_data()
 [
@@ -86,15 +85,17 @@ for doc_num, doc_name in enumerate(doc_names):
     responses = responses + [resp]
 
 # ### list OCR output files for text
-tasks = [
-    bg_sync.async_list_doc_files(
-        doc_name=doc_name,
-        file_pattern="variable_desc=text-blocks/**.csv"
-    )
-    for doc_name in doc_names
-]
-ocr_text_files = utils.async_utils.run_async_tasks(tasks)
-ocr_text_files = [resp.get_data() for resp in ocr_text_files if resp.get_data() is not None]
+ocr_text_files = bg_sync.map(
+    'list_doc_files',
+    [
+        dict(
+            doc_name=doc_name,
+            file_pattern="variable_desc=text-blocks/**.csv"
+        )
+        for doc_name in doc_names
+    ],
+)
+ocr_text_files = [resp.get_data() for resp in ocr_text_files.get_responses() if resp.get_data() is not None]
 """
 Number of documents with OCR text files, len(ocr_text_files): 5
 Number of OCR text files for one document, len(ocr_text_files[-1]): 2
@@ -106,15 +107,17 @@ OCR text files for one document: ocr_text_files[-1]
 """
 
 # ### list OCR output files for tables
-tasks = [
-    bg_sync.async_list_doc_files(
-        doc_name=doc_name,
-        file_pattern="variable_desc=table-cells/**.csv"
-    )
-    for doc_name in doc_names
-]
-ocr_table_files = utils.async_utils.run_async_tasks(tasks)
-ocr_table_files = [resp.get_data() for resp in ocr_table_files if resp.get_data() is not None]
+ocr_table_files = bg_sync.map(
+    'list_doc_files',
+    [
+        dict(
+            doc_name=doc_name,
+            file_pattern="variable_desc=table-cells/**.csv"
+        )
+        for doc_name in doc_names
+    ],
+)
+ocr_table_files = [resp.get_data() for resp in ocr_table_files.get_responses() if resp.get_data() is not None]
 """
 Number of documents with OCR table output files, len(ocr_table_files): 5
 Number of OCR table files for one document, len(ocr_table_files[-1]): 2
@@ -146,15 +149,17 @@ for doc_num, doc_name in enumerate(doc_names):
     responses = responses + [resp]
 
 # ### list original table files
-tasks = [
-    bg_sync.async_list_doc_files(
-        doc_name=doc_name,
-        file_pattern='variable_desc=orig-table/**.csv',
-    )
-    for doc_name in doc_names
-]
-orig_table_files = utils.async_utils.run_async_tasks(tasks)
-orig_table_files = [resp.get_data() for resp in orig_table_files]
+orig_table_files = bg_sync.map(
+    'list_doc_files',
+    [
+        dict(
+            doc_name=doc_name,
+            file_pattern='variable_desc=orig-table/**.csv',
+        )
+        for doc_name in doc_names
+    ],
+)
+orig_table_files = [resp.get_data() for resp in orig_table_files.get_responses()]
 """
 number of documents with original table files, len(orig_table_files): 6
 original table files for one document, orig_table_files[-1]
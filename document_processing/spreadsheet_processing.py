@@ -16,7 +16,6 @@ import uuid
 import numpy as np
 import pandas as pd
 import utils.common
-import utils.async_utils
 from utils.logging import logger
 from utils.byte_genie import ByteGenie
 
@@ -71,27 +70,27 @@ document names, `doc_names`
 # from each page (sheet) in the original spreadsheet
 # </p>
 
-tasks = [
-    bg_async.async_extract_text_pipeline(
-        doc_name=doc_name,
-    )
-    for doc_name in doc_names
-]
-text_extraction_responses = utils.async_utils.run_async_tasks(tasks)
-# text_extraction_output = [resp.get_output() for resp in text_extraction_responses]
+text_extraction_results = bg_async.map(
+    'extract_text_pipeline',
+    [{'doc_name': doc_name} for doc_name in doc_names],
+)
+logger.info(f"{len(text_extraction_results.get_failure_report())} failed calls to extract text")
+# text_extraction_output = text_extraction_results.get_output()
 
 # <h2> Check original table extracted </h2>
 
 # <h3> List original table files </h3>
-tasks = [
-    bg_async.async_list_doc_files(
-        doc_name=doc_name,
-        file_pattern='data_type=semi-structured/**/variable_desc=orig-table/**.csv',
-    )
-    for doc_name in doc_names
-]
-table_files_responses = utils.async_utils.run_async_tasks(tasks=tasks)
-table_files = [resp.get_output() for resp in table_files_responses]
+table_files_results = bg_async.map(
+    'list_doc_files',
+    [
+        dict(
+            doc_name=doc_name,
+            file_pattern='data_type=semi-structured/**/variable_desc=orig-table/**.csv',
+        )
+        for doc_name in doc_names
+    ],
+)
+table_files = [files for files in table_files_results.get_output() if files is not None]
 # <p> Flatten table files <p>
 table_files = [file for files in table_files for file in files]
 """
@@ -106,13 +105,12 @@ Table files, `table_files`
 
 
 # <h3> Read table files <h3>
-tasks = [
-    bg_sync.async_read_file(file=file)
-    for file in table_files
-]
-read_table_responses = utils.async_utils.run_async_tasks(tasks)
-list_tables = [resp.get_output() for resp in read_table_responses]
-list_tables = [pd.DataFrame(df) for df in list_tables]
+read_table_results = bg_sync.map(
+    'read_file',
+    [{'file': file} for file in table_files],
+)
+list_tables = read_table_results.get_output()
+list_tables = [pd.DataFrame(df) for df in list_tables if df is not None]
 """
 Number of tables, `len(list_tables)`: 3
 Sample rows for the first table, `list_tables[0].head().values.tolist()`
@@ -141,11 +139,15 @@ Sample rows for the first table, `list_tables[0].head().values.tolist()`
 """
 
 # <h2> Re-structure tables </h2>
-tasks = [
-    bg_async.async_create_dataset(
-        file=file,
-        attrs=['site_name', 'quantity_type', 'value_type', 'value', 'unit_of_measurement', 'value_date'],
-        attrs_metadata=[{'site_name': 'Name of site or hotel or company'}],
-    )
-    for file in table_files
-]
+create_dataset_results = bg_async.map(
+    'create_dataset',
+    [
+        dict(
+            file=file,
+            attrs=['site_name', 'quantity_type', 'value_type', 'value', 'unit_of_measurement', 'value_date'],
+            attrs_metadata=[{'site_name': 'Name of site or hotel or company'}],
+        )
+        for file in table_files
+    ],
+)
+logger.info(f"{len(create_dataset_results.get_failure_report())} failed calls to re-structure tables")
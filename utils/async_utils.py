@@ -3,15 +3,172 @@ Async func helpers
 """
 
 import asyncio
+import threading
 from functools import wraps, partial
-from typing import Any, Coroutine, List
+from typing import Any, Callable, Coroutine, Dict, Iterable, List, Union
 
 
-def run_async_tasks(tasks: List[Coroutine]) -> List[Any]:
-    """Run a list of async tasks."""
-    async def _gather() -> List[Any]:
-        return await asyncio.gather(*tasks)
-    outputs: List[Any] = asyncio.run(_gather())
+class AsyncRunner:
+    """
+    Long-lived event loop, running in a background thread, to run coroutines from sync code.
+    Unlike asyncio.run(), the loop (and any connections opened on it) is reused across calls,
+    and it also works where a loop is already running in the calling thread, e.g. in notebooks.
+    """
+
+    def __init__(self, name: str = 'async-runner'):
+        """
+        :param name: name of the thread running the loop
+        """
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        """Get the runner's loop, starting it on first use."""
+        with self._lock:
+            if (self._loop is None) or self._loop.is_closed() or (not self._thread.is_alive()):
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name=self.name, daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def run(self, coro: Coroutine, timeout: float = None) -> Any:
+        """
+        Run a coroutine on the runner's loop, and wait for its result
+        :param coro: coroutine to run
+        :param timeout: max time (in seconds) to wait for the result
+        :return:
+        """
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError(f"{self.name}: cannot wait for a coroutine from the runner's own loop; await it instead")
+        future = asyncio.run_coroutine_threadsafe(coro, self.get_loop())
+        return future.result(timeout)
+
+    def close(self):
+        """Stop the runner's loop."""
+        with self._lock:
+            if (self._loop is not None) and self._loop.is_running():
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join()
+                self._loop.close()
+            self._loop = None
+            self._thread = None
+
+
+## runner shared by all sync callers (see get_runner())
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner() -> AsyncRunner:
+    """Get the process-wide async runner, creating it on first use."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = AsyncRunner()
+        return _runner
+
+
+async def gather_bounded(
+        tasks: Iterable[Union[Coroutine, Callable[[], Coroutine]]],
+        concurrency: int = None,
+        timeout: float = None,
+        return_exceptions: int = 0,
+) -> List[Any]:
+    """
+    Await tasks concurrently, with at most `concurrency` tasks running at a time.
+    :param tasks: coroutines, or functions returning a coroutine (called only once the task can run)
+    :param concurrency: max number of tasks running at a time (None for no limit)
+    :param timeout: max time (in seconds) per task, after which the task fails with asyncio.TimeoutError
+    :param return_exceptions: whether to return exceptions of failed tasks in place of their outputs
+        (see collect_failures()), instead of raising the first one
+    :return: outputs, aligned with tasks
+    """
+    semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+
+    async def run_task(task):
+        if semaphore is not None:
+            async with semaphore:
+                return await run_task_with_timeout(task)
+        return await run_task_with_timeout(task)
+
+    async def run_task_with_timeout(task):
+        coro = task() if callable(task) else task
+        if timeout is not None:
+            return await asyncio.wait_for(coro, timeout)
+        return await coro
+
+    outputs = await asyncio.gather(*[run_task(task) for task in tasks], return_exceptions=bool(return_exceptions))
+    return list(outputs)
+
+
+async def map_bounded(
+        func: Callable[..., Coroutine],
+        items: Iterable[Any],
+        concurrency: int = None,
+        timeout: float = None,
+        return_exceptions: int = 0,
+) -> List[Any]:
+    """
+    Await func(item) for every item, with at most `concurrency` calls running at a time (see gather_bounded()).
+    Coroutines are only created once they can run.
+    :param func: coroutine function
+    :param items: inputs to func
+    :param concurrency: max number of calls running at a time (None for no limit)
+    :param timeout: max time (in seconds) per call
+    :param return_exceptions: whether to return exceptions of failed calls in place of their outputs
+    :return: outputs, aligned with items
+    """
+    tasks = [partial(func, item) for item in items]
+    return await gather_bounded(tasks, concurrency=concurrency, timeout=timeout, return_exceptions=return_exceptions)
+
+
+def collect_failures(outputs: List[Any]) -> Dict[int, BaseException]:
+    """Get exceptions of failed tasks from outputs of gather_bounded(..., return_exceptions=1), by task position."""
+    failures = {pos: output for pos, output in enumerate(outputs) if isinstance(output, BaseException)}
+    return failures
+
+
+def run_async_tasks(
+        tasks: List[Coroutine],
+        concurrency: int = None,
+        timeout: float = None,
+        return_exceptions: int = 0,
+) -> List[Any]:
+    """
+    Run a list of async tasks, on the shared long-lived loop (see AsyncRunner), and wait for their outputs.
+    :param tasks: coroutines, or functions returning a coroutine
+    :param concurrency: max number of tasks running at a time (None for no limit)
+    :param timeout: max time (in seconds) per task
+    :param return_exceptions: whether to return exceptions of failed tasks in place of their outputs
+    :return: outputs, aligned with tasks
+    """
+    outputs: List[Any] = get_runner().run(gather_bounded(
+        tasks,
+        concurrency=concurrency,
+        timeout=timeout,
+        return_exceptions=return_exceptions,
+    ))
+    return outputs
+
+
+def run_async_map(
+        func: Callable[..., Coroutine],
+        items: Iterable[Any],
+        concurrency: int = None,
+        timeout: float = None,
+        return_exceptions: int = 0,
+) -> List[Any]:
+    """Run func(item) for every item on the shared long-lived loop, and wait for their outputs (see map_bounded())."""
+    outputs: List[Any] = get_runner().run(map_bounded(
+        func,
+        items,
+        concurrency=concurrency,
+        timeout=timeout,
+        return_exceptions=return_exceptions,
+    ))
     return outputs
 
 
@@ -20,8 +177,9 @@ def to_async(func):
     async def run(*args, loop=None, executor=None, **kwargs):
         if loop is None:
             loop = asyncio.get_event_loop() # Make event loop of nothing exists
+        if (executor is None) and len(args) and hasattr(args[0], 'get_async_executor'):
+            ## methods of objects owning thread pools (e.g. ByteGenie) run on them, instead of the loop's default executor
+            executor = args[0].get_async_executor(func.__name__)
         pfunc = partial(func, *args, **kwargs)  # Return function with variables (event) filled in
         return await loop.run_in_executor(executor, pfunc)
     return run
-
-
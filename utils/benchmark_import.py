@@ -0,0 +1,68 @@
+"""
+Benchmark cold-start import time of utils.byte_genie.
+Run from the repo root, e.g. `python -m utils.benchmark_import --target 0.25`;
+exits with status 1 if the median import time is over the target,
+or if importing the module pulls in any of the heavy modules that should only be imported on first use.
+"""
+
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+
+## modules that importing utils.byte_genie should not import
+HEAVY_MODULES = ['pandas', 'numpy', 'requests', 'tenacity', 'aiohttp']
+
+_BENCHMARK_CODE = '''
+import sys, json, time
+start_time = time.perf_counter()
+import {module}
+import_time = time.perf_counter() - start_time
+print(json.dumps({{'import_time': import_time, 'heavy_modules': [m for m in {heavy_modules} if m in sys.modules]}}))
+'''
+
+
+def measure_import_time(module: str = 'utils.byte_genie', n_runs: int = 10):
+    """
+    Measure the import time of a module, each time in a fresh interpreter
+    :param module: module to import
+    :param n_runs: number of runs
+    :return: dict with import times (in seconds) of all runs, their median, and heavy modules imported
+    """
+    code = _BENCHMARK_CODE.format(module=module, heavy_modules=HEAVY_MODULES)
+    import_times = []
+    heavy_modules = []
+    for run in range(n_runs):
+        output = subprocess.run(
+            [sys.executable, '-c', code],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        import_times.append(result['import_time'])
+        heavy_modules = result['heavy_modules']
+    results = {
+        'module': module,
+        'import_times': import_times,
+        'median_import_time': statistics.median(import_times),
+        'heavy_modules': heavy_modules,
+    }
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark cold-start import time')
+    parser.add_argument('--module', default='utils.byte_genie', help='module to import')
+    parser.add_argument('--n_runs', type=int, default=10, help='number of runs')
+    parser.add_argument('--target', type=float, default=0.25, help='max median import time, in seconds')
+    args = parser.parse_args()
+    results = measure_import_time(module=args.module, n_runs=args.n_runs)
+    print(f"{results['module']}: median import time {results['median_import_time']:.3f}s "
+          f"(target {args.target:.3f}s) over {args.n_runs} runs")
+    if results['heavy_modules']:
+        print(f"Heavy modules imported at import time: {results['heavy_modules']}")
+    if (results['median_import_time'] > args.target) or results['heavy_modules']:
+        sys.exit(1)
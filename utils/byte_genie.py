@@ -3,30 +3,253 @@ Utility functions for byte-genie API
 """
 
 import os
+import copy
 import json
+import asyncio
 import time
+import uuid
+import pickle
+import weakref
 import inspect
+import functools
+import threading
+import concurrent.futures
 
-import pandas as pd
-import requests
-import tenacity
-import numpy as np
 import utils.common
+import utils.upload_utils
 from utils.logging import logger
 from utils.async_utils import to_async
+from utils.http_utils import HttpTransport, get_shared_transport
+from utils.rate_limit import RateLimiter, TokenBucket
+from utils.concurrency import AdaptiveConcurrencyLimiter
+from utils.retry_utils import RetryPolicy, RetryableStatusError, CircuitOpenError, PollingRounds
+from utils.hedging import HedgingPolicy
+from utils.cache_utils import ResponseCache, hash_key
+from utils.single_flight import SingleFlight
+from utils.memo_utils import MemoStore
+from utils.output_poller import get_shared_poller
+from utils.executors import ExecutorPool, get_shared_executor_pool
+from utils.frame_utils import FrameBuilder
+
+
+## secrets read by clients, as {secrets file: (modification time, secrets)}
+_secrets_cache = {}
+_secrets_cache_lock = threading.Lock()
+## sync clients shared across responses, keyed by credentials (see get_shared_client())
+_shared_clients = {}
+_shared_clients_lock = threading.Lock()
+
+
+def get_shared_client(
+        api_key: str = None,
+        username: str = 'demo-genie',
+        api_url: str = 'https://api.byte-genie.com/execute',
+        secrets_file: str = 'secrets.json',
+):
+    """
+    Get the process-wide sync client for a set of credentials, creating it on first use.
+    Responses use shared clients to check and read task outputs, so that reading many outputs
+    reuses one client (and its connections), instead of creating a new client per output.
+    :param api_key: api key for byte-genie API (read from secrets_file if not given)
+    :param username: username
+    :param api_url: byte-genie api url
+    :param secrets_file: json file path containing secrets, including byte-genie api key
+    :return:
+    """
+    if api_key is None:
+        secrets = ByteGenie.read_secrets(secrets_file)
+        api_key = secrets['BYTE_GENIE_KEY'] if secrets is not None else ''
+    key = (api_url, api_key, username)
+    with _shared_clients_lock:
+        if key not in _shared_clients:
+            _shared_clients[key] = ByteGenie(
+                username=username,
+                api_key=api_key,
+                api_url=api_url,
+                task_mode='sync',
+            )
+        return _shared_clients[key]
+
+
+class ByteGenieOutputMixin:
+    """
+    Methods to check and read task outputs, shared by `ByteGenieResponse` and `ByteGenieCompactResponse`.
+    Subclasses implement get_data(), set_data() and get_output_file(), and hold a `client` and `verbose` attribute.
+    """
+
+    __slots__ = ()
+
+    def get_client(self):
+        """
+        Get the client to check and read task outputs with
+        :return:
+        """
+        if self.client is None:
+            self.client = get_shared_client()
+        return self.client
 
+    def check_output_file_exists(self):
+        """
+        Check if the output file exists.
+        This is the recommended method to check if the output of a task is complete.
+        :return:
+        """
+        output_file = self.get_output_file()
+        if output_file is not None:
+            resp = self.get_client().check_file_exists(output_file)
+            file_exists = resp.get_data()
+        else:
+            file_exists = False
+        return file_exists
+
+    def read_output_data(self):
+        """
+        Read output data from the task output file.
+        This is the recommended method to read output for tasks that were previously scheduled.
+        :return:
+        """
+        if self.check_output_file_exists():
+            resp = self.get_client().read_file(self.get_output_file())
+            resp_data = resp.get_data()
+            return resp_data
+        else:
+            logger.warning(f"output does not yet exist: wait some more")
 
-class ByteGenieResponse:
+    @to_async
+    def async_read_output_data(self):
+        try:
+            resp = self.read_output_data()
+            return resp
+        except Exception as e:
+            if self.verbose:
+                logger.warning(f"Error in read_output_data(): {e}")
+
+    def wait_for_output(self, wait_interval: int = 5, wait_time_max: int = 15 * 60, max_interval: int = 60):
+        """
+        Wait for the output file to exist, checking it with exponential backoff (see ByteGenie.wait_for_files()).
+        To wait for many tasks, use ByteGenieResponses.wait_for_outputs(), which checks many files per request.
+        :param wait_interval: wait time (in seconds) after the first check
+        :param wait_time_max: max total wait time (in seconds)
+        :param max_interval: max wait time (in seconds) between checks
+        :return: whether the output file exists
+        """
+        if wait_time_max is None:
+            wait_time_max = 15 * 60
+        if wait_interval is None:
+            wait_interval = 5
+        output_file = self.get_output_file()
+        if output_file is None:
+            return False
+        files_exist = self.get_client().wait_for_files(
+            files=[output_file],
+            wait_interval=wait_interval,
+            max_interval=max_interval,
+            wait_time_max=wait_time_max,
+        )
+        return files_exist[output_file]
+
+    def get_output_future(self, wait_time_max: float = 15 * 60):
+        """
+        Get a future resolving to the output data, once the output file exists.
+        Output files of all pending futures are checked together by a shared background poller
+        (see utils.output_poller.OutputPoller), so waiting on many tasks does not take a thread per task.
+        The future is a concurrent.futures.Future: chain callbacks with add_done_callback(), or await the response
+        itself in async code, e.g. `outputs = await asyncio.gather(*responses)`.
+        :param wait_time_max: max time (in seconds) to wait for the output file, after which the future fails
+            with a TimeoutError
+        :return:
+        """
+        output_data = self.get_data()
+        if output_data is not None:
+            future = concurrent.futures.Future()
+            future.set_result(output_data)
+            return future
+        output_file = self.get_output_file()
+        if output_file is None:
+            future = concurrent.futures.Future()
+            future.set_exception(ValueError(f"response has no output file to wait for"))
+            return future
+        future = get_shared_poller().submit(
+            client=self.get_client(),
+            output_file=output_file,
+            wait_time_max=wait_time_max,
+        )
+        future.add_done_callback(self._set_data_from_future)
+        return future
+
+    def _set_data_from_future(self, future: concurrent.futures.Future):
+        if (not future.cancelled()) and (future.exception() is None) and (future.result() is not None):
+            self.set_data(future.result())
+
+    def __await__(self):
+        return asyncio.wrap_future(self.get_output_future()).__await__()
+
+    def get_async_executor(self, func_name: str):
+        ## read outputs on the client's pool for read-only endpoints
+        return self.get_client().get_async_executor('read_file')
+
+    def get_output(self):
+        """
+        Returns the output data from the response if it is not None, otherwise reads it from the output file
+        :return:
+        """
+        output_data = self.get_data()
+        if output_data is not None:
+            return output_data
+        else:
+            output_data = self.read_output_data()
+            if output_data is not None:
+                self.set_data(output_data)
+            return output_data
+
+    def get_output_attr(self, attr: str):
+        """
+        Get a specific attribute from output, e.g. doc_name
+        :param attr:
+        :return:
+        """
+        output_data = self.get_output()
+        if utils.common.is_convertible_to_df(output_data):
+            import pandas as pd
+            output_data = pd.DataFrame(output_data)
+            if attr in output_data.columns:
+                attr_vals = output_data[attr].unique().tolist()
+                return attr_vals
+            else:
+                logger.error(f"Attribute, {attr}, not found in output data; "
+                             f"available attributes are: {list(output_data.columns)}")
+        elif isinstance(output_data, dict):
+            if attr in output_data.keys():
+                attr_vals = output_data[attr]
+                return attr_vals
+            else:
+                logger.error(f"Attribute, {attr}, not found in output data; "
+                             f"available attributes are: {list(output_data.keys())}")
+
+
+class ByteGenieResponse(ByteGenieOutputMixin):
 
     def __init__(
             self,
             response: dict = None,
             verbose: int = 1,
+            client=None,
     ):
+        """
+        :param response: api response
+        :param verbose: whether to write logs or not
+        :param client: sync `ByteGenie` client to check and read task outputs with
+            (defaults to the shared client for the default credentials, see get_shared_client())
+        """
         # if not isinstance(response, dict):
         #     raise ValueError('response must be a dictionary')
         self.response = response
         self.verbose = verbose
+        self.client = client
+
+    def __deepcopy__(self, memo):
+        ## the client (with its locks and connection pools) is shared, only the response is copied
+        return ByteGenieResponse(response=copy.deepcopy(self.response, memo), verbose=self.verbose, client=self.client)
 
     def get_task_attr(self, attr: str):
         resp = self.response
@@ -69,6 +292,51 @@ class ByteGenieResponse:
             if self.verbose:
                 logger.error(f"Error in set_response_attr: {e}")
 
+    def get_task_keys(self):
+        """
+        Get keys of all tasks (task_1, task_2, ...) contained in the response, in task order
+        :return:
+        """
+        resp = self.response
+        if isinstance(resp, dict):
+            if isinstance(resp.get('response'), dict):
+                task_keys = [key for key in resp['response'].keys() if key.startswith('task_')]
+                task_keys = sorted(task_keys, key=lambda key: int(key.split('task_')[-1]))
+                return task_keys
+        return []
+
+    def split_tasks(self, n_tasks: int = None):
+        """
+        Split a response containing multiple tasks (see ByteGenie.create_batch_payload()) into one response per task.
+        Each returned response holds its task under task_1, so all other methods work on it as usual.
+        :param n_tasks: number of tasks expected in the response; if the response holds no tasks (e.g. on error),
+            the response is repeated n_tasks times, so that outputs stay aligned with inputs
+        :return:
+        """
+        task_keys = self.get_task_keys()
+        if len(task_keys) == 0:
+            if n_tasks is None:
+                n_tasks = 1
+            return [
+                ByteGenieResponse(response=self.response, verbose=self.verbose, client=self.client)
+                for i in range(n_tasks)
+            ]
+        payload = self.response.get('payload')
+        payload_tasks = {}
+        if isinstance(payload, dict) and isinstance(payload.get('tasks'), dict):
+            payload_tasks = payload['tasks']
+        responses = []
+        for task_key in task_keys:
+            task_resp = {
+                key: val for key, val in self.response.items()
+                if key not in ['payload', 'response']
+            }
+            if task_key in payload_tasks:
+                task_resp['payload'] = {**payload, 'tasks': {'task_1': payload_tasks[task_key]}}
+            task_resp['response'] = {'task_1': self.response['response'][task_key]}
+            responses.append(ByteGenieResponse(response=task_resp, verbose=self.verbose, client=self.client))
+        return responses
+
     def get_status(self):
         """
         Get the status of the task.
@@ -89,7 +357,7 @@ class ByteGenieResponse:
         :return:
         """
         data = self.get_response_attr(attr='data')
-        for i in np.arange(0, 2, 1):
+        for i in range(2):
             if isinstance(data, dict):
                 if 'data' in data.keys():
                     data = data['data']
@@ -113,97 +381,157 @@ class ByteGenieResponse:
         start_time = self.get_task_attr(attr='start_time')
         return start_time
 
-    def check_output_file_exists(self):
+    def set_data(self, data):
+        self.set_response_attr(attr='data', attr_val=data)
+
+    def compact(self, spill_dir: str = None):
         """
-        Check if the output file exists.
-        This is the recommended method to check if the output of a task is complete.
+        Convert to a compact response, keeping only the task status, output file, start time, and data
+        :param spill_dir: if set, spill data to a file in this directory, instead of keeping it in memory
         :return:
         """
-        bg = ByteGenie(
-            task_mode='sync',
-        )
-        output_file = self.get_output_file()
-        if output_file is not None:
-            resp = bg.check_file_exists(output_file)
-            file_exists = resp.get_data()
-        else:
-            file_exists = False
-        return file_exists
+        return ByteGenieCompactResponse.from_response(response=self, spill_dir=spill_dir)
 
-    def read_output_data(self):
+
+def _remove_spill_file(data_file: str):
+    try:
+        os.remove(data_file)
+    except OSError:
+        pass
+
+
+class ByteGenieCompactResponse(ByteGenieOutputMixin):
+    """
+    Compact, slotted form of a `ByteGenieResponse`, for large collections of responses (see ByteGenieResponses.compact()).
+    Only keeps the task status, output file, start time and error, and a reference to the response data;
+    the echoed payload and the rest of the response are dropped.
+    Data can be spilled to a file on local disk, in which case it is only loaded back when accessed;
+    the file is deleted when the data is replaced, on close(), or once the response is garbage-collected.
+    """
+
+    __slots__ = (
+        'status', 'output_file', 'start_time', 'error', 'verbose', 'client', '_data', '_data_file', '_finalizer',
+        '__weakref__',
+    )
+
+    def __init__(
+            self,
+            status: str = None,
+            output_file: str = None,
+            start_time=None,
+            data=None,
+            error=None,
+            verbose: int = 1,
+            client=None,
+    ):
         """
-        Read output data from the task output file.
-        This is the recommended method to read output for tasks that were previously scheduled.
+        :param status: task status
+        :param output_file: task output file
+        :param start_time: task start time
+        :param data: data returned in the response
+        :param error: error raised when making the api call, if any
+        :param verbose: whether to write logs or not
+        :param client: sync `ByteGenie` client to check and read task outputs with
+        """
+        self.status = status
+        self.output_file = output_file
+        self.start_time = start_time
+        self.error = error
+        self.verbose = verbose
+        self.client = client
+        self._data = data
+        self._data_file = None
+        self._finalizer = None
+
+    @classmethod
+    def from_response(cls, response: ByteGenieResponse, spill_dir: str = None):
+        """
+        Create a compact response from a `ByteGenieResponse`
+        :param response: response to compact
+        :param spill_dir: if set, spill data to a file in this directory, instead of keeping it in memory
         :return:
         """
-        bg = ByteGenie(
-            task_mode='sync',
+        error = response.response.get('error') if isinstance(response.response, dict) else None
+        compact_resp = cls(
+            status=response.get_status(),
+            output_file=response.get_output_file(),
+            start_time=response.get_start_time(),
+            data=response.get_data(),
+            error=error,
+            verbose=response.verbose,
+            client=response.client,
         )
-        if self.check_output_file_exists():
-            resp = bg.read_file(self.get_output_file())
-            resp_data = resp.get_data()
-            return resp_data
-        else:
-            logger.warning(f"output does not yet exist: wait some more")
+        if spill_dir is not None:
+            compact_resp.spill(spill_dir=spill_dir)
+        return compact_resp
 
-    @to_async
-    def async_read_output_data(self):
-        try:
-            resp = self.read_output_data()
-            return resp
-        except Exception as e:
-            if self.verbose:
-                logger.warning(f"Error in read_output_data(): {e}")
+    def get_status(self):
+        return self.status
 
-    def wait_for_output(self, wait_interval: int = 5, wait_time_max: int = 15 * 60):
-        if wait_time_max is None:
-            wait_time_max = 15 * 60
-        if wait_interval is None:
-            wait_interval = 5
-        wait_time = 0
-        while wait_time <= wait_time_max:
-            if self.check_output_file_exists():
-                return True
-            time.sleep(wait_interval)
-            wait_time = wait_time + wait_interval
-        return False
+    def get_output_file(self):
+        return self.output_file
 
-    def get_output(self):
+    def get_start_time(self):
+        return self.start_time
+
+    def get_data(self):
         """
-        Returns the output data from the response if it is not None, otherwise reads it from the output file
+        Get data returned in the response, loading it from disk if it was spilled
         :return:
         """
-        output_data = self.get_data()
-        if output_data is not None:
-            return output_data
-        else:
-            output_data = self.read_output_data()
-            if output_data is not None:
-                self.set_response_attr(attr='data', attr_val=output_data)
-            return output_data
+        if self._data_file is not None:
+            with open(self._data_file, mode='rb') as f:
+                return pickle.load(f)
+        return self._data
 
-    def get_output_attr(self, attr: str):
+    def set_data(self, data):
+        self.close()
+        self._data = data
+
+    def close(self):
         """
-        Get a specific attribute from output, e.g. doc_name
-        :param attr:
+        Delete the file data was spilled to, if any (the data is then no longer available)
         :return:
         """
-        output_data = self.get_output()
-        if utils.common.is_convertible_to_df(output_data):
-            output_data = pd.DataFrame(output_data)
-            if attr in output_data.columns:
-                attr_vals = output_data[attr].unique().tolist()
-                return attr_vals
-            else:
-                logger.error(f"Attribute, {attr}, not found in output data; "
-                             f"available attributes are: {list(output_data.columns)}")
-        elif isinstance(output_data, dict):
-            if attr in output_data.keys():
-                attr_vals = output_data[attr]
-                return attr_vals
-            else:
-                logger.error(f"Attribute, {attr}, not found in output data; "
-                             f"available attributes are: {list(output_data.keys())}")
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+        self._data_file = None
+
+    def __deepcopy__(self, memo):
+        ## the copy keeps its own (in-memory) data, and shares the client
+        return ByteGenieCompactResponse(
+            status=self.status,
+            output_file=self.output_file,
+            start_time=self.start_time,
+            data=copy.deepcopy(self.get_data(), memo),
+            error=self.error,
+            verbose=self.verbose,
+            client=self.client,
+        )
+
+    def is_spilled(self):
+        return self._data_file is not None
+
+    def spill(self, spill_dir: str):
+        """
+        Move data to a file in spill_dir, to free memory; data is loaded back from the file when accessed
+        :param spill_dir: directory to write data files in
+        :return:
+        """
+        if (self._data is None) or (self._data_file is not None):
+            return
+        os.makedirs(spill_dir, exist_ok=True)
+        data_file = os.path.join(spill_dir, f"{uuid.uuid4().hex}.pickle")
+        with open(data_file, mode='wb') as f:
+            pickle.dump(self._data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._data_file = data_file
+        self._finalizer = weakref.finalize(self, _remove_spill_file, data_file)
+        self._data = None
+
+    def __repr__(self):
+        return (f"ByteGenieCompactResponse(status={self.status!r}, output_file={self.output_file!r}, "
+                f"spilled={self.is_spilled()})")
 
 
 class ByteGenieResponses:
@@ -211,14 +539,45 @@ class ByteGenieResponses:
     def __init__(
             self,
             responses: list = None,
+            compact: int = 0,
+            spill_dir: str = None,
     ):
+        """
+        :param responses: list of `ByteGenieResponse` (or `ByteGenieCompactResponse`) objects
+        :param compact: whether to store responses in compact form (see compact())
+        :param spill_dir: if set (with compact=1), spill response data to files in this directory
+        """
         if responses is not None:
-            self.responses = [
-                ByteGenieResponse(response=response.response)
-                for response in responses
-            ]
+            self.responses = list(responses)
         else:
             self.responses = []
+        if compact:
+            self.compact(spill_dir=spill_dir)
+
+    def compact(self, spill_dir: str = None):
+        """
+        Convert responses to compact responses, dropping echoed payloads and other response metadata,
+        to fit large numbers of responses in memory
+        :param spill_dir: if set, spill response data to files in this directory, loaded back when accessed
+        :return:
+        """
+        self.responses = [
+            resp.compact() if isinstance(resp, ByteGenieResponse) else resp
+            for resp in self.responses
+        ]
+        if spill_dir is not None:
+            for resp in self.responses:
+                resp.spill(spill_dir=spill_dir)
+        return self
+
+    def close(self):
+        """
+        Delete files that response data was spilled to (see compact())
+        :return:
+        """
+        for resp in self.responses:
+            if isinstance(resp, ByteGenieCompactResponse):
+                resp.close()
 
     def __getitem__(self, index):
         if isinstance(index, slice):
@@ -271,6 +630,175 @@ class ByteGenieResponses:
         outputs = utils.async_utils.run_async_tasks(tasks)
         return outputs
 
+    def group_output_files(self, positions: list):
+        """
+        Group output files of responses by the client to check them with
+        :param positions: positions of responses in self.responses
+        :return: list of (client, {output_file: positions of responses with this output file})
+        """
+        client_files = {}
+        for pos in positions:
+            resp = self.responses[pos]
+            client = resp.get_client()
+            file_positions = client_files.setdefault(id(client), (client, {}))[1]
+            file_positions.setdefault(resp.get_output_file(), []).append(pos)
+        return list(client_files.values())
+
+    def get_pending_positions(self):
+        """
+        Positions of responses that do not hold their output data yet, but have an output file to wait for
+        :return:
+        """
+        pending = [
+            pos for pos, resp in enumerate(self.responses)
+            if (resp.get_data() is None) and (resp.get_output_file() is not None)
+        ]
+        return pending
+
+    def as_completed(
+            self,
+            wait_interval: float = 5,
+            max_interval: float = 60,
+            wait_time_max: float = 15 * 60,
+            batch_size: int = 100,
+    ):
+        """
+        Yield responses as their outputs become available, so that their outputs can be processed
+        while other tasks are still running.
+        Responses that already hold their output data are yielded first; output files of the other responses are
+        checked in rounds, many files per api request, and responses are yielded as soon as their output file exists.
+        The wait between rounds grows exponentially, with jitter, and is reset whenever an output becomes available.
+        Usage:
+            for resp in responses.as_completed():
+                output = resp.get_output()
+        :param wait_interval: wait time (in seconds) after a round in which outputs became available
+        :param max_interval: max wait time (in seconds) between rounds
+        :param wait_time_max: max total wait time (in seconds); responses not completed by then are not yielded
+        :param batch_size: max number of files to check per api request
+        :return: generator of responses
+        """
+        pending = self.get_pending_positions()
+        for resp in self.responses:
+            if resp.get_data() is not None:
+                yield resp
+        rounds = PollingRounds(
+            items=pending,
+            wait_interval=wait_interval,
+            max_interval=max_interval,
+            wait_time_max=wait_time_max,
+            reset_on_progress=1,
+        )
+        while len(rounds.pending):
+            done = set()
+            for client, file_positions in self.group_output_files(positions=rounds.pending):
+                try:
+                    files_exist = client.check_files_exist(files=list(file_positions.keys()), batch_size=batch_size)
+                except Exception as e:
+                    logger.warning(f"Error in as_completed(): {e}")
+                    files_exist = {}
+                for file, exists in files_exist.items():
+                    if exists:
+                        done.update(file_positions[file])
+            for pos in sorted(done):
+                yield self.responses[pos]
+            rounds.update(done=done)
+            wait_time = rounds.next_wait()
+            if wait_time is None:
+                break
+            time.sleep(wait_time)
+        if len(rounds.pending):
+            logger.warning(
+                f"{len(rounds.pending)}/{len(self.responses)} responses not completed within {wait_time_max}s"
+            )
+
+    async def async_as_completed(
+            self,
+            wait_interval: float = 5,
+            max_interval: float = 60,
+            wait_time_max: float = 15 * 60,
+            batch_size: int = 100,
+    ):
+        """
+        Async iterator version of as_completed(), which waits without blocking the event loop.
+        Usage:
+            async for resp in responses.async_as_completed():
+                output = resp.get_output()
+        :param wait_interval: wait time (in seconds) after a round in which outputs became available
+        :param max_interval: max wait time (in seconds) between rounds
+        :param wait_time_max: max total wait time (in seconds); responses not completed by then are not yielded
+        :param batch_size: max number of files to check per api request
+        :return: async generator of responses
+        """
+        pending = self.get_pending_positions()
+        for resp in self.responses:
+            if resp.get_data() is not None:
+                yield resp
+        rounds = PollingRounds(
+            items=pending,
+            wait_interval=wait_interval,
+            max_interval=max_interval,
+            wait_time_max=wait_time_max,
+            reset_on_progress=1,
+        )
+        while len(rounds.pending):
+            client_files = self.group_output_files(positions=rounds.pending)
+            files_exist = await asyncio.gather(*[
+                client.async_check_files_exist(files=list(file_positions.keys()), batch_size=batch_size)
+                for client, file_positions in client_files
+            ])
+            done = set()
+            for (client, file_positions), client_files_exist in zip(client_files, files_exist):
+                for file, exists in (client_files_exist or {}).items():
+                    if exists:
+                        done.update(file_positions[file])
+            for pos in sorted(done):
+                yield self.responses[pos]
+            rounds.update(done=done)
+            wait_time = rounds.next_wait()
+            if wait_time is None:
+                break
+            await asyncio.sleep(wait_time)
+        if len(rounds.pending):
+            logger.warning(
+                f"{len(rounds.pending)}/{len(self.responses)} responses not completed within {wait_time_max}s"
+            )
+
+    def get_output_futures(self, wait_time_max: float = 15 * 60):
+        """
+        Get futures resolving to the output data of all responses (see ByteGenieResponse.get_output_future())
+        :param wait_time_max: max time (in seconds) to wait for each output file
+        :return: list of futures, aligned with responses
+        """
+        futures = [resp.get_output_future(wait_time_max=wait_time_max) for resp in self.responses]
+        return futures
+
+    def wait_for_outputs(
+            self,
+            wait_interval: float = 5,
+            max_interval: float = 60,
+            wait_time_max: float = 15 * 60,
+            batch_size: int = 100,
+    ):
+        """
+        Wait for outputs of all responses to be available, checking many output files per api request,
+        with exponential backoff between rounds, and without re-checking files that already exist (see as_completed()).
+        :param wait_interval: wait time (in seconds) after a round in which outputs became available
+        :param max_interval: max wait time (in seconds) between rounds
+        :param wait_time_max: max total wait time (in seconds)
+        :param batch_size: max number of files to check per api request
+        :return: list of whether the output of each response is available, aligned with responses
+        """
+        completed = set()
+        for resp in self.as_completed(
+            wait_interval=wait_interval,
+            max_interval=max_interval,
+            wait_time_max=wait_time_max,
+            batch_size=batch_size,
+        ):
+            completed.add(id(resp))
+        outputs_ready = [id(resp) in completed for resp in self.responses]
+        return outputs_ready
+
     def get_output(self, concat: int = 0):
         outputs = [resp.get_output() for resp in self.responses]
         if concat:
@@ -288,8 +816,193 @@ class ByteGenieResponses:
         return attr_vals
 
 
+class ByteGenieMapResults:
+    """
+    Results of ByteGenie.map(): one response per input, and a report of inputs whose calls failed
+    """
+
+    def __init__(
+            self,
+            endpoint: str,
+            kwargs_list: list,
+            responses: list,
+            errors: dict,
+            retryable: set,
+    ):
+        """
+        :param endpoint: endpoint that was called
+        :param kwargs_list: inputs, as keyword arguments of each call
+        :param responses: responses, aligned with kwargs_list (None for calls that raised an error)
+        :param errors: errors of failed calls, as {input position: exception}
+        :param retryable: positions of failed calls worth retrying (e.g. after timeouts or overload errors)
+        """
+        self.endpoint = endpoint
+        self.kwargs_list = kwargs_list
+        self.responses = responses
+        self.errors = errors
+        self.retryable = retryable
+
+    def __len__(self):
+        return len(self.responses)
+
+    def __getitem__(self, index):
+        return self.responses[index]
+
+    def __repr__(self):
+        return (f"ByteGenieMapResults(endpoint={self.endpoint!r}, n_calls={len(self.responses)}, "
+                f"n_failed={len(self.errors)}, n_retryable={len(self.retryable)})")
+
+    def get_responses(self):
+        """
+        Get responses of successful calls
+        :return:
+        """
+        responses = [resp for pos, resp in enumerate(self.responses) if (pos not in self.errors) and (resp is not None)]
+        return ByteGenieResponses(responses=responses)
+
+    def get_output(self):
+        """
+        Get outputs of all calls, aligned with inputs (None for failed calls)
+        :return:
+        """
+        outputs = [
+            resp.get_output() if (pos not in self.errors) and isinstance(resp, ByteGenieOutputMixin) else None
+            for pos, resp in enumerate(self.responses)
+        ]
+        return outputs
+
+    def get_failure_report(self):
+        """
+        Get a report of failed calls
+        :return: list of dicts, with position, kwargs, error, error_type and retryable of every failed call
+        """
+        report = [
+            {
+                'position': pos,
+                'kwargs': self.kwargs_list[pos],
+                'error': str(error),
+                'error_type': type(error).__name__,
+                'retryable': int(pos in self.retryable),
+            }
+            for pos, error in sorted(self.errors.items())
+        ]
+        return report
+
+    def get_retry_kwargs(self):
+        """
+        Get inputs of failed calls worth retrying, e.g. to pass them to map() again
+        :return:
+        """
+        return [self.kwargs_list[pos] for pos in sorted(self.retryable)]
+
+
+class ByteGenieBatch:
+    """
+    Batch of byte-genie endpoint calls, to be sent as multi-task api requests (see ByteGenie.create_batch())
+    """
+
+    def __init__(
+            self,
+            bg,
+            batch_size: int = 100,
+    ):
+        self.bg = bg
+        self.batch_size = batch_size
+        self.tasks = []
+        self.timeouts = []
+        ## copy of the client, whose call_api records tasks instead of calling the api
+        self._recorder = copy.copy(bg)
+        self._recorder.call_api = self._record_call
+
+    def _record_call(self, payload: dict, method: str = 'POST', timeout: int = 15 * 60):
+        task_num = len(self.tasks)
+        self.tasks.extend(list(payload['tasks'].values()))
+        self.timeouts.append(timeout)
+        return task_num
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name.startswith('async_'):
+            raise AttributeError(name)
+        return getattr(self._recorder, name)
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def create_payloads(self):
+        """
+        Create api payloads for all recorded tasks, with at most batch_size tasks per payload
+        :return:
+        """
+        payloads = [
+            self.bg.create_batch_payload(tasks=self.tasks[start:start + self.batch_size])
+            for start in range(0, len(self.tasks), self.batch_size)
+        ]
+        return payloads
+
+    def execute(self):
+        """
+        Send all recorded tasks, and return one response per task, in the order tasks were recorded
+        :return:
+        """
+        timeout = max(self.timeouts) if len(self.timeouts) else 15 * 60
+        responses = []
+        for payload in self.create_payloads():
+            n_tasks = len(payload['tasks'])
+            try:
+                resp = self.bg.call_api(payload=payload, timeout=timeout)
+            except Exception as e:
+                if self.bg.verbose:
+                    logger.error(f"Error in ByteGenieBatch.execute(): {e}")
+                resp = ByteGenieResponse({'payload': payload, 'error': e}, client=self.bg.get_sync_client())
+            responses = responses + resp.split_tasks(n_tasks=n_tasks)
+        return ByteGenieResponses(responses=responses)
+
+    @to_async
+    def async_execute(self):
+        return self.execute()
+
+
 class ByteGenie:
 
+    ## endpoints that only read data, and are safe to call more than once (e.g. to hedge slow calls)
+    IDEMPOTENT_FUNCS = [
+        'check_file_exists',
+        'list_files',
+        'list_doc_files',
+        'list_corresponding_files',
+        'read_file',
+        'read_files',
+        'read_page_data',
+        'read_quants',
+        'read_synthesized_data',
+        'show_uploads',
+    ]
+    ## endpoints whose responses can be cached locally, with their time-to-live in the cache (None to never expire);
+    ## outputs read by read_* endpoints do not change once written (unless overwritten),
+    ## while listings and existence checks change as new outputs are written
+    CACHEABLE_FUNCS = {
+        'read_file': None,
+        'read_files': None,
+        'read_page_data': None,
+        'read_quants': None,
+        'read_synthesized_data': None,
+        'check_file_exists': 'ttl',
+        'list_files': 'ttl',
+        'list_doc_files': 'ttl',
+        'list_corresponding_files': 'ttl',
+        'show_uploads': 'ttl',
+    }
+    ## deterministic endpoints whose outputs can be memoized; for endpoints taking a list of records,
+    ## the arg holding the records, so that outputs are memoized per record, and only new records are sent;
+    ## standardise_names standardises names jointly, so its calls are only memoized as a whole
+    MEMO_FUNCS = {
+        'slugify': None,
+        'parse_numeric_string': None,
+        'standardise_names': None,
+        'standardise_years': 'data',
+        'embed_data': 'data',
+    }
+
     def __init__(
             self,
             username: str = 'demo-genie',
@@ -303,6 +1016,29 @@ class ByteGenie:
             overwrite_base_output: int = 0,
             task_id: str = None,
             verbose: int = 1,
+            transport: HttpTransport = None,
+            pool_maxsize: int = None,
+            rate_limit: float = None,
+            rate_burst: int = None,
+            func_rate_limits: dict = None,
+            rate_limiter: RateLimiter = None,
+            max_concurrency: int = None,
+            concurrency_limiter: AdaptiveConcurrencyLimiter = None,
+            retry_policy: RetryPolicy = None,
+            hedge_requests: int = 0,
+            hedging_policy: HedgingPolicy = None,
+            cache_dir: str = None,
+            cache_max_size: int = 1024 ** 3,
+            cache_ttl: float = 10 * 60,
+            response_cache: ResponseCache = None,
+            coalesce_requests: int = 1,
+            memo_file: str = None,
+            memo_store: MemoStore = None,
+            max_workers: int = 128,
+            short_max_workers: int = 32,
+            executor_pool: ExecutorPool = None,
+            frame_workers: int = 0,
+            frame_builder: FrameBuilder = None,
     ):
         """
         :param api_url: byte-genie api url
@@ -315,6 +1051,33 @@ class ByteGenie:
         :param overwrite: whether to overwrite the immediate task output, if it already exists
         :param overwrite_base_output: whether to overwrite the base task output, if it already exists
         :param verbose: whether to write logs from the task or not
+        :param transport: pooled http transport to make api calls with (defaults to the transport shared across clients)
+        :param pool_maxsize: max number of pooled connections per host; if set, the client gets its own transport
+        :param rate_limit: max number of tasks per second sent by the client, across all endpoints
+        :param rate_burst: max number of tasks sent in a burst, across all endpoints
+        :param func_rate_limits: max number of tasks per second per endpoint, as {func: rate} or {func: (rate, burst)}
+        :param rate_limiter: rate limiter to use (e.g. to share rate limits across clients); overrides other rate limit args
+        :param max_concurrency: if set, adapt the number of in-flight api calls (AIMD) to backend health, up to max_concurrency
+        :param concurrency_limiter: adaptive concurrency limiter to use (e.g. to share it across clients); overrides max_concurrency
+        :param retry_policy: policy for retrying failed api calls (defaults to a new policy, with its own retry budget and circuit breakers)
+        :param hedge_requests: whether to hedge slow calls to idempotent endpoints (IDEMPOTENT_FUNCS) with a duplicate call
+        :param hedging_policy: hedging policy to use (e.g. with a custom percentile or hedge rate); implies hedge_requests=1
+        :param cache_dir: if set, cache responses of read-only endpoints (CACHEABLE_FUNCS) on local disk, in this directory
+        :param cache_max_size: max size of the local response cache, in bytes
+        :param cache_ttl: time (in seconds) after which cached listings and existence checks expire
+        :param response_cache: local response cache to use (e.g. to share it across clients); overrides cache_dir
+        :param coalesce_requests: whether to coalesce identical in-flight calls to idempotent endpoints into one api call
+        :param memo_file: if set, memoize outputs of deterministic endpoints (MEMO_FUNCS) in this sqlite file
+        :param memo_store: memo store to use (e.g. to share it across clients); overrides memo_file
+        :param max_workers: max number of threads running blocking calls from async_* methods, and hedged calls
+            (pools are shared by all clients created with the same max_workers and short_max_workers)
+        :param short_max_workers: max number of threads running blocking calls to read-only endpoints (IDEMPOTENT_FUNCS),
+            in a separate pool, so that quick reads do not queue behind long-running calls
+        :param executor_pool: thread pools to use; overrides max_workers and short_max_workers
+        :param frame_workers: number of worker processes building dataframes from task outputs in build_frame()
+            (0 to build them in the calling thread); the process pool is shut down by close().
+            As workers are not forked, scripts using them must run under `if __name__ == '__main__':`
+        :param frame_builder: dataframe builder to use (e.g. to share its process pool across clients); overrides frame_workers
         """
         self.api_url = api_url
         self.secrets_file = secrets_file
@@ -333,26 +1096,137 @@ class ByteGenie:
             self.username = self.read_username()
         else:
             self.username = username
+        if transport is not None:
+            self.transport = transport
+        elif pool_maxsize is not None:
+            self.transport = HttpTransport(pool_maxsize=pool_maxsize, verbose=verbose)
+        else:
+            self.transport = get_shared_transport(verbose=verbose)
+        if rate_limiter is not None:
+            self.rate_limiter = rate_limiter
+        else:
+            self.rate_limiter = RateLimiter(
+                rate=rate_limit,
+                burst=rate_burst,
+                func_rates=func_rate_limits,
+            )
+        if concurrency_limiter is not None:
+            self.concurrency_limiter = concurrency_limiter
+        elif max_concurrency is not None:
+            self.concurrency_limiter = AdaptiveConcurrencyLimiter(
+                initial_limit=min(8, max_concurrency),
+                max_limit=max_concurrency,
+            )
+        else:
+            self.concurrency_limiter = None
+        if retry_policy is not None:
+            self.retry_policy = retry_policy
+        else:
+            self.retry_policy = RetryPolicy(verbose=verbose)
+        if hedging_policy is not None:
+            self.hedging_policy = hedging_policy
+        elif hedge_requests:
+            self.hedging_policy = HedgingPolicy()
+        else:
+            self.hedging_policy = None
+        self.cache_ttl = cache_ttl
+        if response_cache is not None:
+            self.response_cache = response_cache
+        elif cache_dir is not None:
+            self.response_cache = ResponseCache(
+                cache_dir=cache_dir,
+                max_size=cache_max_size,
+                verbose=verbose,
+            )
+        else:
+            self.response_cache = None
+        if coalesce_requests:
+            self.single_flight = SingleFlight()
+        else:
+            self.single_flight = None
+        if memo_store is not None:
+            self.memo_store = memo_store
+        elif memo_file is not None:
+            self.memo_store = MemoStore(db_file=memo_file)
+        else:
+            self.memo_store = None
+        if executor_pool is not None:
+            self.executor_pool = executor_pool
+        else:
+            self.executor_pool = get_shared_executor_pool(
+                pool_sizes={'short': short_max_workers, 'long': max_workers, 'hedge': max_workers},
+                func_pools={func: 'short' for func in self.IDEMPOTENT_FUNCS},
+                default_pool='long',
+            )
+        ## frame builder created by (and closed with) this client
+        self._own_frame_builder = None
+        if frame_builder is not None:
+            self.frame_builder = frame_builder
+        else:
+            self.frame_builder = FrameBuilder(max_workers=frame_workers)
+            self._own_frame_builder = self.frame_builder
 
-    def read_api_key(self):
-        filename = os.path.join(self.secrets_file)
+    def close(self):
+        """
+        Shut down worker processes the client started to build dataframes (see frame_workers).
+        Thread pools, transports, caches and other resources passed to the client, or shared across clients,
+        are left open.
+        :return:
+        """
+        if self._own_frame_builder is not None:
+            self._own_frame_builder.shutdown()
+
+    @staticmethod
+    def read_secrets(secrets_file: str):
+        """
+        Read secrets from secrets_file, cached until the file is modified
+        :param secrets_file: json file path containing secrets
+        :return: dict of secrets, or None if secrets_file does not exist
+        """
+        filename = os.path.abspath(secrets_file)
+        try:
+            mtime = os.path.getmtime(filename)
+        except OSError:
+            return None
+        with _secrets_cache_lock:
+            cached = _secrets_cache.get(filename)
+            if (cached is not None) and (cached[0] == mtime):
+                return cached[1]
         try:
             with open(filename, mode='r') as f:
                 secrets = json.loads(f.read())
-                api_key = secrets['BYTE_GENIE_KEY']
         except FileNotFoundError:
-            api_key = ''
+            return None
+        with _secrets_cache_lock:
+            _secrets_cache[filename] = (mtime, secrets)
+        return secrets
+
+    def read_api_key(self):
+        secrets = self.read_secrets(self.secrets_file)
+        if secrets is None:
+            return ''
+        api_key = secrets['BYTE_GENIE_KEY']
         return api_key
 
     def read_username(self):
-        filename = os.path.join(self.secrets_file)
-        try:
-            with open(filename, mode='r') as f:
-                secrets = json.loads(f.read())
-                api_key = secrets['USERNAME']
-        except FileNotFoundError:
-            api_key = ''
-        return api_key
+        secrets = self.read_secrets(self.secrets_file)
+        if secrets is None:
+            return ''
+        username = secrets['USERNAME']
+        return username
+
+    def get_sync_client(self):
+        """
+        Get a sync client with the same credentials as this client, to check and read task outputs with:
+        the shared client for its credentials, with default settings, so that outputs are read the same way
+        whatever the settings of this client (e.g. return_data, overwrite)
+        :return:
+        """
+        return get_shared_client(
+            api_key=self.api_key,
+            username=self.username,
+            api_url=self.api_url,
+        )
 
     def add_msg_to_logstream(self, message_type: str, msg: str, priority: int = 0):
         log_stream.put_record({
@@ -363,22 +1237,18 @@ class ByteGenie:
             "priority": 1,
         })
 
-    def create_api_payload(
+    def create_api_task(
             self,
             func: str,
             args: dict,
-            # cluster_args: dict = None,
             **kwargs,
     ):
         """
-        Create payload for byte-genie API
+        Create a single task for byte-genie API payload
         :param func: function/api-endpoint to call
         :param args: arguments for the function
-        :param cluster_args: arguments for the type of cluster used to run the code
         :return:
         """
-        # if cluster_args is None:
-        #     cluster_args = {}
         if kwargs.get('overwrite') is not None:
             overwrite = kwargs.get('overwrite')
         elif self.overwrite is not None:
@@ -397,23 +1267,104 @@ class ByteGenie:
             task_mode = self.task_mode
         else:
             task_mode = 'async'
+        task = {
+            'func': func,
+            'args': args,
+            'overwrite': overwrite,
+            'overwrite_base_output': overwrite_base_output,
+            'return_data': self.return_data,
+            'verbose': self.verbose,
+            'task_mode': task_mode,
+            'calc_mode': self.calc_mode,
+        }
+        return task
+
+    def create_api_payload(
+            self,
+            func: str,
+            args: dict,
+            # cluster_args: dict = None,
+            **kwargs,
+    ):
+        """
+        Create payload for byte-genie API
+        :param func: function/api-endpoint to call
+        :param args: arguments for the function
+        :param cluster_args: arguments for the type of cluster used to run the code
+        :return:
+        """
+        # if cluster_args is None:
+        #     cluster_args = {}
         payload = {
             "api_key": self.api_key,
             "tasks": {
-                'task_1': {
-                    'func': func,
-                    'args': args,
-                    'overwrite': overwrite,
-                    'overwrite_base_output': overwrite_base_output,
-                    'return_data': self.return_data,
-                    'verbose': self.verbose,
-                    'task_mode': task_mode,
-                    'calc_mode': self.calc_mode,
-                },
+                'task_1': self.create_api_task(
+                    func=func,
+                    args=args,
+                    **kwargs,
+                ),
+            }
+        }
+        return payload
+
+    def create_batch_payload(
+            self,
+            tasks: list,
+    ):
+        """
+        Create payload for byte-genie API, packing multiple tasks in one request, as task_1, task_2, ..., task_N
+        :param tasks: list of tasks, each created with create_api_task(), or taken from a payload created with create_api_payload()
+        :return:
+        """
+        payload = {
+            "api_key": self.api_key,
+            "tasks": {
+                f"task_{task_num + 1}": task
+                for task_num, task in enumerate(tasks)
             }
         }
         return payload
 
+    def create_batch(
+            self,
+            batch_size: int = 100,
+    ):
+        """
+        Create a batch to pack many independent endpoint calls into a few api requests.
+        Calling an endpoint method on the batch records the call, instead of making it,
+        and execute() sends all recorded calls, batch_size tasks per request.
+        Usage:
+            batch = bg.create_batch()
+            for file in files:
+                batch.read_file(file=file)
+            responses = batch.execute()
+        :param batch_size: max number of tasks to send per api request
+        :return:
+        """
+        return ByteGenieBatch(bg=self, batch_size=batch_size)
+
+    @staticmethod
+    def get_payload_funcs(payload: dict):
+        """
+        Get funcs of all tasks in a payload
+        :param payload: api payload
+        :return:
+        """
+        funcs = []
+        if isinstance(payload, dict) and isinstance(payload.get('tasks'), dict):
+            funcs = [task.get('func') for task in payload['tasks'].values() if isinstance(task, dict)]
+        return funcs
+
+    def set_rate_limit(self, rate: float = None, burst: int = None, func: str = None):
+        """
+        Set (or remove, with rate=None) the client's global rate limit, or the rate limit for one endpoint
+        :param rate: max number of tasks per second
+        :param burst: max number of tasks sent in a burst
+        :param func: endpoint to set the rate limit for, e.g. 'embed_doc_data' (None for the global rate limit)
+        :return:
+        """
+        self.rate_limiter.set_rate(rate=rate, burst=burst, func=func)
+
     def set_headers(self):
         headers = {
             "Accept": "*/*",
@@ -424,29 +1375,634 @@ class ByteGenie:
         }
         return headers
 
-    @tenacity.retry(
-        wait=tenacity.wait_exponential(multiplier=1, min=5, max=120),
-        stop=tenacity.stop_after_attempt(5)
-    )
-    def call_api(self, payload: dict, method: str = 'POST', timeout: int = 15 * 60):
-        headers = self.set_headers()
-        response = requests.request(
-            method=method,
-            url=self.api_url,
-            headers=headers,
-            json=payload,
-            timeout=timeout,
+    def send_request(self, payload: dict, funcs: list, method: str = 'POST', timeout: int = 15 * 60):
+        """
+        Make a single attempt at an api call, within the client's rate and concurrency limits.
+        Raises RetryableStatusError if the response has a retryable http status.
+        :param payload: api payload
+        :param funcs: endpoints of the tasks in the payload
+        :param method: http method
+        :param timeout: timeout value for the attempt
+        :return:
+        """
+        ## outcome of the attempt for the circuit breakers, recorded however the attempt ends
+        ## (None if it ends without an outcome, e.g. on a non-retryable error)
+        failed = None
+        try:
+            self.rate_limiter.acquire(funcs=funcs)
+            headers = self.set_headers()
+            if self.concurrency_limiter is not None:
+                start_time = self.concurrency_limiter.acquire()
+            try:
+                response = self.transport.request(
+                    method=method,
+                    url=self.api_url,
+                    headers=headers,
+                    timeout=timeout,
+                    **self.create_request_body(payload),
+                )
+            except Exception as e:
+                if self.concurrency_limiter is not None:
+                    ## only failures worth retrying (connection errors, timeouts) are signs of overload
+                    self.concurrency_limiter.release(
+                        start_time,
+                        func=funcs[0] if funcs else None,
+                        n_tasks=len(funcs),
+                        error=isinstance(e, self.retry_exceptions),
+                    )
+                if isinstance(e, self.retry_exceptions):
+                    failed = True
+                raise
+            if self.concurrency_limiter is not None:
+                self.concurrency_limiter.release(
+                    start_time,
+                    func=funcs[0] if funcs else None,
+                    n_tasks=len(funcs),
+                    error=self.is_overload_status(response.status_code),
+                )
+            failed = self.retry_policy.is_retryable_status(response.status_code)
+        finally:
+            self.retry_policy.record_outcome(funcs=funcs, failed=failed)
+        if failed:
+            raise RetryableStatusError(
+                status_code=response.status_code,
+                headers=response.headers,
+                response=response,
+            )
+        return response
+
+    @staticmethod
+    def create_request_body(payload: dict):
+        """
+        Get request body args for a payload: a streamed body for payloads holding file contents
+        to upload (see utils.upload_utils.FileContent), json otherwise
+        :param payload: api payload
+        :return:
+        """
+        if utils.upload_utils.has_file_contents(payload):
+            return {'data': utils.upload_utils.StreamedBody(payload)}
+        return {'json': payload}
+
+    @property
+    def retry_exceptions(self):
+        """
+        Exceptions of the http transport worth retrying
+        """
+        import requests
+        return (requests.ConnectionError, requests.Timeout)
+
+    def is_idempotent(self, funcs: list):
+        """
+        Whether all tasks in a payload call idempotent endpoints
+        :param funcs: endpoints of the tasks in the payload
+        :return:
+        """
+        return (len(funcs) > 0) and all([func in self.IDEMPOTENT_FUNCS for func in funcs])
+
+    def send_hedged_request(self, payload: dict, funcs: list, method: str = 'POST', timeout: int = 15 * 60):
+        """
+        Make a single attempt at an api call, hedged with a duplicate call if hedging is on,
+        the payload only calls idempotent endpoints, and the first call is slow
+        """
+        if (self.hedging_policy is None) or (not self.is_idempotent(funcs)):
+            return self.send_request(payload=payload, funcs=funcs, method=method, timeout=timeout)
+        ## hedged calls run on a pool of their own, so that they can't queue behind callers running on the 'short' pool
+        executor = None
+        if 'hedge' in self.executor_pool.pool_sizes:
+            executor = self.executor_pool.get_executor(pool_name='hedge')
+        response = self.hedging_policy.run(
+            fn=lambda: self.send_request(payload=payload, funcs=funcs, method=method, timeout=timeout),
+            func=funcs[0],
+            executor=executor,
+        )
+        return response
+
+    def get_cache_key(self, payload: dict):
+        """
+        Get key of a payload in the local response cache;
+        None if caching is off, the payload calls endpoints that are not cacheable, or asks to overwrite outputs
+        :param payload: api payload
+        :return:
+        """
+        if self.response_cache is None:
+            return None
+        tasks = list(payload.get('tasks', {}).values())
+        if len(tasks) == 0:
+            return None
+        for task in tasks:
+            if task.get('func') not in self.CACHEABLE_FUNCS:
+                return None
+            if task.get('overwrite') or task.get('overwrite_base_output'):
+                return None
+        cache_key = hash_key([
+            [task.get('func'), task.get('args'), task.get('return_data'), task.get('task_mode')]
+            for task in tasks
+        ])
+        return cache_key
+
+    def get_cache_ttl(self, payload: dict):
+        """
+        Get time-to-live of a payload's response in the local cache: the shortest ttl of its tasks
+        :param payload: api payload
+        :return:
+        """
+        ttls = [self.CACHEABLE_FUNCS.get(func) for func in self.get_payload_funcs(payload)]
+        if 'ttl' in ttls:
+            return self.cache_ttl
+        return None
+
+    def cache_response(self, cache_key: str, payload: dict, bg_resp: ByteGenieResponse):
+        """
+        Cache a response locally, if it holds output data for all its tasks
+        :param cache_key: cache key of the payload, from get_cache_key()
+        :param payload: api payload
+        :param bg_resp: api response
+        :return:
+        """
+        if cache_key is None:
+            return
+        if len(bg_resp.get_task_keys()) != len(payload.get('tasks', {})):
+            return
+        for task_resp in bg_resp.split_tasks():
+            data = task_resp.get_data()
+            if (task_resp.get_status() != 'successful') or (data is None) or (data is False):
+                return
+        self.response_cache.put(
+            key=cache_key,
+            response=bg_resp.response,
+            ttl=self.get_cache_ttl(payload),
         )
+
+    def get_cache_stats(self):
+        """
+        Get hits, misses and size of the local response cache
+        :return:
+        """
+        if self.response_cache is not None:
+            return self.response_cache.get_stats()
+
+    def get_coalesce_key(self, payload: dict):
+        """
+        Get key identifying identical calls, to coalesce them while in flight;
+        None if coalescing is off, or the payload calls endpoints that are not idempotent, or asks to overwrite outputs
+        :param payload: api payload
+        :return:
+        """
+        if self.single_flight is None:
+            return None
+        if not self.is_idempotent(self.get_payload_funcs(payload)):
+            return None
+        tasks = list(payload.get('tasks', {}).values())
+        for task in tasks:
+            if task.get('overwrite') or task.get('overwrite_base_output'):
+                return None
+        return hash_key([self.api_url, self.api_key, payload.get('tasks')])
+
+    def get_coalesce_stats(self):
+        """
+        Get number of idempotent calls, and number of them coalesced with an identical in-flight call
+        :return:
+        """
+        if self.single_flight is not None:
+            return self.single_flight.get_stats()
+
+    def create_memo_plan(self, payload: dict):
+        """
+        Look up outputs of a deterministic call (MEMO_FUNCS) in the memo store.
+        For endpoints taking a list of records, records are looked up individually,
+        and the returned plan holds a payload with only the records not found in the store.
+        :param payload: api payload
+        :return: memo plan, or None if the payload cannot be memoized
+        """
+        if self.memo_store is None:
+            return None
+        tasks = list(payload.get('tasks', {}).values())
+        if len(tasks) != 1:
+            return None
+        task = tasks[0]
+        func = task.get('func')
+        if func not in self.MEMO_FUNCS:
+            return None
+        if task.get('overwrite') or task.get('overwrite_base_output'):
+            return None
+        args = task.get('args', {})
+        items_arg = self.MEMO_FUNCS[func]
+        items = args.get(items_arg) if items_arg is not None else None
+        if (not isinstance(items, list)) or (not all([isinstance(item, dict) for item in items])):
+            ## memoize the call as a whole
+            key = hash_key([func, args])
+            values = self.memo_store.get_many([key])
+            plan = {
+                'func': func,
+                'args': args,
+                'items_arg': None,
+                'keys': [key],
+                'values': values,
+                'payload': payload if key not in values else None,
+            }
+            return plan
+        ## output records can only be merged if they are returned with the response
+        if (task.get('task_mode') != 'sync') or (not task.get('return_data')):
+            return None
+        other_args = {arg: val for arg, val in args.items() if arg != items_arg}
+        keys = [hash_key([func, other_args, item]) for item in items]
+        values = self.memo_store.get_many(keys)
+        miss_items = {}
+        for key, item in zip(keys, items):
+            if (key not in values) and (key not in miss_items):
+                miss_items[key] = item
+        if len(miss_items) > 0:
+            miss_payload = {
+                **payload,
+                'tasks': {'task_1': {**task, 'args': {**args, items_arg: list(miss_items.values())}}},
+            }
+        else:
+            miss_payload = None
+        plan = {
+            'func': func,
+            'args': args,
+            'items_arg': items_arg,
+            'keys': keys,
+            'values': values,
+            'miss_items': miss_items,
+            'payload': miss_payload,
+        }
+        return plan
+
+    @staticmethod
+    def create_local_response(func: str, args: dict, data):
+        """
+        Create a response holding output data computed, or memoized, locally
+        """
+        resp = {
+            'response': {
+                'task_1': {
+                    'status': 'successful',
+                    'data': data,
+                    'task': {'func': func, 'args': args},
+                },
+            },
+        }
+        return ByteGenieResponse(resp)
+
+    def merge_memo_response(self, plan: dict, bg_resp: ByteGenieResponse = None):
+        """
+        Store outputs of a call made for a memo plan, and merge them with outputs found in the memo store
+        :param plan: memo plan, from create_memo_plan()
+        :param bg_resp: response to the plan's payload (None if all outputs were found in the store)
+        :return: merged response; if outputs of the call could not be matched to its input records,
+            the response as it is, or None if it is missing outputs found in the store
+        """
+        func = plan['func']
+        values = plan['values']
+        if bg_resp is not None:
+            data = bg_resp.get_data()
+            if (bg_resp.get_status() != 'successful') or (data is None):
+                return bg_resp
+            if plan['items_arg'] is None:
+                self.memo_store.put(plan['keys'][0], data, func=func)
+                return bg_resp
+            if isinstance(data, dict):
+                import pandas as pd
+                data = pd.DataFrame(data).to_dict('records')
+            miss_keys = list(plan['miss_items'].keys())
+            miss_items = list(plan['miss_items'].values())
+            ## match output records to input records by the values of input columns;
+            ## outputs are only memoized if every output record matches exactly one input record, and vice versa
+            item_cols = list(miss_items[0].keys())
+            key_by_item = {hash_key(item): key for key, item in zip(miss_keys, miss_items)}
+            new_values = {}
+            n_unmatched = 0
+            for record in data:
+                key = None
+                if isinstance(record, dict):
+                    key = key_by_item.get(hash_key({col: record.get(col) for col in item_cols}))
+                if (key is None) or (key in new_values):
+                    n_unmatched += 1
+                    continue
+                new_values[key] = record
+            if n_unmatched or (len(new_values) < len(miss_keys)):
+                if self.verbose:
+                    logger.warning(f"Could not match outputs of {func} to its inputs; not memoizing them")
+                ## the response is complete as it is, if its payload was the original one
+                ## (no outputs from the memo store to merge, and no duplicate input records dropped)
+                if (not len(values)) and (len(miss_keys) == len(plan['keys'])):
+                    return bg_resp
+                return None
+            self.memo_store.put_many(new_values, func=func)
+            values = {**values, **new_values}
+        if plan['items_arg'] is None:
+            return self.create_local_response(func=func, args=plan['args'], data=values[plan['keys'][0]])
+        data = [values[key] for key in plan['keys']]
+        if bg_resp is None:
+            return self.create_local_response(func=func, args=plan['args'], data=data)
+        bg_resp.set_response_attr(attr='data', attr_val=data)
+        return bg_resp
+
+    def get_memo_stats(self):
+        """
+        Get hits, misses and number of entries of the memo store
+        :return:
+        """
+        if self.memo_store is not None:
+            return self.memo_store.get_stats()
+
+    def call_api(self, payload: dict, method: str = 'POST', timeout: int = 15 * 60):
+        plan = self.create_memo_plan(payload)
+        if plan is None:
+            bg_resp = self.fetch_response(payload=payload, method=method, timeout=timeout)
+        else:
+            bg_resp = None
+            if plan['payload'] is not None:
+                bg_resp = self.fetch_response(payload=plan['payload'], method=method, timeout=timeout)
+            bg_resp = self.merge_memo_response(plan=plan, bg_resp=bg_resp)
+            if bg_resp is None:
+                bg_resp = self.fetch_response(payload=payload, method=method, timeout=timeout)
+        ## read task outputs with the shared client (default settings) for this client's credentials
+        bg_resp.client = self.get_sync_client()
+        return bg_resp
+
+    def fetch_response(self, payload: dict, method: str = 'POST', timeout: int = 15 * 60):
+        """
+        Get the response to a payload, from the local cache, an identical in-flight call, or the api
+        :param payload: api payload
+        :param method: http method
+        :param timeout: timeout value for each attempt
+        :return:
+        """
+        cache_key = self.get_cache_key(payload)
+        if cache_key is not None:
+            cached_resp = self.response_cache.get(cache_key)
+            if cached_resp is not None:
+                return ByteGenieResponse(cached_resp)
+        coalesce_key = self.get_coalesce_key(payload)
+        if coalesce_key is not None:
+            bg_resp = self.single_flight.do(
+                key=coalesce_key,
+                fn=lambda: self.make_api_call(payload=payload, method=method, timeout=timeout, cache_key=cache_key),
+            )
+            return bg_resp
+        bg_resp = self.make_api_call(payload=payload, method=method, timeout=timeout, cache_key=cache_key)
+        return bg_resp
+
+    def make_api_call(self, payload: dict, method: str = 'POST', timeout: int = 15 * 60, cache_key: str = None):
+        """
+        Call the api, retrying failed attempts as per the client's retry policy
+        :param payload: api payload
+        :param method: http method
+        :param timeout: timeout value for each attempt
+        :param cache_key: key to cache the response under, if cacheable
+        :return:
+        """
+        response = self.fetch_raw_response(payload=payload, method=method, timeout=timeout)
         try:
             json_resp = response.json()
             ## convert to byte-genie resp
             bg_resp = ByteGenieResponse(json_resp)
+            self.cache_response(cache_key=cache_key, payload=payload, bg_resp=bg_resp)
         except Exception as e:
             json_resp = {'payload': payload, 'error': e}
             ## convert to byte-genie resp
             bg_resp = ByteGenieResponse(json_resp)
         return bg_resp
 
+    def fetch_raw_response(self, payload: dict, method: str = 'POST', timeout: int = 15 * 60):
+        """
+        Call the api, retrying failed attempts as per the client's retry policy, and return the http response,
+        without decoding it
+        :param payload: api payload
+        :param method: http method
+        :param timeout: timeout value for each attempt
+        :return:
+        """
+        funcs = self.get_payload_funcs(payload)
+        self.retry_policy.check_circuits(funcs=funcs)
+        deadline = self.retry_policy.get_deadline()
+        retrying = self.retry_policy.create_retrying(
+            funcs=funcs,
+            retry_exceptions=self.retry_exceptions,
+        )
+        try:
+            for attempt in retrying:
+                with attempt:
+                    response = self.send_hedged_request(
+                        payload=payload,
+                        funcs=funcs,
+                        method=method,
+                        timeout=self.retry_policy.get_attempt_timeout(timeout=timeout, deadline=deadline),
+                    )
+        except RetryableStatusError as e:
+            ## retries exhausted: return the last response
+            response = e.response
+        return response
+
+    def get_hedging_stats(self):
+        """
+        Get number of calls, hedges sent, hedges that won, and current hedging delay per endpoint
+        :return:
+        """
+        if self.hedging_policy is not None:
+            return self.hedging_policy.get_stats()
+
+    def get_retry_stats(self):
+        """
+        Get number of retries, retry budget exhaustion count, and circuit breaker state per endpoint
+        :return:
+        """
+        return self.retry_policy.get_stats()
+
+    @staticmethod
+    def is_overload_status(status_code: int):
+        """
+        Whether an http status code signals that the backend is overloaded or unhealthy
+        :param status_code: http status code
+        :return:
+        """
+        return (status_code == 429) or (status_code >= 500)
+
+    def get_concurrency_stats(self):
+        """
+        Get current concurrency limit, number of in-flight calls, and queue depth of the client's concurrency limiter
+        :return:
+        """
+        if self.concurrency_limiter is not None:
+            return self.concurrency_limiter.get_stats()
+
+    def get_pool_stats(self):
+        """
+        Get connection pool statistics of the client's http transport
+        :return:
+        """
+        return self.transport.get_pool_stats()
+
+    def get_async_executor(self, func_name: str):
+        """
+        Get the thread pool to run a blocking method on, when called through its async_* version (see to_async())
+        :param func_name: name of the method, e.g. 'async_read_file' or 'read_file'
+        :return:
+        """
+        if func_name.startswith('async_'):
+            func_name = func_name[len('async_'):]
+        return self.executor_pool.get_executor(func=func_name)
+
+    def is_retryable_error(self, error: Exception):
+        """
+        Whether a failed call is worth retrying: after connection errors, timeouts, retryable http statuses,
+        or while an endpoint's circuit breaker is open
+        :param error: error raised by the call
+        :return:
+        """
+        retryable_errors = (RetryableStatusError, CircuitOpenError, TimeoutError, asyncio.TimeoutError)
+        return isinstance(error, retryable_errors + self.retry_exceptions)
+
+    def map(
+            self,
+            endpoint: str,
+            kwargs_list: list,
+            concurrency: int = 16,
+            rate: float = None,
+            timeout: float = None,
+            progress_interval: float = 10,
+    ):
+        """
+        Call an endpoint once per input, concurrently, and collect results aligned with inputs.
+        Errors do not stop other calls: they are collected, with the inputs that failed, in the results.
+        Usage:
+            results = bg.map('extract_doc_info', [{'doc_name': doc_name} for doc_name in doc_names], concurrency=16)
+            outputs = results.get_output()
+            failures = results.get_failure_report()
+            results_retried = bg.map('extract_doc_info', results.get_retry_kwargs())
+        :param endpoint: name of the endpoint method, e.g. 'read_file'
+        :param kwargs_list: list of keyword arguments, one dict per call
+        :param concurrency: max number of calls running at a time
+        :param rate: max number of calls started per second (None for no limit)
+        :param timeout: max time (in seconds) to wait for each call (not counting the wait for `rate`);
+            a call that times out fails with a timeout error, but as its thread can't be interrupted,
+            it keeps its concurrency slot until the thread is done
+        :param progress_interval: time (in seconds) between progress logs (None to not log progress)
+        :return: ByteGenieMapResults
+        """
+        results = utils.async_utils.get_runner().run(self.async_map(
+            endpoint=endpoint,
+            kwargs_list=kwargs_list,
+            concurrency=concurrency,
+            rate=rate,
+            timeout=timeout,
+            progress_interval=progress_interval,
+        ))
+        return results
+
+    async def async_map(
+            self,
+            endpoint: str,
+            kwargs_list: list,
+            concurrency: int = 16,
+            rate: float = None,
+            timeout: float = None,
+            progress_interval: float = 10,
+    ):
+        """
+        Coroutine version of map(): blocking endpoint methods run on the client's thread pools,
+        and coroutine endpoint methods (e.g. of ByteGenieAsync) are awaited
+        """
+        if endpoint.startswith('_') or (not callable(getattr(self, endpoint, None))):
+            raise ValueError(f"{endpoint} is not an endpoint of {type(self).__name__}")
+        method = getattr(self, endpoint)
+        kwargs_list = list(kwargs_list)
+        n_calls = len(kwargs_list)
+        responses = [None] * n_calls
+        errors = {}
+        retryable = set()
+        bucket = TokenBucket(rate=rate) if rate else None
+        loop = asyncio.get_running_loop()
+        start_time = time.monotonic()
+        progress = {'n_done': 0, 'last_log_time': start_time}
+
+        async def await_endpoint(kwargs: dict):
+            resp = method(**kwargs)
+            return (await resp) if inspect.iscoroutine(resp) else resp
+
+        async def call_endpoint(kwargs: dict):
+            if bucket is not None:
+                await bucket.async_acquire()
+            ## endpoint methods of clients with a coroutine call_api (e.g. ByteGenieAsync) return coroutines
+            if inspect.iscoroutinefunction(self.call_api):
+                return await asyncio.wait_for(await_endpoint(kwargs), timeout)
+            future = loop.run_in_executor(self.get_async_executor(endpoint), functools.partial(method, **kwargs))
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), timeout)
+            except asyncio.TimeoutError:
+                ## a thread can't be interrupted: keep the call's slot until its thread is done,
+                ## so that no more than `concurrency` calls run at a time, then fail the call with the timeout
+                await asyncio.wait([future])
+                if not future.cancelled():
+                    future.exception()
+                raise
+
+        async def run_call(pos: int):
+            try:
+                resp = await call_endpoint(kwargs_list[pos])
+                responses[pos] = resp
+                status = resp.get_status() if isinstance(resp, ByteGenieResponse) else None
+                if status not in [None, 'successful', 'scheduled']:
+                    errors[pos] = RuntimeError(f"{endpoint} task status: {status}")
+            except Exception as e:
+                errors[pos] = e
+                if self.is_retryable_error(e):
+                    retryable.add(pos)
+            progress['n_done'] += 1
+            now = time.monotonic()
+            if (progress_interval is not None) and self.verbose and (
+                    (now - progress['last_log_time'] >= progress_interval) or (progress['n_done'] == n_calls)
+            ):
+                progress['last_log_time'] = now
+                logger.info(f"{endpoint}: {progress['n_done']}/{n_calls} calls done "
+                            f"({len(errors)} failed, {len(retryable)} retryable) in {now - start_time:.0f}s")
+
+        await utils.async_utils.gather_bounded(
+            [functools.partial(run_call, pos) for pos in range(n_calls)],
+            concurrency=concurrency,
+        )
+        results = ByteGenieMapResults(
+            endpoint=endpoint,
+            kwargs_list=kwargs_list,
+            responses=responses,
+            errors=errors,
+            retryable=retryable,
+        )
+        return results
+
+    def build_frame(self, outputs: list, columns: list = None, strip_strings: int = 0):
+        """
+        Build one dataframe from task outputs, e.g. from `resps.get_output()` after reading many files.
+        To read many files into a dataframe, read_files_frame() decodes responses in worker processes instead.
+        :param outputs: task outputs, each a list of records, or a dict of columns (None outputs are skipped)
+        :param columns: if set, keep only these columns (those present in the outputs)
+        :param strip_strings: whether to strip whitespace from string values
+        :return:
+        """
+        return self.frame_builder.build_frame(outputs=outputs, columns=columns, strip_strings=strip_strings)
+
+    async def async_build_frame(self, outputs: list, columns: list = None, strip_strings: int = 0):
+        """
+        Build one dataframe from task outputs, without blocking the event loop, so that building dataframes
+        overlaps with api calls made on the loop (see build_frame())
+        """
+        return await self.frame_builder.async_build_frame(
+            outputs=outputs,
+            columns=columns,
+            strip_strings=strip_strings,
+            executor=self.get_async_executor('build_frame'),
+        )
+
+    def get_executor_stats(self):
+        """
+        Get queued, running and completed calls per thread pool running async_* methods
+        (pools are shared with other clients created with the same pool sizes)
+        :return:
+        """
+        return self.executor_pool.get_stats()
+
     @utils.async_utils.to_async
     def async_call_api(
             self,
@@ -483,7 +2039,7 @@ class ByteGenie:
                     if isinstance(resp, dict):
                         if 'data' in resp.keys():
                             resp = resp['data']
-                            for i in np.arange(0, 2, 1):
+                            for i in range(2):
                                 if isinstance(resp, dict):
                                     if 'data' in resp.keys():
                                         resp = resp['data']
@@ -523,27 +2079,80 @@ class ByteGenie:
             self,
             text: str,
             timeout: int = 15 * 60,
+            local: int = 1,
+            verify: int = 0,
     ):
         """
         Slugify text
-        :param text: text to slugify
+        :param text: text to slugify (a string, or a list/Series of strings)
         :param timeout: timeout value for api call
+        :param local: whether to slugify locally (see utils.common.slugify), instead of calling the api
+        :param verify: whether to also slugify via the api, and log any differences from local output;
+            the api output is returned
         :return:
         """
         func = 'slugify'
-        args = {
-            'text': text,
-        }
-        payload = self.create_api_payload(
-            func=func,
-            args=args,
-        )
-        resp = self.call_api(
-            payload=payload,
-            timeout=timeout,
-        )
+        if local:
+            local_resp = self.create_local_response(
+                func=func,
+                args={'text': text},
+                data=utils.common.slugify_values(text),
+            )
+            if not verify:
+                return local_resp
+        if isinstance(text, (list, tuple)) or utils.common.is_series(text):
+            ## slugify each value via the api, in as few requests as possible
+            batch = self.create_batch()
+            for text_ in list(text):
+                batch.slugify(text=text_, local=0)
+            resps = batch.execute()
+            resp = self.create_local_response(
+                func=func,
+                args={'text': text},
+                data=[resp_.get_data() for resp_ in resps],
+            )
+        else:
+            args = {
+                'text': text,
+            }
+            payload = self.create_api_payload(
+                func=func,
+                args=args,
+            )
+            resp = self.call_api(
+                payload=payload,
+                timeout=timeout,
+            )
+        if local:
+            self.compare_slugify_outputs(text=text, local_output=local_resp.get_data(), api_output=resp.get_data())
         return resp
 
+    def compare_slugify_outputs(self, text, local_output, api_output):
+        """
+        Log differences between local and api slugify outputs
+        :param text: slugified text (a string, or a list/Series of strings)
+        :param local_output: local slugify output
+        :param api_output: api slugify output
+        :return: list of (text, local output, api output) for all values where outputs differ
+        """
+        if isinstance(text, (list, tuple)) or utils.common.is_series(text):
+            texts = list(text)
+            local_outputs = list(local_output)
+            api_outputs = list(api_output) if isinstance(api_output, list) else [None] * len(texts)
+        else:
+            texts = [text]
+            local_outputs = [local_output]
+            api_outputs = [api_output]
+        diffs = [
+            (text_, local_output_, api_output_)
+            for text_, local_output_, api_output_ in zip(texts, local_outputs, api_outputs)
+            if local_output_ != api_output_
+        ]
+        if len(diffs) > 0:
+            logger.warning(f"Local slugify output differs from api output for {len(diffs)}/{len(texts)} values, "
+                           f"e.g. (text, local, api): {diffs[:5]}")
+        return diffs
+
     def upload_data(
             self,
             contents: list,
@@ -553,7 +2162,8 @@ class ByteGenie:
     ):
         """
         Upload files
-        :param contents: file contents to upload
+        :param contents: file contents to upload, as base64 strings (see utils.common.convert_file_content_to_bytes()),
+            or as `utils.upload_utils.FileContent` objects, which are streamed from disk while the request is sent
         :param filenames: file names for uploaded file contents
         :param username: user name
         :param timeout: timeout value for api call
@@ -597,6 +2207,183 @@ class ByteGenie:
             if self.verbose:
                 logger.info(f"Error in upload_data(): {e}")
 
+    def upload_files(
+            self,
+            file_paths: list = None,
+            directory: str = None,
+            filenames: list = None,
+            username: str = None,
+            recursive: int = 0,
+            max_batch_size: int = 64 * 1024 ** 2,
+            max_batch_files: int = 50,
+            max_workers: int = 4,
+            manifest_file: str = None,
+            upload_index_file: str = None,
+            timeout: int = 15 * 60,
+    ):
+        """
+        Upload local files, with bounded memory: file contents are streamed from disk in chunks while being sent,
+        files are split into batches capped by size and number of files, and batches are uploaded concurrently
+        :param file_paths: local files to upload
+        :param directory: local directory to upload files from (if file_paths is not given)
+        :param filenames: file names for uploaded files (defaults to the base names of file_paths)
+        :param username: user name
+        :param recursive: whether to also upload files in sub-directories of directory
+        :param max_batch_size: max total size of (base64-encoded) file contents uploaded per api call, in bytes
+        :param max_batch_files: max number of files uploaded per api call
+        :param max_workers: max number of batches uploaded concurrently
+        :param manifest_file: if set, record uploaded files in this local manifest (see utils.upload_utils.UploadManifest),
+            and skip files it records as uploaded, so that re-running an interrupted upload only uploads missing files
+        :param upload_index_file: if set, skip files whose content was uploaded before (under any name),
+            as recorded in this local index of content hashes (see utils.upload_utils.UploadIndex),
+            and still listed by show_uploads
+        :param timeout: timeout value for each api call
+        :return: one response per batch
+        """
+        if file_paths is None:
+            file_paths = utils.upload_utils.list_upload_files(directory=directory, recursive=recursive)
+        if filenames is None:
+            filenames = [os.path.basename(file_path) for file_path in file_paths]
+        if username is None:
+            username = self.read_username()
+        manifest = None
+        if manifest_file is not None:
+            manifest = utils.upload_utils.UploadManifest(manifest_file=manifest_file)
+        upload_index = None
+        if upload_index_file is not None:
+            upload_index = utils.upload_utils.UploadIndex(index_file=upload_index_file)
+            if upload_index.get_doc_names(username) is None:
+                doc_names = self.get_uploaded_doc_names(username=username)
+                if doc_names is not None:
+                    upload_index.set_doc_names(username=username, doc_names=doc_names)
+        file_paths, filenames = self.select_upload_files(
+            file_paths=file_paths,
+            filenames=filenames,
+            username=username,
+            manifest=manifest,
+            upload_index=upload_index,
+        )
+        filename_by_path = dict(zip(file_paths, filenames))
+        batches = utils.upload_utils.create_upload_batches(
+            file_paths=file_paths,
+            max_batch_size=max_batch_size,
+            max_batch_files=max_batch_files,
+        )
+
+        def upload_batch(batch_num: int, batch: list):
+            try:
+                resp = self.upload_data(
+                    contents=[utils.upload_utils.FileContent(file_path) for file_path in batch],
+                    filenames=[filename_by_path[file_path] for file_path in batch],
+                    username=username,
+                    timeout=timeout,
+                )
+            except Exception as e:
+                if self.verbose:
+                    logger.error(f"Error in upload_files() for batch {batch_num + 1}/{len(batches)}: {e}")
+                resp = ByteGenieResponse({'payload': {'file_paths': batch}, 'error': e}, client=self.get_sync_client())
+            if not utils.upload_utils.is_upload_successful(resp):
+                return resp
+            self.record_uploaded_files(
+                file_paths=batch,
+                filenames=[filename_by_path[file_path] for file_path in batch],
+                username=username,
+                manifest=manifest,
+                upload_index=upload_index,
+            )
+            if self.verbose:
+                logger.info(f"Uploaded batch {batch_num + 1}/{len(batches)} ({len(batch)} files)")
+            return resp
+
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=max(1, min(max_workers, len(batches))),
+                thread_name_prefix='byte-genie-upload',
+        ) as executor:
+            resps = list(executor.map(upload_batch, range(len(batches)), batches))
+        return ByteGenieResponses(responses=resps)
+
+    def get_uploaded_doc_names(self, username: str, timeout: int = 5 * 60):
+        """
+        List doc names of files uploaded by a user (with show_uploads), whatever the task mode of this client
+        :param username: user name
+        :param timeout: timeout value for the api call
+        :return: list of doc names, or None if uploads could not be listed
+        """
+        resp = self.get_sync_client().show_uploads(username=username, timeout=timeout)
+        uploads = resp.get_output()
+        if isinstance(uploads, dict) and all([isinstance(vals, list) for vals in uploads.values()]):
+            import pandas as pd
+            uploads = pd.DataFrame(uploads).to_dict('records')
+        if not isinstance(uploads, list):
+            if self.verbose:
+                logger.warning(f"Could not list uploads of {username} (status: {resp.get_status()}); "
+                               f"not skipping files uploaded before")
+            return None
+        doc_names = [upload.get('doc_name') for upload in uploads if isinstance(upload, dict)]
+        return doc_names
+
+    def select_upload_files(
+            self,
+            file_paths: list,
+            filenames: list,
+            username: str,
+            manifest=None,
+            upload_index=None,
+    ):
+        """
+        Select files to upload, skipping files already uploaded as per an upload manifest, or an upload index
+        :param file_paths: local file paths
+        :param filenames: file names for the files
+        :param username: user name
+        :param manifest: `utils.upload_utils.UploadManifest` of files uploaded by earlier (interrupted) uploads
+        :param upload_index: `utils.upload_utils.UploadIndex` of uploaded file contents
+        :return: (file paths, file names) of files to upload
+        """
+        n_files = len(file_paths)
+        if manifest is not None:
+            file_paths, filenames = manifest.get_pending(file_paths=file_paths, filenames=filenames, username=username)
+            if self.verbose and (len(file_paths) < n_files):
+                logger.info(f"Resuming upload: {n_files - len(file_paths)}/{n_files} files already uploaded")
+        if upload_index is not None:
+            file_paths, filenames, duplicates = upload_index.get_duplicates(
+                file_paths=file_paths,
+                filenames=filenames,
+                username=username,
+            )
+            upload_index.save()
+            if self.verbose and len(duplicates):
+                logger.info(f"Skipping {len(duplicates)}/{n_files} files whose content is already uploaded, "
+                            f"e.g. (file, doc_name): {list(duplicates.items())[:5]}")
+        return file_paths, filenames
+
+    @staticmethod
+    def record_uploaded_files(
+            file_paths: list,
+            filenames: list,
+            username: str,
+            manifest=None,
+            upload_index=None,
+    ):
+        """
+        Record files as uploaded, in an upload manifest and/or an upload index
+        :param file_paths: local file paths
+        :param filenames: file names the files were uploaded under
+        :param username: user name
+        :param manifest: `utils.upload_utils.UploadManifest`
+        :param upload_index: `utils.upload_utils.UploadIndex`
+        :return:
+        """
+        if manifest is not None:
+            manifest.mark_uploaded(file_paths=file_paths, filenames=filenames, username=username)
+        if upload_index is not None:
+            for file_path, filename in zip(file_paths, filenames):
+                upload_index.add(
+                    file_hash=upload_index.get_file_hash(file_path),
+                    doc_name=utils.upload_utils.get_upload_doc_name(filename=filename, username=username),
+                    username=username,
+                )
+            upload_index.save()
+
     def list_files(
             self,
             root_dir: str,
@@ -767,6 +2554,198 @@ class ByteGenie:
         )
         return resp
 
+    def check_files_exist(
+            self,
+            files: list,
+            batch_size: int = 100,
+            timeout: int = 15 * 60,
+    ):
+        """
+        Check if files exist, packing batch_size files per api request
+        :param files: files to check
+        :param batch_size: max number of files to check per api request
+        :param timeout: timeout value for api calls
+        :return: dict of {file: whether the file exists}; files whose check failed are reported as not existing
+        """
+        files = list(dict.fromkeys(files))
+        batch = self.get_sync_client().create_batch(batch_size=batch_size)
+        for file in files:
+            batch.check_file_exists(file=file, timeout=timeout)
+        resps = batch.execute()
+        files_exist = {file: bool(resp.get_data()) for file, resp in zip(files, resps)}
+        return files_exist
+
+    @to_async
+    def async_check_files_exist(
+            self,
+            files: list,
+            batch_size: int = 100,
+            timeout: int = 15 * 60,
+    ):
+        try:
+            resp = self.check_files_exist(
+                files=files,
+                batch_size=batch_size,
+                timeout=timeout,
+            )
+            return resp
+        except Exception as e:
+            if self.verbose:
+                logger.error(f"Error in check_files_exist(): {e}")
+
+    def wait_for_files(
+            self,
+            files: list,
+            wait_interval: float = 5,
+            max_interval: float = 60,
+            wait_time_max: float = 15 * 60,
+            batch_size: int = 100,
+            timeout: int = 15 * 60,
+    ):
+        """
+        Wait for files to exist, e.g. output files of scheduled tasks.
+        Each round checks all pending files in a few batched api requests (see check_files_exist()),
+        and drops files that exist from later rounds; the wait between rounds grows exponentially, with jitter.
+        :param files: files to wait for
+        :param wait_interval: wait time (in seconds) after the first round
+        :param max_interval: max wait time (in seconds) between rounds
+        :param wait_time_max: max total wait time (in seconds)
+        :param batch_size: max number of files to check per api request
+        :param timeout: timeout value for api calls
+        :return: dict of {file: whether the file exists}
+        """
+        files_exist = {file: False for file in files}
+        rounds = PollingRounds(
+            items=list(files_exist.keys()),
+            wait_interval=wait_interval,
+            max_interval=max_interval,
+            wait_time_max=wait_time_max,
+        )
+        while len(rounds.pending):
+            try:
+                round_files_exist = self.check_files_exist(
+                    files=rounds.pending,
+                    batch_size=batch_size,
+                    timeout=timeout,
+                )
+            except Exception as e:
+                if self.verbose:
+                    logger.warning(f"Error in wait_for_files(): {e}")
+                round_files_exist = {}
+            done = [file for file, exists in round_files_exist.items() if exists]
+            files_exist.update({file: True for file in done})
+            rounds.update(done=done)
+            wait_time = rounds.next_wait()
+            if wait_time is None:
+                break
+            if self.verbose:
+                logger.info(f"{len(files_exist) - len(rounds.pending)}/{len(files_exist)} files exist; "
+                            f"checking again in {wait_time:.1f}s")
+            time.sleep(wait_time)
+        return files_exist
+
+    def read_files_frame(
+            self,
+            files: list,
+            add_file: int = None,
+            columns: list = None,
+            strip_strings: int = 0,
+            batch_size: int = 20,
+            timeout: int = 15 * 60,
+            return_failures: int = 0,
+    ):
+        """
+        Read many files into one dataframe, with rows in the order of files.
+        Files are read in batched api requests, sent concurrently, and raw responses are decoded and built into
+        dataframes as they arrive; with frame_workers > 0, this happens in worker processes, which pass dataframes
+        back as Arrow buffers (see utils.frame_utils.FrameBuilder), so parsing uses all cores,
+        and overlaps with reading further files.
+        Responses are not cached, memoized or coalesced.
+        :param files: files to read
+        :param add_file: whether to add file path in the returned data
+        :param columns: if set, keep only these columns
+        :param strip_strings: whether to strip whitespace from string values
+        :param batch_size: max number of files to read per api request
+        :param timeout: timeout value for api calls
+        :param return_failures: whether to return files that could not be read with the dataframe,
+            instead of raising an error if any file could not be read
+        :return: dataframe, and with return_failures, a report of files that could not be read
+            (a list of dicts with file, error and error_type, as in ByteGenieMapResults.get_failure_report())
+        """
+        files = list(files)
+        client = self.get_sync_client()
+        batch = client.create_batch(batch_size=batch_size)
+        for file in files:
+            batch.read_file(file=file, add_file=add_file, timeout=timeout)
+        payloads = batch.create_payloads()
+        executor = self.get_async_executor('read_file')
+
+        def fetch_content(payload: dict):
+            response = client.fetch_raw_response(payload=payload, timeout=timeout)
+            ## error responses have no task outputs to flag as missing, so fail their files here
+            if response.status_code >= 400:
+                raise RuntimeError(f"api returned http status {response.status_code}")
+            return response.content
+
+        def iter_contents():
+            fetch_futures = [executor.submit(fetch_content, payload) for payload in payloads]
+            for future in fetch_futures:
+                try:
+                    yield future.result()
+                except Exception as e:
+                    yield e
+
+        df, failures = self.frame_builder.build_frame_from_responses(
+            contents=iter_contents(),
+            columns=columns,
+            strip_strings=strip_strings,
+            return_failures=1,
+        )
+        ## payloads hold batch_size files each, in the order of files
+        failure_report = []
+        for failure in failures:
+            payload_files = files[failure['response'] * batch_size:(failure['response'] + 1) * batch_size]
+            if failure['task'] is not None:
+                payload_files = payload_files[failure['task']:failure['task'] + 1]
+            failure_report = failure_report + [
+                {'file': file, 'error': str(failure['error']), 'error_type': type(failure['error']).__name__}
+                for file in payload_files
+            ]
+        if return_failures:
+            return df, failure_report
+        if len(failure_report):
+            raise RuntimeError(
+                f"{len(failure_report)}/{len(files)} files could not be read, "
+                f"e.g. {failure_report[0]['file']}: {failure_report[0]['error']}"
+            )
+        return df
+
+    @to_async
+    def async_read_files_frame(
+            self,
+            files: list,
+            add_file: int = None,
+            columns: list = None,
+            strip_strings: int = 0,
+            batch_size: int = 20,
+            timeout: int = 15 * 60,
+            return_failures: int = 0,
+    ):
+        try:
+            resp = self.read_files_frame(
+                files=files,
+                add_file=add_file,
+                columns=columns,
+                strip_strings=strip_strings,
+                batch_size=batch_size,
+                timeout=timeout,
+                return_failures=return_failures,
+            )
+            return resp
+        except Exception as e:
+            if self.verbose:
+                logger.error(f"Error in read_files_frame(): {e}")
+
     def read_file(
             self,
             file: str,
@@ -0,0 +1,623 @@
+"""
+Native asyncio client for byte-genie API
+"""
+
+import json
+import asyncio
+import inspect
+import functools
+
+import os
+import utils.common
+import utils.upload_utils
+from utils.logging import logger
+from utils.http_utils import AsyncHttpTransport
+from utils.retry_utils import RetryableStatusError, PollingRounds
+from utils.byte_genie import ByteGenie, ByteGenieBatch, ByteGenieResponse, ByteGenieResponses
+
+
+class ByteGenieAsync(ByteGenie):
+    """
+    Coroutine-based byte-genie client.
+    Mirrors the full `ByteGenie` endpoint surface, but every endpoint method (e.g. `read_file`, `rank_data`,
+    `structure_page_quants`) returns a coroutine, which makes the api call on a non-blocking http stack,
+    instead of blocking an executor thread for the duration of the call.
+    `async_<endpoint>` methods are kept for compatibility; like on `ByteGenie`, they log errors and return None
+    instead of raising.
+
+    Usage:
+        bg = ByteGenieAsync(task_mode='sync')
+        resp = await bg.read_file(file)
+        resps = utils.async_utils.run_async_tasks([bg.async_read_file(file) for file in files])
+    """
+
+    def __init__(
+            self,
+            *args,
+            async_transport: AsyncHttpTransport = None,
+            limit: int = 1000,
+            limit_per_host: int = 0,
+            **kwargs,
+    ):
+        """
+        :param args: arguments for `ByteGenie`
+        :param async_transport: non-blocking http transport to make api calls with
+        :param limit: max number of simultaneous connections, if async_transport is not given
+        :param limit_per_host: max number of simultaneous connections per host, if async_transport is not given
+        :param kwargs: keyword arguments for `ByteGenie`
+        """
+        super().__init__(*args, **kwargs)
+        if async_transport is None:
+            async_transport = AsyncHttpTransport(
+                limit=limit,
+                limit_per_host=limit_per_host,
+                verbose=self.verbose,
+            )
+        self.async_transport = async_transport
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        ByteGenie.close(self)
+        await self.async_transport.close()
+
+    def get_pool_stats(self):
+        """
+        Get connection pool statistics of the client's async http transport
+        :return:
+        """
+        return self.async_transport.get_pool_stats()
+
+    async def send_request(self, payload: dict, funcs: list, method: str = 'POST', timeout: int = 15 * 60):
+        """
+        Make a single attempt at an api call, within the client's rate and concurrency limits.
+        Raises RetryableStatusError if the response has a retryable http status.
+        :param payload: api payload
+        :param funcs: endpoints of the tasks in the payload
+        :param method: http method
+        :param timeout: timeout value for the attempt
+        :return: response body
+        """
+        ## outcome of the attempt for the circuit breakers, recorded however the attempt ends
+        ## (None if it ends without an outcome, e.g. when cancelled)
+        failed = None
+        try:
+            await self.rate_limiter.async_acquire(funcs=funcs)
+            request_body = self.create_async_request_body(payload)
+            headers = {**self.set_headers(), **request_body.pop('headers', {})}
+            if self.concurrency_limiter is not None:
+                start_time = await self.concurrency_limiter.async_acquire()
+            try:
+                status_code, response_headers, body = await self.async_transport.request(
+                    method=method,
+                    url=self.api_url,
+                    headers=headers,
+                    timeout=timeout,
+                    **request_body,
+                )
+            except BaseException as e:
+                if self.concurrency_limiter is not None:
+                    ## only failures worth retrying (connection errors, timeouts) are signs of overload
+                    self.concurrency_limiter.release(
+                        start_time,
+                        func=funcs[0] if funcs else None,
+                        n_tasks=len(funcs),
+                        error=isinstance(e, self.async_retry_exceptions),
+                    )
+                if isinstance(e, self.async_retry_exceptions):
+                    failed = True
+                raise
+            if self.concurrency_limiter is not None:
+                self.concurrency_limiter.release(
+                    start_time,
+                    func=funcs[0] if funcs else None,
+                    n_tasks=len(funcs),
+                    error=self.is_overload_status(status_code),
+                )
+            failed = self.retry_policy.is_retryable_status(status_code)
+        finally:
+            self.retry_policy.record_outcome(funcs=funcs, failed=failed)
+        if failed:
+            raise RetryableStatusError(
+                status_code=status_code,
+                headers=response_headers,
+                response=body,
+            )
+        return body
+
+    async def send_hedged_request(self, payload: dict, funcs: list, method: str = 'POST', timeout: int = 15 * 60):
+        """
+        Make a single attempt at an api call, hedged with a duplicate call if hedging is on,
+        the payload only calls idempotent endpoints, and the first call is slow
+        """
+        if (self.hedging_policy is None) or (not self.is_idempotent(funcs)):
+            return await self.send_request(payload=payload, funcs=funcs, method=method, timeout=timeout)
+        body = await self.hedging_policy.async_run(
+            coro_fn=lambda: self.send_request(payload=payload, funcs=funcs, method=method, timeout=timeout),
+            func=funcs[0],
+        )
+        return body
+
+    @staticmethod
+    def create_async_request_body(payload: dict):
+        """
+        Get request body args for a payload: a streamed body for payloads holding file contents
+        to upload (see utils.upload_utils.FileContent), json otherwise
+        :param payload: api payload
+        :return:
+        """
+        if utils.upload_utils.has_file_contents(payload):
+            ## aiohttp sends async iterables chunked, unless their length is set
+            body = utils.upload_utils.StreamedBody(payload)
+            return {'data': body.__aiter__(), 'headers': {'Content-Length': str(len(body))}}
+        return {'json': payload}
+
+    @property
+    def async_retry_exceptions(self):
+        """
+        Exceptions of the non-blocking http stack worth retrying
+        """
+        import aiohttp
+        return (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError)
+
+    async def call_api(self, payload: dict, method: str = 'POST', timeout: int = 15 * 60):
+        plan = self.create_memo_plan(payload)
+        if plan is None:
+            bg_resp = await self.fetch_response(payload=payload, method=method, timeout=timeout)
+        else:
+            bg_resp = None
+            if plan['payload'] is not None:
+                bg_resp = await self.fetch_response(payload=plan['payload'], method=method, timeout=timeout)
+            bg_resp = self.merge_memo_response(plan=plan, bg_resp=bg_resp)
+            if bg_resp is None:
+                bg_resp = await self.fetch_response(payload=payload, method=method, timeout=timeout)
+        ## read task outputs with the shared sync client for this client's credentials
+        bg_resp.client = self.get_sync_client()
+        return bg_resp
+
+    async def fetch_response(self, payload: dict, method: str = 'POST', timeout: int = 15 * 60):
+        """
+        Get the response to a payload, from the local cache, an identical in-flight call, or the api
+        :param payload: api payload
+        :param method: http method
+        :param timeout: timeout value for each attempt
+        :return:
+        """
+        cache_key = self.get_cache_key(payload)
+        if cache_key is not None:
+            cached_resp = self.response_cache.get(cache_key)
+            if cached_resp is not None:
+                return ByteGenieResponse(cached_resp)
+        coalesce_key = self.get_coalesce_key(payload)
+        if coalesce_key is not None:
+            bg_resp = await self.single_flight.async_do(
+                key=coalesce_key,
+                coro_fn=lambda: self.make_api_call(payload=payload, method=method, timeout=timeout, cache_key=cache_key),
+            )
+            return bg_resp
+        bg_resp = await self.make_api_call(payload=payload, method=method, timeout=timeout, cache_key=cache_key)
+        return bg_resp
+
+    async def make_api_call(self, payload: dict, method: str = 'POST', timeout: int = 15 * 60, cache_key: str = None):
+        """
+        Call the api, retrying failed attempts as per the client's retry policy
+        :param payload: api payload
+        :param method: http method
+        :param timeout: timeout value for each attempt
+        :param cache_key: key to cache the response under, if cacheable
+        :return:
+        """
+        funcs = self.get_payload_funcs(payload)
+        self.retry_policy.check_circuits(funcs=funcs)
+        deadline = self.retry_policy.get_deadline()
+        retrying = self.retry_policy.create_retrying(
+            funcs=funcs,
+            retry_exceptions=self.async_retry_exceptions,
+            is_async=True,
+        )
+        try:
+            async for attempt in retrying:
+                with attempt:
+                    body = await self.send_hedged_request(
+                        payload=payload,
+                        funcs=funcs,
+                        method=method,
+                        timeout=self.retry_policy.get_attempt_timeout(timeout=timeout, deadline=deadline),
+                    )
+        except RetryableStatusError as e:
+            ## retries exhausted: return the last response
+            body = e.response
+        try:
+            json_resp = json.loads(body)
+            ## convert to byte-genie resp
+            bg_resp = ByteGenieResponse(json_resp)
+            self.cache_response(cache_key=cache_key, payload=payload, bg_resp=bg_resp)
+        except Exception as e:
+            json_resp = {'payload': payload, 'error': e}
+            ## convert to byte-genie resp
+            bg_resp = ByteGenieResponse(json_resp)
+        return bg_resp
+
+    async def do_nothing(self):
+        return ByteGenieResponse()
+
+    async def upload_files(
+            self,
+            file_paths: list = None,
+            directory: str = None,
+            filenames: list = None,
+            username: str = None,
+            recursive: int = 0,
+            max_batch_size: int = 64 * 1024 ** 2,
+            max_batch_files: int = 50,
+            max_workers: int = 4,
+            manifest_file: str = None,
+            upload_index_file: str = None,
+            timeout: int = 15 * 60,
+    ):
+        """
+        Upload local files, with bounded memory (see ByteGenie.upload_files())
+        :param file_paths: local files to upload
+        :param directory: local directory to upload files from (if file_paths is not given)
+        :param filenames: file names for uploaded files (defaults to the base names of file_paths)
+        :param username: user name
+        :param recursive: whether to also upload files in sub-directories of directory
+        :param max_batch_size: max total size of (base64-encoded) file contents uploaded per api call, in bytes
+        :param max_batch_files: max number of files uploaded per api call
+        :param max_workers: max number of batches uploaded concurrently
+        :param manifest_file: if set, record uploaded files in this local manifest (see utils.upload_utils.UploadManifest),
+            and skip files it records as uploaded, so that re-running an interrupted upload only uploads missing files
+        :param upload_index_file: if set, skip files whose content was uploaded before (under any name),
+            as recorded in this local index of content hashes (see utils.upload_utils.UploadIndex),
+            and still listed by show_uploads
+        :param timeout: timeout value for each api call
+        :return: one response per batch
+        """
+        if file_paths is None:
+            file_paths = utils.upload_utils.list_upload_files(directory=directory, recursive=recursive)
+        if filenames is None:
+            filenames = [os.path.basename(file_path) for file_path in file_paths]
+        if username is None:
+            username = self.read_username()
+        manifest = None
+        if manifest_file is not None:
+            manifest = utils.upload_utils.UploadManifest(manifest_file=manifest_file)
+        upload_index = None
+        if upload_index_file is not None:
+            upload_index = utils.upload_utils.UploadIndex(index_file=upload_index_file)
+            if upload_index.get_doc_names(username) is None:
+                doc_names = await asyncio.get_running_loop().run_in_executor(
+                    self.get_async_executor('show_uploads'),
+                    functools.partial(self.get_uploaded_doc_names, username=username),
+                )
+                if doc_names is not None:
+                    upload_index.set_doc_names(username=username, doc_names=doc_names)
+        file_paths, filenames = self.select_upload_files(
+            file_paths=file_paths,
+            filenames=filenames,
+            username=username,
+            manifest=manifest,
+            upload_index=upload_index,
+        )
+        filename_by_path = dict(zip(file_paths, filenames))
+        batches = utils.upload_utils.create_upload_batches(
+            file_paths=file_paths,
+            max_batch_size=max_batch_size,
+            max_batch_files=max_batch_files,
+        )
+        semaphore = asyncio.Semaphore(max(1, max_workers))
+
+        async def upload_batch(batch_num: int, batch: list):
+            async with semaphore:
+                try:
+                    resp = await self.upload_data(
+                        contents=[utils.upload_utils.FileContent(file_path) for file_path in batch],
+                        filenames=[filename_by_path[file_path] for file_path in batch],
+                        username=username,
+                        timeout=timeout,
+                    )
+                except Exception as e:
+                    if self.verbose:
+                        logger.error(f"Error in upload_files() for batch {batch_num + 1}/{len(batches)}: {e}")
+                    resp = ByteGenieResponse(
+                        {'payload': {'file_paths': batch}, 'error': e},
+                        client=self.get_sync_client(),
+                    )
+                if not utils.upload_utils.is_upload_successful(resp):
+                    return resp
+                self.record_uploaded_files(
+                    file_paths=batch,
+                    filenames=[filename_by_path[file_path] for file_path in batch],
+                    username=username,
+                    manifest=manifest,
+                    upload_index=upload_index,
+                )
+                if self.verbose:
+                    logger.info(f"Uploaded batch {batch_num + 1}/{len(batches)} ({len(batch)} files)")
+                return resp
+
+        resps = await asyncio.gather(*[upload_batch(batch_num, batch) for batch_num, batch in enumerate(batches)])
+        return ByteGenieResponses(responses=resps)
+
+    async def slugify(
+            self,
+            text: str,
+            timeout: int = 15 * 60,
+            local: int = 1,
+            verify: int = 0,
+    ):
+        """
+        Slugify text (see ByteGenie.slugify())
+        :param text: text to slugify (a string, or a list/Series of strings)
+        :param timeout: timeout value for api call
+        :param local: whether to slugify locally (see utils.common.slugify), instead of calling the api
+        :param verify: whether to also slugify via the api, and log any differences from local output;
+            the api output is returned
+        :return:
+        """
+        func = 'slugify'
+        if local:
+            local_resp = self.create_local_response(
+                func=func,
+                args={'text': text},
+                data=utils.common.slugify_values(text),
+            )
+            if not verify:
+                return local_resp
+        if isinstance(text, (list, tuple)) or utils.common.is_series(text):
+            batch = self.create_batch()
+            for text_ in list(text):
+                batch.slugify(text=text_, local=0)
+            resps = await batch.execute()
+            resp = self.create_local_response(
+                func=func,
+                args={'text': text},
+                data=[resp_.get_data() for resp_ in resps],
+            )
+        else:
+            payload = self.create_api_payload(
+                func=func,
+                args={'text': text},
+            )
+            resp = await self.call_api(
+                payload=payload,
+                timeout=timeout,
+            )
+        if local:
+            self.compare_slugify_outputs(text=text, local_output=local_resp.get_data(), api_output=resp.get_data())
+        return resp
+
+    async def check_files_exist(
+            self,
+            files: list,
+            batch_size: int = 100,
+            timeout: int = 15 * 60,
+    ):
+        """
+        Check if files exist, packing batch_size files per api request, with requests sent concurrently
+        (see ByteGenie.check_files_exist())
+        :param files: files to check
+        :param batch_size: max number of files to check per api request
+        :param timeout: timeout value for api calls
+        :return: dict of {file: whether the file exists}; files whose check failed are reported as not existing
+        """
+        files = list(dict.fromkeys(files))
+        batch = self.create_batch(batch_size=batch_size)
+        for file in files:
+            batch.check_file_exists(file=file, timeout=timeout)
+        ## run file checks in sync mode, to get their results in the response, whatever the client's task_mode
+        for task in batch.tasks:
+            task['task_mode'] = 'sync'
+        resps = await batch.execute()
+        files_exist = {file: bool(resp.get_data()) for file, resp in zip(files, resps)}
+        return files_exist
+
+    async def wait_for_files(
+            self,
+            files: list,
+            wait_interval: float = 5,
+            max_interval: float = 60,
+            wait_time_max: float = 15 * 60,
+            batch_size: int = 100,
+            timeout: int = 15 * 60,
+    ):
+        """
+        Wait for files to exist, checking pending files in batched api requests, with exponential backoff
+        between rounds (see ByteGenie.wait_for_files())
+        :param files: files to wait for
+        :param wait_interval: wait time (in seconds) after the first round
+        :param max_interval: max wait time (in seconds) between rounds
+        :param wait_time_max: max total wait time (in seconds)
+        :param batch_size: max number of files to check per api request
+        :param timeout: timeout value for api calls
+        :return: dict of {file: whether the file exists}
+        """
+        files_exist = {file: False for file in files}
+        rounds = PollingRounds(
+            items=list(files_exist.keys()),
+            wait_interval=wait_interval,
+            max_interval=max_interval,
+            wait_time_max=wait_time_max,
+        )
+        while len(rounds.pending):
+            try:
+                round_files_exist = await self.check_files_exist(
+                    files=rounds.pending,
+                    batch_size=batch_size,
+                    timeout=timeout,
+                )
+            except Exception as e:
+                if self.verbose:
+                    logger.warning(f"Error in wait_for_files(): {e}")
+                round_files_exist = {}
+            done = [file for file, exists in round_files_exist.items() if exists]
+            files_exist.update({file: True for file in done})
+            rounds.update(done=done)
+            wait_time = rounds.next_wait()
+            if wait_time is None:
+                break
+            if self.verbose:
+                logger.info(f"{len(files_exist) - len(rounds.pending)}/{len(files_exist)} files exist; "
+                            f"checking again in {wait_time:.1f}s")
+            await asyncio.sleep(wait_time)
+        return files_exist
+
+    def is_retryable_error(self, error: Exception):
+        return super().is_retryable_error(error) or isinstance(error, self.async_retry_exceptions)
+
+    async def map(
+            self,
+            endpoint: str,
+            kwargs_list: list,
+            concurrency: int = 16,
+            rate: float = None,
+            timeout: float = None,
+            progress_interval: float = 10,
+    ):
+        """
+        Call an endpoint once per input, concurrently on the current event loop (see ByteGenie.map())
+        :param endpoint: name of the endpoint method, e.g. 'read_file'
+        :param kwargs_list: list of keyword arguments, one dict per call
+        :param concurrency: max number of calls running at a time
+        :param rate: max number of calls started per second (None for no limit)
+        :param timeout: max time (in seconds) to wait for each call (not counting the wait for `rate`);
+            calls that time out are cancelled
+        :param progress_interval: time (in seconds) between progress logs (None to not log progress)
+        :return: ByteGenieMapResults
+        """
+        results = await ByteGenie.async_map(
+            self,
+            endpoint=endpoint,
+            kwargs_list=kwargs_list,
+            concurrency=concurrency,
+            rate=rate,
+            timeout=timeout,
+            progress_interval=progress_interval,
+        )
+        return results
+
+    async def build_frame(self, outputs: list, columns: list = None, strip_strings: int = 0):
+        """
+        Build one dataframe from task outputs, without blocking the event loop (see ByteGenie.build_frame())
+        """
+        return await self.frame_builder.async_build_frame(
+            outputs=outputs,
+            columns=columns,
+            strip_strings=strip_strings,
+            executor=self.get_async_executor('build_frame'),
+        )
+
+    async def read_files_frame(
+            self,
+            files: list,
+            add_file: int = None,
+            columns: list = None,
+            strip_strings: int = 0,
+            batch_size: int = 20,
+            timeout: int = 15 * 60,
+            return_failures: int = 0,
+    ):
+        """
+        Read many files into one dataframe, in a worker thread, without blocking the event loop
+        (see ByteGenie.read_files_frame())
+        """
+        df = await asyncio.get_running_loop().run_in_executor(
+            self.get_async_executor('read_files_frame'),
+            functools.partial(
+                ByteGenie.read_files_frame,
+                self,
+                files=files,
+                add_file=add_file,
+                columns=columns,
+                strip_strings=strip_strings,
+                batch_size=batch_size,
+                timeout=timeout,
+                return_failures=return_failures,
+            ),
+        )
+        return df
+
+    def create_batch(
+            self,
+            batch_size: int = 100,
+    ):
+        """
+        Create a batch to pack many independent endpoint calls into a few api requests (see ByteGenie.create_batch())
+        :param batch_size: max number of tasks to send per api request
+        :return:
+        """
+        return ByteGenieAsyncBatch(bg=self, batch_size=batch_size)
+
+
+def _create_async_method(func_name: str):
+    """
+    Create a coroutine method that awaits `func_name`, and logs errors instead of raising them
+    :param func_name: name of the method to wrap
+    :return:
+    """
+    async def async_method(self, *args, **kwargs):
+        try:
+            resp = getattr(self, func_name)(*args, **kwargs)
+            ## responses are awaitable too (they await their output), so only await coroutines
+            if inspect.iscoroutine(resp):
+                resp = await resp
+            return resp
+        except Exception as e:
+            if self.verbose:
+                logger.error(f"Error in {func_name}(): {e}")
+    async_method.__name__ = f"async_{func_name}"
+    async_method.__qualname__ = f"ByteGenieAsync.async_{func_name}"
+    return async_method
+
+
+## async_* methods of ByteGenie that are native coroutines, and raise errors instead of logging them
+_NATIVE_ASYNC_METHODS = {'async_map', 'async_build_frame'}
+
+## replace the thread-wrapped async_* methods inherited from ByteGenie with native coroutines
+for _attr in dir(ByteGenie):
+    if _attr in _NATIVE_ASYNC_METHODS:
+        continue
+    if _attr.startswith('async_') and hasattr(ByteGenie, _attr[len('async_'):]):
+        setattr(ByteGenieAsync, _attr, _create_async_method(_attr[len('async_'):]))
+
+
+class ByteGenieAsyncBatch(ByteGenieBatch):
+    """
+    Batch of byte-genie endpoint calls for `ByteGenieAsync`, whose payloads are sent concurrently
+    """
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name.startswith('async_'):
+            raise AttributeError(name)
+        ## record tasks with the sync endpoint methods, as async overrides (e.g. slugify) return coroutines
+        attr = inspect.getattr_static(ByteGenie, name, None)
+        if inspect.isfunction(attr):
+            return attr.__get__(self._recorder)
+        return getattr(self._recorder, name)
+
+    async def execute(self):
+        """
+        Send all recorded tasks concurrently, and return one response per task, in the order tasks were recorded
+        :return:
+        """
+        timeout = max(self.timeouts) if len(self.timeouts) else 15 * 60
+        payloads = self.create_payloads()
+        resps = await asyncio.gather(
+            *[self.bg.call_api(payload=payload, timeout=timeout) for payload in payloads],
+            return_exceptions=True,
+        )
+        responses = []
+        for payload, resp in zip(payloads, resps):
+            if isinstance(resp, Exception):
+                if self.bg.verbose:
+                    logger.error(f"Error in ByteGenieAsyncBatch.execute(): {resp}")
+                resp = ByteGenieResponse({'payload': payload, 'error': resp}, client=self.bg.get_sync_client())
+            responses = responses + resp.split_tasks(n_tasks=len(payload['tasks']))
+        return ByteGenieResponses(responses=responses)
+
+    async def async_execute(self):
+        return await self.execute()
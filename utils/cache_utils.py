@@ -0,0 +1,176 @@
+"""
+Local caches for byte-genie API responses
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+from utils.logging import logger
+
+
+def hash_key(obj):
+    """
+    Content hash of a json-serialisable object, independent of dict key order
+    :param obj: object to hash
+    :return:
+    """
+    obj_str = json.dumps(obj, sort_keys=True, default=str)
+    return hashlib.sha256(obj_str.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    Persistent, content-addressed cache of api responses on local disk.
+    Each response is stored in its own json file, named by the hash of the request (func and args).
+    When the cache grows over `max_size` bytes, least recently used entries are evicted;
+    entries can also expire after a ttl (e.g. for listings, which change as new outputs are written).
+    """
+
+    def __init__(
+            self,
+            cache_dir: str = os.path.join(os.path.expanduser('~'), '.cache', 'byte-genie', 'responses'),
+            max_size: int = 1024 ** 3,
+            verbose: int = 1,
+    ):
+        """
+        :param cache_dir: directory to store cached responses in
+        :param max_size: max total size of cached responses, in bytes
+        :param verbose: whether to write logs or not
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.verbose = verbose
+        self.n_hits = 0
+        self.n_misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.size = sum([size for file, mtime, size in self.list_entries()])
+
+    def get_file(self, key: str):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def list_entries(self):
+        """
+        List cached files, with their last access time and size
+        :return:
+        """
+        entries = []
+        for root, dirs, files in os.walk(self.cache_dir):
+            for file in files:
+                if not file.endswith('.json'):
+                    continue
+                file_path = os.path.join(root, file)
+                try:
+                    stat = os.stat(file_path)
+                    entries.append((file_path, stat.st_mtime, stat.st_size))
+                except FileNotFoundError:
+                    pass
+        return entries
+
+    def get(self, key: str):
+        """
+        Get a cached response
+        :param key: cache key
+        :return: cached response, or None if it is not cached or has expired
+        """
+        file = self.get_file(key)
+        try:
+            with open(file, mode='r') as f:
+                entry = json.loads(f.read())
+        except (FileNotFoundError, ValueError):
+            self.n_misses += 1
+            return None
+        if (entry.get('expires_at') is not None) and (entry['expires_at'] < time.time()):
+            self.delete(key)
+            self.n_misses += 1
+            return None
+        try:
+            ## mark entry as recently used
+            os.utime(file)
+        except FileNotFoundError:
+            pass
+        self.n_hits += 1
+        return entry.get('response')
+
+    def put(self, key: str, response: dict, ttl: float = None):
+        """
+        Cache a response
+        :param key: cache key
+        :param response: json-serialisable response
+        :param ttl: time (in seconds) after which the entry expires (None to never expire)
+        :return:
+        """
+        entry = {
+            'expires_at': (time.time() + ttl) if ttl is not None else None,
+            'response': response,
+        }
+        try:
+            entry_str = json.dumps(entry)
+        except (TypeError, ValueError) as e:
+            if self.verbose:
+                logger.warning(f"Response not cached, as it is not json-serialisable: {e}")
+            return
+        file = self.get_file(key)
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        ## write to a temp file, and move it in place, so that readers never see partial entries
+        tmp_file = f"{file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_file, mode='w') as f:
+            f.write(entry_str)
+        with self._lock:
+            ## an overwritten entry no longer counts towards the cache size
+            try:
+                self.size -= os.path.getsize(file)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_file, file)
+            self.size += len(entry_str)
+        if self.size > self.max_size:
+            self.evict()
+
+    def delete(self, key: str):
+        file = self.get_file(key)
+        try:
+            size = os.path.getsize(file)
+            os.remove(file)
+            with self._lock:
+                self.size -= size
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """
+        Evict least recently used entries, until the cache is under 90% of its max size
+        :return:
+        """
+        with self._lock:
+            entries = sorted(self.list_entries(), key=lambda entry: entry[1])
+            self.size = sum([size for file, mtime, size in entries])
+            for file, mtime, size in entries:
+                if self.size <= 0.9 * self.max_size:
+                    break
+                try:
+                    os.remove(file)
+                    self.size -= size
+                except FileNotFoundError:
+                    pass
+
+    def clear(self):
+        with self._lock:
+            for file, mtime, size in self.list_entries():
+                try:
+                    os.remove(file)
+                except FileNotFoundError:
+                    pass
+            self.size = 0
+
+    def get_stats(self):
+        stats = {
+            'n_hits': self.n_hits,
+            'n_misses': self.n_misses,
+            'size': self.size,
+            'max_size': self.max_size,
+        }
+        return stats
@@ -4,11 +4,12 @@ Common utility functions
 
 import re
 import os
+import sys
 import json
-import base64
 import unicodedata
-import pandas as pd
 from utils.logging import logger
+import utils.upload_utils
+## pandas is imported inside the functions that need it, to keep importing utils modules fast
 
 
 def read_secrets(secrets_file: str = 'secrets.json') -> dict:
@@ -21,13 +22,15 @@ def read_secrets(secrets_file: str = 'secrets.json') -> dict:
 
 
 def convert_file_content_to_bytes(file_path: str):
-    with open(file_path, 'rb') as file:
-        content = file.read()
-        data = base64.b64encode(content)
-        data_with_prefix = "data:;base64," + data.decode('utf-8')
+    ## encode in chunks, rather than holding the raw content and its encoding in memory at once
+    data_with_prefix = utils.upload_utils.FileContent(file_path).read_encoded()
     return data_with_prefix
 
 
+_SLUGIFY_STRIP_RE = re.compile(r'[^\w\s-]')
+_SLUGIFY_HYPHENATE_RE = re.compile(r'[-\s]+')
+
+
 def slugify(value, allow_unicode=False):
     """
     Taken from https://github.com/django/django/blob/master/django/utils/text.py
@@ -41,8 +44,51 @@ def slugify(value, allow_unicode=False):
         value = unicodedata.normalize('NFKC', value)
     else:
         value = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore').decode('ascii')
-    value = re.sub(r'[^\w\s-]', '', value.lower())
-    return re.sub(r'[-\s]+', '-', value).strip('-_')
+    value = _SLUGIFY_STRIP_RE.sub('', value.lower())
+    return _SLUGIFY_HYPHENATE_RE.sub('-', value).strip('-_')
+
+
+def is_series(values):
+    """
+    Whether values is a pandas Series, without importing pandas
+    (values cannot be a Series if pandas has not been imported yet)
+    :param values:
+    :return:
+    """
+    pd = sys.modules.get('pandas')
+    return (pd is not None) and isinstance(values, pd.Series)
+
+
+def is_dataframe(data):
+    """
+    Whether data is a pandas DataFrame, without importing pandas
+    :param data:
+    :return:
+    """
+    pd = sys.modules.get('pandas')
+    return (pd is not None) and isinstance(data, pd.DataFrame)
+
+
+def slugify_values(values, allow_unicode=False):
+    """
+    Slugify a value, or each value in a list or pandas Series.
+    Repeated values are only slugified once.
+    :param values: a value, or a list/Series of values
+    :param allow_unicode: whether to keep unicode characters
+    :return: slugified value, or list/Series of slugified values
+    """
+    if is_series(values):
+        unique_values = values.unique()
+        slugs = {value: slugify(value, allow_unicode=allow_unicode) for value in unique_values}
+        return values.map(slugs)
+    elif isinstance(values, (list, tuple)):
+        slugs = {}
+        for value in values:
+            if value not in slugs:
+                slugs[value] = slugify(value, allow_unicode=allow_unicode)
+        return [slugs[value] for value in values]
+    else:
+        return slugify(values, allow_unicode=allow_unicode)
 
 
 def extract_nested_brackets(s, bracket='()'):
@@ -94,12 +140,9 @@ def read_file_contents(directory: str):
     file_names = os.listdir(directory)
     for file_name in file_names:
         file_path = os.path.join(directory, file_name)
-        with open(file_path, 'rb') as file:
-            content = file.read()
-            data = base64.b64encode(content)
-            data_with_prefix = "data:;base64," + data.decode('utf-8')
-            contents.append(data_with_prefix)
-            file_paths.append(file_path)
+        contents.append(convert_file_content_to_bytes(file_path))
+        file_paths.append(file_path)
+    import pandas as pd
     df = pd.DataFrame()
     df['file'] = file_paths
     df['filename'] = [file.split('/')[-1] for file in file_paths]
@@ -124,7 +167,7 @@ def is_convertible_to_df(data, verbose: int = 1):
     """
     flag = 0
     try:
-        if isinstance(data, pd.DataFrame):
+        if is_dataframe(data):
             flag = 1
         elif isinstance(data, list):
             if all([isinstance(data_, dict) for data_ in data]):
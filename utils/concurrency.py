@@ -0,0 +1,163 @@
+"""
+Adaptive concurrency limiting for byte-genie API calls
+"""
+
+import time
+import asyncio
+import threading
+from collections import deque
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD (additive-increase, multiplicative-decrease) limit on the number of in-flight api calls.
+    While calls succeed with healthy latency, the limit grows by about one per `limit` completed calls;
+    on errors, timeouts, or latency well above the usual latency of calls of the same shape (endpoint and number of tasks),
+    the limit is multiplied by `decrease_factor` (at most once per `cooldown` seconds, so that a burst of failures
+    from the same overloaded window only backs off once).
+    Callers over the limit wait in a FIFO queue. Usable from threads (`acquire()`) and coroutines (`async_acquire()`),
+    and safe to share across clients.
+    """
+
+    def __init__(
+            self,
+            initial_limit: int = 8,
+            min_limit: int = 1,
+            max_limit: int = 256,
+            increase: float = 1,
+            decrease_factor: float = 0.5,
+            latency_tolerance: float = 2.0,
+            cooldown: float = 1.0,
+    ):
+        """
+        :param initial_limit: initial max number of in-flight calls
+        :param min_limit: lowest the limit can go
+        :param max_limit: highest the limit can go
+        :param increase: limit increase for every `limit` healthy calls
+        :param decrease_factor: factor to multiply the limit with on errors
+        :param latency_tolerance: calls slower than latency_tolerance * average latency of calls with the same endpoint
+            and number of tasks count as errors
+        :param cooldown: min time (in seconds) between two decreases of the limit
+        """
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.n_success = 0
+        self.n_errors = 0
+        self.func_latency = {}
+        self._last_decrease = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def get_limit(self):
+        return max(self.min_limit, int(self.limit))
+
+    def _notify(self):
+        """
+        Wake up waiters for as long as there is room under the limit (call with lock held)
+        """
+        while self._waiters and (self.in_flight < self.get_limit()):
+            waiter = self._waiters.popleft()
+            self.in_flight += 1
+            if isinstance(waiter, threading.Event):
+                waiter.set()
+            else:
+                loop, future = waiter
+                loop.call_soon_threadsafe(self._set_future_result, future)
+
+    @staticmethod
+    def _set_future_result(future):
+        if not future.done():
+            future.set_result(True)
+
+    def acquire(self):
+        """
+        Block until a call slot is available
+        :return: time of acquisition, to pass to release()
+        """
+        with self._lock:
+            if (not self._waiters) and (self.in_flight < self.get_limit()):
+                self.in_flight += 1
+                return time.monotonic()
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()
+        return time.monotonic()
+
+    async def async_acquire(self):
+        """
+        Wait (without blocking the event loop) until a call slot is available
+        :return: time of acquisition, to pass to release()
+        """
+        with self._lock:
+            if (not self._waiters) and (self.in_flight < self.get_limit()):
+                self.in_flight += 1
+                return time.monotonic()
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            waiter = (loop, future)
+            self._waiters.append(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                else:
+                    ## slot was already handed over to this waiter (whether or not its future was resolved
+                    ## before the cancellation): give it back
+                    self.in_flight -= 1
+                    self._notify()
+            raise
+        return time.monotonic()
+
+    def release(self, start_time: float, func: str = None, n_tasks: int = 1, error: bool = False):
+        """
+        Release a call slot, and adapt the limit to the outcome of the call
+        :param start_time: time returned by acquire()
+        :param func: endpoint of the call, to compare its latency with the usual latency of that endpoint
+        :param n_tasks: number of tasks in the call, so that batch calls are only compared with batches of the same size
+        :param error: whether the call failed because of an error or timeout
+        :return:
+        """
+        latency = time.monotonic() - start_time
+        key = (func, n_tasks)
+        with self._lock:
+            self.in_flight -= 1
+            avg_latency = self.func_latency.get(key)
+            slow = (avg_latency is not None) and (latency > self.latency_tolerance * avg_latency)
+            if not error:
+                if avg_latency is None:
+                    self.func_latency[key] = latency
+                else:
+                    self.func_latency[key] = 0.9 * avg_latency + 0.1 * latency
+            if error or slow:
+                self.n_errors += 1
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                    self._last_decrease = now
+            else:
+                self.n_success += 1
+                self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+            self._notify()
+
+    def get_stats(self):
+        """
+        Get current limit, number of in-flight calls, and number of calls waiting for a slot
+        :return:
+        """
+        with self._lock:
+            stats = {
+                'limit': self.get_limit(),
+                'in_flight': self.in_flight,
+                'queue_depth': len(self._waiters),
+                'n_success': self.n_success,
+                'n_errors': self.n_errors,
+            }
+        return stats
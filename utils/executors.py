@@ -0,0 +1,159 @@
+"""
+Thread pools for running blocking byte-genie API calls from async code
+"""
+
+import threading
+import concurrent.futures
+
+
+class InstrumentedExecutor(concurrent.futures.ThreadPoolExecutor):
+    """
+    Thread pool that keeps track of the number of queued and running calls,
+    to tell whether it is saturated (calls queue up behind busy threads) or oversized.
+    """
+
+    def __init__(self, max_workers: int = 32, thread_name_prefix: str = 'byte-genie'):
+        """
+        :param max_workers: max number of threads (threads are started on demand)
+        :param thread_name_prefix: prefix of thread names
+        """
+        super().__init__(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self.n_queued = 0
+        self.n_active = 0
+        self.n_completed = 0
+        self.max_active = 0
+        self._stats_lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        with self._stats_lock:
+            self.n_queued += 1
+
+        def run_call():
+            with self._stats_lock:
+                self.n_queued -= 1
+                self.n_active += 1
+                self.max_active = max(self.max_active, self.n_active)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._stats_lock:
+                    self.n_active -= 1
+                    self.n_completed += 1
+
+        future = super().submit(run_call)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: concurrent.futures.Future):
+        ## cancelled calls never ran, so they left the queue without becoming active
+        if future.cancelled():
+            with self._stats_lock:
+                self.n_queued -= 1
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = {
+                'max_workers': self._max_workers,
+                'n_threads': len(self._threads),
+                'n_queued': self.n_queued,
+                'n_active': self.n_active,
+                'max_active': self.max_active,
+                'n_completed': self.n_completed,
+            }
+        return stats
+
+
+class ExecutorPool:
+    """
+    Named thread pools, to run blocking calls to different endpoints on separately sized pools,
+    e.g. so that quick reads do not queue behind long-running processing calls.
+    Pools are created on first use.
+    """
+
+    def __init__(
+            self,
+            pool_sizes: dict = None,
+            func_pools: dict = None,
+            default_pool: str = 'long',
+            thread_name_prefix: str = 'byte-genie',
+    ):
+        """
+        :param pool_sizes: max number of threads per pool, as {pool name: max_workers}
+        :param func_pools: pool to run each endpoint on, as {func: pool name}
+        :param default_pool: pool to run endpoints not in func_pools on
+        :param thread_name_prefix: prefix of thread names, followed by the pool name
+        """
+        if pool_sizes is None:
+            pool_sizes = {'short': 32, 'long': 128}
+        self.pool_sizes = dict(pool_sizes)
+        self.func_pools = dict(func_pools) if func_pools is not None else {}
+        self.default_pool = default_pool
+        self.thread_name_prefix = thread_name_prefix
+        self._executors = {}
+        self._lock = threading.Lock()
+
+    def get_pool_name(self, func: str):
+        return self.func_pools.get(func, self.default_pool)
+
+    def get_executor(self, func: str = None, pool_name: str = None):
+        """
+        Get the thread pool to run calls to an endpoint on
+        :param func: endpoint (None for the default pool)
+        :param pool_name: name of the pool to get, regardless of func
+        :return:
+        """
+        if pool_name is None:
+            pool_name = self.get_pool_name(func)
+        with self._lock:
+            if pool_name not in self._executors:
+                self._executors[pool_name] = InstrumentedExecutor(
+                    max_workers=self.pool_sizes[pool_name],
+                    thread_name_prefix=f"{self.thread_name_prefix}-{pool_name}",
+                )
+            return self._executors[pool_name]
+
+    def get_stats(self):
+        """
+        Get queued, running and completed calls per pool
+        :return: dict of {pool name: stats}
+        """
+        with self._lock:
+            executors = dict(self._executors)
+        stats = {pool_name: executor.get_stats() for pool_name, executor in executors.items()}
+        return stats
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executors = list(self._executors.values())
+            self._executors = {}
+        for executor in executors:
+            executor.shutdown(wait=wait)
+
+
+## thread pools shared by clients, keyed by pool sizes and endpoint pools (see get_shared_executor_pool())
+_shared_executor_pools = {}
+_shared_executor_pools_lock = threading.Lock()
+
+
+def get_shared_executor_pool(pool_sizes: dict, func_pools: dict = None, default_pool: str = 'long'):
+    """
+    Get the process-wide thread pools for a pool configuration, creating them on first use,
+    so that clients created with the same settings share their threads
+    :param pool_sizes: max number of threads per pool, as {pool name: max_workers}
+    :param func_pools: pool to run each endpoint on, as {func: pool name}
+    :param default_pool: pool to run endpoints not in func_pools on
+    :return:
+    """
+    key = (
+        tuple(sorted(pool_sizes.items())),
+        tuple(sorted((func_pools or {}).items())),
+        default_pool,
+    )
+    with _shared_executor_pools_lock:
+        if key not in _shared_executor_pools:
+            _shared_executor_pools[key] = ExecutorPool(
+                pool_sizes=pool_sizes,
+                func_pools=func_pools,
+                default_pool=default_pool,
+            )
+        return _shared_executor_pools[key]
@@ -0,0 +1,252 @@
+"""
+Building dataframes from byte-genie task outputs, optionally in a process pool
+"""
+
+import json
+import asyncio
+import threading
+import concurrent.futures
+import multiprocessing
+
+
+def records_to_frame(outputs: list, columns: list = None, strip_strings: int = 0):
+    """
+    Build one dataframe from task outputs
+    :param outputs: task outputs, each a list of records, or a dict of columns (None outputs are skipped)
+    :param columns: if set, keep only these columns (those present in the outputs)
+    :param strip_strings: whether to strip whitespace from string values
+    :return:
+    """
+    import pandas as pd
+    dfs = [pd.DataFrame(output) for output in outputs if output is not None]
+    dfs = [df for df in dfs if len(df.columns)]
+    df = pd.concat(dfs, ignore_index=True) if len(dfs) else pd.DataFrame()
+    if columns is not None:
+        df = df[[col for col in df.columns if col in columns]]
+    if strip_strings:
+        for col in df.select_dtypes(include=['object', 'string']).columns:
+            df[col] = df[col].map(lambda val: val.strip() if isinstance(val, str) else val)
+    return df
+
+
+def frame_to_buffer(df, use_arrow: int = 1):
+    """
+    Convert a dataframe to a columnar buffer, to pass it cheaply between processes
+    :param df: dataframe
+    :param use_arrow: whether to serialise to the Arrow IPC format, if pyarrow is installed
+    :return: ('arrow', bytes), or ('columns', (column names, list of column arrays)) without pyarrow,
+        or if the dataframe has columns that can't be converted to Arrow
+    """
+    if use_arrow:
+        try:
+            import pyarrow as pa
+        except ImportError:
+            pa = None
+        if pa is not None:
+            try:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+            except pa.ArrowException:
+                ## columns mixing types (e.g. numbers and 'n/a' strings) have no Arrow type: pass column arrays instead
+                table = None
+            if table is not None:
+                sink = pa.BufferOutputStream()
+                with pa.ipc.new_stream(sink, table.schema) as writer:
+                    writer.write_table(table)
+                return 'arrow', sink.getvalue().to_pybytes()
+    return 'columns', (list(df.columns), [df[col].to_numpy() for col in df.columns])
+
+
+def buffer_to_frame(buffer: tuple):
+    """
+    Convert a columnar buffer, created with frame_to_buffer(), back to a dataframe
+    :param buffer: columnar buffer
+    :return:
+    """
+    import pandas as pd
+    buffer_type, data = buffer
+    if buffer_type == 'arrow':
+        import pyarrow as pa
+        return pa.ipc.open_stream(data).read_all().to_pandas()
+    columns, arrays = data
+    return pd.DataFrame(dict(zip(columns, arrays)), columns=columns)
+
+
+def get_task_outputs(json_resp: dict):
+    """
+    Get output data of all tasks in a decoded api response, in task order (see ByteGenieResponse.get_data())
+    :param json_resp: decoded api response
+    :return:
+    """
+    task_resps = json_resp.get('response') if isinstance(json_resp, dict) else None
+    if not isinstance(task_resps, dict):
+        return []
+    task_keys = sorted(task_resps.keys(), key=lambda key: int(key.split('_')[-1]) if key.split('_')[-1].isdigit() else 0)
+    outputs = []
+    for key in task_keys:
+        data = task_resps[key].get('data') if isinstance(task_resps[key], dict) else None
+        for i in range(2):
+            if isinstance(data, dict) and ('data' in data.keys()):
+                data = data['data']
+        outputs.append(data)
+    return outputs
+
+
+def build_frame_buffer(content: bytes, columns: list = None, strip_strings: int = 0, use_arrow: int = 1):
+    """
+    Decode a raw api response, build a dataframe from the outputs of its tasks, and return it as a columnar buffer
+    (run in worker processes)
+    :param content: raw (json) api response body
+    :param columns: if set, keep only these columns
+    :param strip_strings: whether to strip whitespace from string values
+    :param use_arrow: whether to return an Arrow buffer, if pyarrow is installed
+    :return: columnar buffer, and positions of tasks (in the response) without output data
+    """
+    outputs = get_task_outputs(json.loads(content))
+    missing = [task_num for task_num, output in enumerate(outputs) if not isinstance(output, (list, dict))]
+    outputs = [output for output in outputs if isinstance(output, (list, dict))]
+    df = records_to_frame(outputs=outputs, columns=columns, strip_strings=strip_strings)
+    return frame_to_buffer(df, use_arrow=use_arrow), missing
+
+
+class FrameBuilder:
+    """
+    Builds dataframes from task outputs.
+    With max_workers > 0, raw api responses are decoded and built into dataframes in a pool of worker processes,
+    which pass them back as Arrow buffers (or as column arrays, if pyarrow is not installed),
+    so that parsing large responses uses all cores, and overlaps with api calls made by the calling process.
+    Worker processes are not forked from the (multi-threaded) calling process, so, as with any
+    multiprocessing code, scripts using them must run under `if __name__ == '__main__':`.
+    Outputs already decoded in the calling process are built into dataframes in the calling thread,
+    as sending them to worker processes would cost about as much as building the dataframes.
+    """
+
+    def __init__(
+            self,
+            max_workers: int = 0,
+            use_arrow: int = 1,
+            mp_context: str = None,
+    ):
+        """
+        :param max_workers: number of worker processes (0 to decode responses in the calling thread)
+        :param use_arrow: whether to pass dataframes back as Arrow buffers, if pyarrow is installed
+        :param mp_context: multiprocessing start method of worker processes (e.g. 'forkserver', 'spawn');
+            None for 'forkserver' where available, and 'spawn' elsewhere. 'fork' is not recommended,
+            as forking a process with running threads (e.g. of the client's thread pools) can deadlock the workers
+        """
+        self.max_workers = max_workers
+        self.use_arrow = use_arrow
+        self.mp_context = mp_context
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                mp_context = self.mp_context
+                if mp_context is None:
+                    mp_context = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(mp_context),
+                )
+            return self._executor
+
+    def build_frame(self, outputs: list, columns: list = None, strip_strings: int = 0):
+        """
+        Build one dataframe from task outputs
+        :param outputs: task outputs, each a list of records, or a dict of columns (None outputs are skipped)
+        :param columns: if set, keep only these columns (those present in the outputs)
+        :param strip_strings: whether to strip whitespace from string values
+        :return:
+        """
+        return records_to_frame(outputs=outputs, columns=columns, strip_strings=strip_strings)
+
+    async def async_build_frame(
+            self,
+            outputs: list,
+            columns: list = None,
+            strip_strings: int = 0,
+            executor: concurrent.futures.Executor = None,
+    ):
+        """
+        Build one dataframe from task outputs in a worker thread, without blocking the event loop (see build_frame())
+        :param executor: thread pool to build the dataframe on (None for the event loop's default executor)
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, records_to_frame, outputs, columns, strip_strings,
+        )
+
+    def submit_response(self, content: bytes, columns: list = None, strip_strings: int = 0):
+        """
+        Start decoding a raw api response, and building a dataframe from the outputs of its tasks
+        :param content: raw (json) api response body
+        :param columns: if set, keep only these columns
+        :param strip_strings: whether to strip whitespace from string values
+        :return: future resolving to a columnar buffer (see buffer_to_frame()),
+            and positions of tasks without output data (see build_frame_buffer())
+        """
+        if self.max_workers:
+            return self.get_executor().submit(build_frame_buffer, content, columns, strip_strings, self.use_arrow)
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(build_frame_buffer(content, columns, strip_strings, use_arrow=0))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def build_frame_from_responses(
+            self,
+            contents,
+            columns: list = None,
+            strip_strings: int = 0,
+            return_failures: int = 0,
+    ):
+        """
+        Build one dataframe from the task outputs of raw api responses.
+        Responses are submitted for decoding as they are iterated over, so that, with a generator yielding
+        responses as they arrive, decoding overlaps with fetching further responses.
+        :param contents: iterable of raw (json) api response bodies, or of exceptions for responses that failed
+        :param columns: if set, keep only these columns
+        :param strip_strings: whether to strip whitespace from string values
+        :param return_failures: whether to return failures with the dataframe, instead of raising the first one.
+            Failed responses, responses that can't be decoded, and tasks without output data are failures.
+        :return: dataframe, and with return_failures, a list of failures,
+            as dicts with response (position), task (position in the response, None if the response failed), and error
+        """
+        failures = []
+        futures = []
+        for response_num, content in enumerate(contents):
+            if isinstance(content, Exception):
+                failures.append({'response': response_num, 'task': None, 'error': content})
+            else:
+                futures.append((response_num, self.submit_response(content, columns=columns, strip_strings=strip_strings)))
+        buffers = []
+        for response_num, future in futures:
+            try:
+                buffer, missing = future.result()
+            except Exception as e:
+                failures.append({'response': response_num, 'task': None, 'error': e})
+                continue
+            buffers.append(buffer)
+            for task_num in missing:
+                failures.append({'response': response_num, 'task': task_num, 'error': ValueError('no output data')})
+        df = self.concat_buffers(buffers)
+        failures = sorted(failures, key=lambda failure: failure['response'])
+        if return_failures:
+            return df, failures
+        if len(failures):
+            raise failures[0]['error']
+        return df
+
+    @staticmethod
+    def concat_buffers(buffers: list):
+        import pandas as pd
+        dfs = [buffer_to_frame(buffer) for buffer in buffers]
+        dfs = [df for df in dfs if len(df.columns)]
+        return pd.concat(dfs, ignore_index=True) if len(dfs) else pd.DataFrame()
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
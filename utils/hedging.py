@@ -0,0 +1,198 @@
+"""
+Request hedging for idempotent byte-genie API calls
+"""
+
+import time
+import asyncio
+import threading
+import concurrent.futures
+from collections import deque
+
+
+class HedgingPolicy:
+    """
+    Hedged requests: if a call has not returned after the `percentile` latency of its endpoint,
+    send a duplicate, and take whichever returns first.
+    Only meant for idempotent calls (reads, listings, existence checks), since both copies may run to completion.
+    Hedges are capped at `max_hedge_ratio` of all calls, so that hedging cannot double the load on a slow backend.
+    """
+
+    def __init__(
+            self,
+            percentile: float = 95,
+            min_delay: float = 0.05,
+            max_hedge_ratio: float = 0.1,
+            min_samples: int = 20,
+            window: int = 1000,
+            max_workers: int = 64,
+    ):
+        """
+        :param percentile: latency percentile of an endpoint after which to send a hedge
+        :param min_delay: min time (in seconds) to wait before sending a hedge
+        :param max_hedge_ratio: max number of hedges per call
+        :param min_samples: number of latency samples needed for an endpoint before hedging it
+        :param window: number of most recent latency samples to keep per endpoint
+        :param max_workers: max number of threads running hedged sync calls, when run() is not given an executor
+        """
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_samples = min_samples
+        self.window = window
+        self.max_workers = max_workers
+        self.latencies = {}
+        self.n_calls = 0
+        self.n_hedges = 0
+        self.n_hedge_wins = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='byte-genie-hedge',
+                )
+            return self._executor
+
+    def record_latency(self, func: str, latency: float):
+        with self._lock:
+            if func not in self.latencies:
+                self.latencies[func] = deque(maxlen=self.window)
+            self.latencies[func].append(latency)
+
+    def get_delay(self, func: str):
+        """
+        Time to wait before hedging a call to func, or None if there are too few latency samples for func
+        :param func: endpoint
+        :return:
+        """
+        with self._lock:
+            latencies = list(self.latencies.get(func, []))
+        if len(latencies) < self.min_samples:
+            return None
+        import numpy as np
+        return max(self.min_delay, float(np.percentile(latencies, self.percentile)))
+
+    def allow_hedge(self):
+        with self._lock:
+            if self.can_hedge():
+                self.n_hedges += 1
+                return True
+            return False
+
+    def can_hedge(self):
+        """Whether the hedge budget has room for another hedge (call with lock held)"""
+        return self.n_hedges + 1 <= self.max_hedge_ratio * self.n_calls
+
+    def _start_call(self, func: str):
+        with self._lock:
+            self.n_calls += 1
+        return self.get_delay(func=func)
+
+    def run(self, fn, func: str, executor: concurrent.futures.Executor = None):
+        """
+        Run fn(), hedging it with a second fn() call if it is slower than the hedging delay of func.
+        Both calls run on `executor`, so that the caller can return as soon as either call succeeds;
+        the hedging delay starts when the first call starts running, so it does not include time spent queueing.
+        Calls that cannot be hedged (too few latency samples, or no room in the hedge budget) run on the calling thread.
+        :param fn: function making the call
+        :param func: endpoint called by fn
+        :param executor: thread pool to run hedged calls on (None for the policy's own pool, see max_workers);
+            it should not be a pool the caller itself runs on, so that calls can't queue behind their callers
+        :return: result of the first call to succeed
+        """
+        delay = self._start_call(func=func)
+        with self._lock:
+            can_hedge = self.can_hedge()
+        if (delay is None) or (not can_hedge):
+            start_time = time.monotonic()
+            result = fn()
+            self.record_latency(func=func, latency=time.monotonic() - start_time)
+            return result
+        if executor is None:
+            executor = self.get_executor()
+
+        def run_call(started: threading.Event = None):
+            if started is not None:
+                started.set()
+            call_start_time = time.monotonic()
+            call_result = fn()
+            ## latencies of all completed calls are recorded, including those of calls that lost the race,
+            ## so that the hedging delay is not biased towards the faster call
+            self.record_latency(func=func, latency=time.monotonic() - call_start_time)
+            return call_result
+
+        first_started = threading.Event()
+        future = executor.submit(run_call, first_started)
+        first_started.wait()
+        done, pending = concurrent.futures.wait([future], timeout=delay)
+        pending = {future}
+        if (not done) and self.allow_hedge():
+            pending.add(executor.submit(run_call))
+        error = None
+        try:
+            while pending:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for done_future in done:
+                    if done_future.exception() is None:
+                        if done_future is not future:
+                            with self._lock:
+                                self.n_hedge_wins += 1
+                        return done_future.result()
+                    error = done_future.exception()
+        finally:
+            ## hedges still queued on the pool are not sent (calls already running are left to complete)
+            for pending_future in pending:
+                pending_future.cancel()
+        raise error
+
+    async def async_run(self, coro_fn, func: str):
+        """
+        Await coro_fn(), hedging it with a second coro_fn() call if it is slower than the hedging delay of func;
+        the slower call is cancelled
+        :param coro_fn: function returning a coroutine that makes the call
+        :param func: endpoint called by coro_fn
+        :return: result of the first call to succeed
+        """
+        delay = self._start_call(func=func)
+        start_time = time.monotonic()
+        if delay is None:
+            result = await coro_fn()
+            self.record_latency(func=func, latency=time.monotonic() - start_time)
+            return result
+        start_times = {}
+        task = asyncio.ensure_future(coro_fn())
+        start_times[task] = start_time
+        done, pending = await asyncio.wait([task], timeout=delay)
+        pending = {task}
+        if (not done) and self.allow_hedge():
+            hedge = asyncio.ensure_future(coro_fn())
+            start_times[hedge] = time.monotonic()
+            pending.add(hedge)
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for done_task in done:
+                    if done_task.exception() is None:
+                        self.record_latency(func=func, latency=time.monotonic() - start_times[done_task])
+                        if done_task is not task:
+                            with self._lock:
+                                self.n_hedge_wins += 1
+                        return done_task.result()
+                    error = done_task.exception()
+        finally:
+            for pending_task in pending:
+                pending_task.cancel()
+        raise error
+
+    def get_stats(self):
+        stats = {
+            'n_calls': self.n_calls,
+            'n_hedges': self.n_hedges,
+            'n_hedge_wins': self.n_hedge_wins,
+            'delays': {func: self.get_delay(func) for func in list(self.latencies.keys())},
+        }
+        return stats
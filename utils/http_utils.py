@@ -0,0 +1,251 @@
+"""
+HTTP helpers for byte-genie API
+"""
+
+import asyncio
+import threading
+
+from utils.logging import logger
+
+
+class HttpTransport:
+    """
+    Pooled keep-alive HTTP transport.
+    Wraps a `requests.Session` whose connection pools are reused across calls and across threads
+    (e.g. the executor threads used by `to_async`), so repeated api calls skip the TCP/TLS handshake.
+    A single transport can be shared by several `ByteGenie` clients.
+    """
+
+    def __init__(
+            self,
+            pool_connections: int = 10,
+            pool_maxsize: int = 64,
+            pool_block: bool = False,
+            verbose: int = 1,
+    ):
+        """
+        :param pool_connections: number of hosts for which to keep a connection pool
+        :param pool_maxsize: max number of connections to keep open per host
+        :param pool_block: whether to block when all connections to a host are in use (instead of opening extra, non-pooled ones)
+        :param verbose: whether to write logs or not
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.verbose = verbose
+        self._lock = threading.Lock()
+        self._n_requests = 0
+        self._n_errors = 0
+        self._session = None
+
+    @property
+    def session(self):
+        """
+        Pooled session, created on first use (so that requests is only imported once a call is made)
+        """
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self.create_session()
+        return self._session
+
+    def create_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def request(self, method: str, url: str, **kwargs):
+        """
+        Make an http request over the pooled session
+        :param method: http method
+        :param url: url to call
+        :param kwargs: other arguments passed to `requests.Session.request`
+        :return:
+        """
+        with self._lock:
+            self._n_requests += 1
+        try:
+            return self.session.request(method=method, url=url, **kwargs)
+        except Exception:
+            with self._lock:
+                self._n_errors += 1
+            raise
+
+    def get_pool_stats(self):
+        """
+        Get connection pool statistics, per host
+        :return:
+        """
+        hosts = []
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                hosts.append({
+                    'scheme': pool.scheme,
+                    'host': pool.host,
+                    'port': pool.port,
+                    'num_connections': pool.num_connections,
+                    'num_requests': pool.num_requests,
+                    'idle_connections': pool.pool.qsize() if pool.pool is not None else 0,
+                    'pool_maxsize': pool.pool.maxsize if pool.pool is not None else 0,
+                })
+        n_connections = sum([host['num_connections'] for host in hosts])
+        stats = {
+            'n_requests': self._n_requests,
+            'n_errors': self._n_errors,
+            'n_connections': n_connections,
+            'connection_reuse': (1 - n_connections / self._n_requests) if self._n_requests else 0,
+            'hosts': hosts,
+        }
+        return stats
+
+    def close(self):
+        if self._session is None:
+            return
+        try:
+            self._session.close()
+        except Exception as e:
+            if self.verbose:
+                logger.error(f"Error in HttpTransport.close(): {e}")
+
+
+_shared_transport = None
+_shared_transport_lock = threading.Lock()
+
+
+def get_shared_transport(**kwargs):
+    """
+    Get the process-wide transport shared across `ByteGenie` clients, creating it on first use
+    :param kwargs: arguments for `HttpTransport`, only used when the shared transport is first created
+    :return:
+    """
+    global _shared_transport
+    with _shared_transport_lock:
+        if _shared_transport is None:
+            _shared_transport = HttpTransport(**kwargs)
+        return _shared_transport
+
+
+class AsyncHttpTransport:
+    """
+    Non-blocking pooled HTTP transport, built on aiohttp.
+    An `aiohttp.ClientSession` is bound to the event loop it was created in, so the transport keeps one session
+    per loop (e.g. the shared runner loop used by `run_async_tasks`, and the caller's own loop),
+    and each session, with its connection pool, is reused by all calls made from its loop.
+    `limit` and `limit_per_host` apply per session.
+    """
+
+    def __init__(
+            self,
+            limit: int = 1000,
+            limit_per_host: int = 0,
+            keepalive_timeout: float = 30,
+            verbose: int = 1,
+    ):
+        """
+        :param limit: max number of simultaneous connections (0 for no limit)
+        :param limit_per_host: max number of simultaneous connections per host (0 for no limit)
+        :param keepalive_timeout: time (in seconds) to keep idle connections open for reuse
+        :param verbose: whether to write logs or not
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.verbose = verbose
+        ## sessions, as {loop: session}
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._n_requests = 0
+        self._n_errors = 0
+
+    def get_session(self):
+        try:
+            import aiohttp
+        except ImportError:
+            raise ImportError("aiohttp is required for async http calls: `pip install aiohttp`")
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            ## sessions of closed loops can no longer be used (or closed)
+            for closed_loop in [_loop for _loop in self._sessions.keys() if _loop.is_closed()]:
+                self._sessions.pop(closed_loop)
+            session = self._sessions.get(loop)
+            if (session is None) or session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    keepalive_timeout=self.keepalive_timeout,
+                )
+                session = aiohttp.ClientSession(connector=connector)
+                self._sessions[loop] = session
+        return session
+
+    async def request(self, method: str, url: str, timeout: float = None, **kwargs):
+        """
+        Make an http request, and return its status code, headers and raw body
+        :param method: http method
+        :param url: url to call
+        :param timeout: total timeout for the request, in seconds
+        :param kwargs: other arguments passed to `aiohttp.ClientSession.request`
+        :return:
+        """
+        import aiohttp
+        session = self.get_session()
+        self._n_requests += 1
+        try:
+            async with session.request(
+                    method=method,
+                    url=url,
+                    timeout=aiohttp.ClientTimeout(total=timeout),
+                    **kwargs,
+            ) as response:
+                body = await response.read()
+                return response.status, dict(response.headers), body
+        except Exception:
+            self._n_errors += 1
+            raise
+
+    def get_pool_stats(self):
+        """
+        Get connection pool statistics (connections summed over the sessions of all loops)
+        :return:
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+        n_connections = 0
+        for session in sessions:
+            if not session.closed:
+                n_connections += len(getattr(session.connector, '_acquired', []))
+        stats = {
+            'n_requests': self._n_requests,
+            'n_errors': self._n_errors,
+            'n_sessions': len(sessions),
+            'n_active_connections': n_connections,
+            'limit': self.limit,
+            'limit_per_host': self.limit_per_host,
+        }
+        return stats
+
+    async def close(self):
+        """Close the sessions of all loops, each on its own loop (sessions of stopped loops are dropped)."""
+        with self._lock:
+            sessions = self._sessions
+            self._sessions = {}
+        current_loop = asyncio.get_running_loop()
+        for loop, session in sessions.items():
+            if session.closed:
+                continue
+            if loop is current_loop:
+                await session.close()
+            elif loop.is_running() and (not loop.is_closed()):
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), loop))
@@ -0,0 +1,102 @@
+"""
+Memoization of deterministic byte-genie API calls
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+
+class MemoStore:
+    """
+    SQLite-backed key-value store of outputs of deterministic api calls (e.g. slugify, standardise_years, embed_data).
+    Values are stored as json; safe to share across threads.
+    """
+
+    def __init__(
+            self,
+            db_file: str = os.path.join(os.path.expanduser('~'), '.cache', 'byte-genie', 'memo.sqlite'),
+    ):
+        """
+        :param db_file: sqlite database file to store memoized outputs in
+        """
+        self.db_file = db_file
+        self.n_hits = 0
+        self.n_misses = 0
+        if os.path.dirname(db_file):
+            os.makedirs(os.path.dirname(db_file), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS memo (key TEXT PRIMARY KEY, func TEXT, value TEXT, created_at REAL)'
+            )
+            self._conn.commit()
+
+    def get_many(self, keys: list):
+        """
+        Get memoized values for a list of keys
+        :param keys: keys to look up
+        :return: dict of {key: value} for keys found in the store
+        """
+        values = {}
+        unique_keys = list(set(keys))
+        ## sqlite limits the number of query parameters, so look keys up in chunks
+        chunk_size = 500
+        with self._lock:
+            for start in range(0, len(unique_keys), chunk_size):
+                chunk = unique_keys[start:start + chunk_size]
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM memo WHERE key IN ({', '.join(['?'] * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, value in rows:
+                    values[key] = json.loads(value)
+        self.n_hits += len([key for key in keys if key in values])
+        self.n_misses += len([key for key in keys if key not in values])
+        return values
+
+    def get(self, key: str):
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: dict, func: str = None):
+        """
+        Store values
+        :param items: dict of {key: value}, with json-serialisable values
+        :param func: endpoint the values are outputs of
+        :return:
+        """
+        now = time.time()
+        rows = [(key, func, json.dumps(value), now) for key, value in items.items()]
+        with self._lock:
+            self._conn.executemany('INSERT OR REPLACE INTO memo VALUES (?, ?, ?, ?)', rows)
+            self._conn.commit()
+
+    def put(self, key: str, value, func: str = None):
+        self.put_many({key: value}, func=func)
+
+    def clear(self, func: str = None):
+        """
+        Delete memoized values, of one endpoint, or of all endpoints
+        :param func: endpoint to delete values for (None for all)
+        :return:
+        """
+        with self._lock:
+            if func is None:
+                self._conn.execute('DELETE FROM memo')
+            else:
+                self._conn.execute('DELETE FROM memo WHERE func = ?', (func,))
+            self._conn.commit()
+
+    def get_stats(self):
+        with self._lock:
+            n_entries = self._conn.execute('SELECT COUNT(*) FROM memo').fetchone()[0]
+        stats = {
+            'n_hits': self.n_hits,
+            'n_misses': self.n_misses,
+            'n_entries': n_entries,
+        }
+        return stats
@@ -0,0 +1,191 @@
+"""
+Background polling of task output files, to resolve futures of scheduled byte-genie tasks
+"""
+
+import time
+import threading
+import concurrent.futures
+
+from utils.logging import logger
+from utils.retry_utils import get_backoff_interval
+
+
+class OutputPoller:
+    """
+    Resolves futures with the output data of scheduled tasks, once their output files exist.
+    A single background thread checks output files of all pending futures in rounds, many files per api request
+    (see ByteGenie.check_files_exist()), reads the outputs of files that exist in batched requests,
+    and backs off exponentially, with jitter, between rounds in which no output became available.
+    Files of newly submitted futures are checked early, without waiting for the next round (and without checking
+    other pending files), at most once per `min_interval` seconds, however often futures are submitted.
+    The thread is started on the first submitted future, and stops once no futures are pending.
+    """
+
+    def __init__(
+            self,
+            wait_interval: float = 5,
+            max_interval: float = 60,
+            min_interval: float = 1,
+            batch_size: int = 100,
+            read_batch_size: int = 20,
+    ):
+        """
+        :param wait_interval: wait time (in seconds) after a round in which outputs became available
+        :param max_interval: max wait time (in seconds) between rounds
+        :param min_interval: min time (in seconds) between two checks of files of newly submitted futures
+        :param batch_size: max number of files to check per api request
+        :param read_batch_size: max number of output files to read per api request
+        """
+        self.wait_interval = wait_interval
+        self.max_interval = max_interval
+        self.min_interval = min_interval
+        self.batch_size = batch_size
+        self.read_batch_size = read_batch_size
+        ## pending futures, as {(client id, output file): (client, future, deadline)}
+        self._pending = {}
+        ## keys of futures submitted since the last check
+        self._new_keys = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.n_rounds = 0
+        self.n_resolved = 0
+
+    def submit(self, client, output_file: str, wait_time_max: float = 15 * 60):
+        """
+        Get a future resolving to the output data of a task, once its output file exists.
+        Futures of the same output file (and client) are shared.
+        :param client: sync client to check and read the output file with
+        :param output_file: output file of the task
+        :param wait_time_max: max time (in seconds) to wait for the output file, after which the future fails
+            with a TimeoutError
+        :return: concurrent.futures.Future, which can be awaited with asyncio.wrap_future()
+        """
+        key = (id(client), output_file)
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key][1]
+            future = concurrent.futures.Future()
+            self._pending[key] = (client, future, time.monotonic() + wait_time_max)
+            self._new_keys.add(key)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='byte-genie-output-poller', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return future
+
+    def get_n_pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def get_stats(self):
+        stats = {
+            'n_pending': self.get_n_pending(),
+            'n_rounds': self.n_rounds,
+            'n_resolved': self.n_resolved,
+        }
+        return stats
+
+    def _run(self):
+        n_idle_rounds = 0
+        ## time of the next round over all pending futures
+        next_round_time = time.monotonic()
+        while True:
+            self._wakeup.clear()
+            with self._lock:
+                if not len(self._pending):
+                    self._thread = None
+                    return
+                full_round = time.monotonic() >= next_round_time
+                if full_round:
+                    pending = dict(self._pending)
+                else:
+                    pending = {key: self._pending[key] for key in self._new_keys if key in self._pending}
+                self._new_keys = set()
+            n_resolved = self._poll(pending=pending)
+            if full_round:
+                self.n_rounds += 1
+                n_idle_rounds = 0 if n_resolved else n_idle_rounds + 1
+                next_round_time = time.monotonic() + get_backoff_interval(
+                    attempt=n_idle_rounds,
+                    wait_interval=self.wait_interval,
+                    max_interval=self.max_interval,
+                )
+            ## wake up early for newly submitted futures, but at most once per min_interval
+            time.sleep(min(self.min_interval, max(0, next_round_time - time.monotonic())))
+            self._wakeup.wait(max(0, next_round_time - time.monotonic()))
+
+    def _poll(self, pending: dict):
+        """
+        Check output files of pending futures, and resolve futures of files that exist, or whose deadline passed
+        :param pending: pending futures, as {(client id, output file): (client, future, deadline)}
+        :return: number of resolved futures
+        """
+        client_files = {}
+        for (client_id, output_file), (client, future, deadline) in pending.items():
+            if future.cancelled():
+                self._pop(key=(client_id, output_file))
+            elif time.monotonic() > deadline:
+                self._resolve(key=(client_id, output_file), error=TimeoutError(f"output file {output_file} not found"))
+            else:
+                client_files.setdefault(client_id, (client, []))[1].append(output_file)
+        n_resolved = 0
+        for client_id, (client, files) in client_files.items():
+            try:
+                files_exist = client.check_files_exist(files=files, batch_size=self.batch_size)
+                existing_files = [file for file in files if files_exist.get(file)]
+                for start in range(0, len(existing_files), self.read_batch_size):
+                    read_files = existing_files[start:start + self.read_batch_size]
+                    batch = client.create_batch(batch_size=self.read_batch_size)
+                    for file in read_files:
+                        batch.read_file(file=file)
+                    for file, resp in zip(read_files, batch.execute()):
+                        data = resp.get_data()
+                        if data is None:
+                            error = resp.response.get('error') if isinstance(resp.response, dict) else None
+                            self._resolve(
+                                key=(client_id, file),
+                                error=RuntimeError(f"could not read output file {file}: {error or resp.get_status()}"),
+                            )
+                        else:
+                            self._resolve(key=(client_id, file), result=data)
+                        n_resolved += 1
+            except Exception as e:
+                logger.warning(f"Error in OutputPoller: {e}")
+        return n_resolved
+
+    def _pop(self, key: tuple):
+        with self._lock:
+            return self._pending.pop(key, None)
+
+    def _resolve(self, key: tuple, result=None, error: Exception = None):
+        item = self._pop(key=key)
+        if item is None:
+            return
+        client, future, deadline = item
+        ## the future may have been cancelled by its caller in the meantime
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+                self.n_resolved += 1
+        except concurrent.futures.InvalidStateError:
+            pass
+
+
+## poller shared by all responses (see get_shared_poller())
+_shared_poller = None
+_shared_poller_lock = threading.Lock()
+
+
+def get_shared_poller():
+    """
+    Get the process-wide output poller, creating it on first use
+    :return:
+    """
+    global _shared_poller
+    with _shared_poller_lock:
+        if _shared_poller is None:
+            _shared_poller = OutputPoller()
+        return _shared_poller
@@ -0,0 +1,167 @@
+"""
+Parsing and indexing of hive-partitioned byte-genie output paths, e.g.
+gs://db-genie/entity_type=url/entity=<doc_name>/data_type=structured/format=csv/variable_desc=structured-quant-summary/source=page-quants/<doc_name>_pagenum-7_page-quants_structured-quant-summary.csv
+"""
+
+import re
+import pandas as pd
+
+
+## fields parsed from output paths
+PATH_FIELDS = ['entity_type', 'entity', 'data_type', 'format', 'variable_desc', 'source', 'pagenum', 'query']
+
+## partitions (key=value directories), followed by the file name
+_PATH_RE = re.compile(
+    r'^(?:.*?/)?'
+    r'(?:entity_type=(?P<entity_type>[^/]*)/)?'
+    r'entity=(?P<entity>[^/]*)/'
+    r'(?:data_type=(?P<data_type>[^/]*)/)?'
+    r'(?:format=(?P<format>[^/]*)/)?'
+    r'(?:variable_desc=(?P<variable_desc>[^/]*)/)?'
+    r'(?:source=(?P<source>[^/]*)/)?'
+    r'(?:.*/)?(?P<filename>[^/]*)$'
+)
+## page number and query, encoded in the file name, e.g. <doc_name>_pagenum-7_..._query-<query>.csv;
+## like splitting the file name without its extension on the last '_pagenum-' and '_query-',
+## the page number runs up to the next '_', and the query up to the extension (queries may contain dots)
+_FILENAME_RE = re.compile(
+    r'^(?=(?:.*_pagenum-(?P<pagenum>\d+)(?:_|(?:\.[^.]*)?$))?)'
+    r'(?=(?:.*_query-(?P<query>.*?)(?:\.[^.]*)?$)?)'
+)
+
+
+def parse_path(file: str):
+    """
+    Parse an output path into its fields
+    :param file: output path
+    :return: dict of {field: value} (see PATH_FIELDS), with None for fields missing from the path;
+        pagenum is an int
+    """
+    fields = {field: None for field in PATH_FIELDS}
+    match = _PATH_RE.match(file) if isinstance(file, str) else None
+    if match is None:
+        return fields
+    fields.update({field: val for field, val in match.groupdict().items() if field in fields})
+    filename_match = _FILENAME_RE.match(match.group('filename'))
+    fields['pagenum'] = int(filename_match.group('pagenum')) if filename_match.group('pagenum') is not None else None
+    fields['query'] = filename_match.group('query')
+    return fields
+
+
+def parse_paths(files):
+    """
+    Parse output paths into their fields, in one vectorised pass over all paths
+    :param files: list or Series of output paths
+    :return: dataframe with a 'file' column, and one column per field (see PATH_FIELDS), aligned with files;
+        pagenum is a nullable int column
+    """
+    files = pd.Series(files, dtype=object).reset_index(drop=True)
+    df_fields = files.astype(str).str.extract(_PATH_RE)
+    df_filename = df_fields['filename'].str.extract(_FILENAME_RE)
+    df_fields['pagenum'] = pd.to_numeric(df_filename['pagenum']).astype('Int64')
+    df_fields['query'] = df_filename['query']
+    df_fields = df_fields[PATH_FIELDS]
+    ## missing fields as None, rather than NaN
+    df_fields = df_fields.astype(object).where(df_fields.notna(), None)
+    df_fields['pagenum'] = df_fields['pagenum'].astype('Int64')
+    df_fields.insert(0, 'file', files)
+    return df_fields
+
+
+def get_doc_name(file: str):
+    """
+    Document name (entity) of an output path
+    :param file: output path
+    :return:
+    """
+    return parse_path(file)['entity']
+
+
+class PathIndex:
+    """
+    In-memory index of output paths, to look files up by their fields (e.g. doc name, page number, variable)
+    without scanning path strings every time.
+    Paths are parsed once, when added to the index.
+    """
+
+    def __init__(
+            self,
+            files: list = None,
+            fields: list = ('entity', 'data_type', 'format', 'variable_desc', 'source', 'pagenum', 'query'),
+    ):
+        """
+        :param files: output paths to index
+        :param fields: fields to index files by
+        """
+        self.fields = list(fields)
+        self.df = pd.DataFrame(columns=['file'] + PATH_FIELDS)
+        self._index = {field: {} for field in self.fields}
+        if files is not None:
+            self.add(files)
+
+    def add(self, files):
+        """
+        Add output paths to the index
+        :param files: list or Series of output paths
+        :return:
+        """
+        df_new = parse_paths(files)
+        df_new = df_new[~df_new['file'].isin(self.df['file'])].drop_duplicates('file')
+        offset = len(self.df)
+        df_new.index = range(offset, offset + len(df_new))
+        for field in self.fields:
+            field_index = self._index[field]
+            for position, val in enumerate(df_new[field].tolist(), start=offset):
+                if (val is not None) and (val is not pd.NA):
+                    field_index.setdefault(val, set()).add(position)
+        self.df = pd.concat([self.df, df_new]) if offset else df_new
+        return self
+
+    def __len__(self):
+        return len(self.df)
+
+    def find_positions(self, **kwargs):
+        """
+        Positions (in self.df) of files matching all given field values
+        :param kwargs: {field: value}, or {field: list of values}, e.g. entity='doc-name', pagenum=[0, 1]
+        :return:
+        """
+        positions = None
+        for field, vals in kwargs.items():
+            if field not in self._index:
+                raise ValueError(f"{field} is not indexed; indexed fields: {self.fields}")
+            if not isinstance(vals, (list, tuple, set)):
+                vals = [vals]
+            field_positions = set()
+            for val in vals:
+                field_positions.update(self._index[field].get(val, set()))
+            positions = field_positions if positions is None else positions & field_positions
+            if not positions:
+                break
+        if positions is None:
+            positions = range(len(self.df))
+        return sorted(positions)
+
+    def find(self, **kwargs):
+        """
+        Files matching all given field values
+        :param kwargs: {field: value}, or {field: list of values}, e.g. entity='doc-name', pagenum=[0, 1]
+        :return: list of files
+        """
+        return self.df['file'].iloc[self.find_positions(**kwargs)].tolist()
+
+    def find_df(self, **kwargs):
+        """
+        Parsed fields of files matching all given field values
+        :param kwargs: {field: value}, or {field: list of values}
+        :return: dataframe
+        """
+        return self.df.iloc[self.find_positions(**kwargs)].reset_index(drop=True)
+
+    def get_values(self, field: str):
+        """
+        Distinct values of an indexed field
+        :param field: indexed field
+        :return:
+        """
+        return sorted(self._index[field].keys())
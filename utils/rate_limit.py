@@ -0,0 +1,163 @@
+"""
+Client-side rate limiting for byte-genie API calls
+"""
+
+import time
+import asyncio
+import threading
+
+
+class TokenBucket:
+    """
+    Token bucket allowing `rate` requests per second on average, with bursts of up to `burst` requests.
+    Tokens are reserved up front, so callers asking for more tokens than are available (or than burst)
+    go into debt, and wait exactly as long as it takes for the bucket to refill.
+    Safe to share across threads; `async_acquire()` waits without blocking the event loop.
+    """
+
+    def __init__(
+            self,
+            rate: float,
+            burst: int = None,
+    ):
+        """
+        :param rate: number of tokens (requests) added to the bucket per second
+        :param burst: max number of tokens the bucket can hold (defaults to max(1, rate))
+        """
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        if burst is None:
+            burst = max(1, int(rate))
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int = 1):
+        """
+        Reserve tokens, and return the time (in seconds) to wait before they become available
+        :param tokens: number of tokens to reserve
+        :return:
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            self._tokens = self._tokens - tokens
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens: int = 1):
+        """
+        Block until tokens are available
+        :param tokens: number of tokens to acquire
+        :return: time spent waiting, in seconds
+        """
+        wait_time = self._reserve(tokens=tokens)
+        if wait_time > 0:
+            time.sleep(wait_time)
+        return wait_time
+
+    async def async_acquire(self, tokens: int = 1):
+        """
+        Wait (without blocking the event loop) until tokens are available
+        :param tokens: number of tokens to acquire
+        :return: time spent waiting, in seconds
+        """
+        wait_time = self._reserve(tokens=tokens)
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+        return wait_time
+
+    def get_tokens(self):
+        with self._lock:
+            now = time.monotonic()
+            return min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+
+
+class RateLimiter:
+    """
+    Rate limiter for byte-genie API calls, with an optional global limit, and optional limits per endpoint (func).
+    Each task in a payload costs one token from the global bucket and from the bucket of its func.
+    """
+
+    def __init__(
+            self,
+            rate: float = None,
+            burst: int = None,
+            func_rates: dict = None,
+    ):
+        """
+        :param rate: global number of tasks allowed per second (None for no global limit)
+        :param burst: global burst size
+        :param func_rates: rate limits per endpoint, as {func: rate} or {func: (rate, burst)}
+        """
+        self._lock = threading.Lock()
+        self.global_bucket = None
+        self.func_buckets = {}
+        self.wait_time = 0
+        if rate is not None:
+            self.set_rate(rate=rate, burst=burst)
+        if func_rates is not None:
+            for func, func_rate in func_rates.items():
+                if isinstance(func_rate, (list, tuple)):
+                    self.set_rate(rate=func_rate[0], burst=func_rate[1], func=func)
+                else:
+                    self.set_rate(rate=func_rate, func=func)
+
+    def set_rate(self, rate: float = None, burst: int = None, func: str = None):
+        """
+        Set (or remove, with rate=None) the global rate limit, or the rate limit of a given func
+        :param rate: number of tasks allowed per second
+        :param burst: burst size
+        :param func: endpoint to set the rate limit for (None for the global rate limit)
+        :return:
+        """
+        bucket = TokenBucket(rate=rate, burst=burst) if rate is not None else None
+        with self._lock:
+            if func is None:
+                self.global_bucket = bucket
+            elif bucket is None:
+                self.func_buckets.pop(func, None)
+            else:
+                self.func_buckets[func] = bucket
+
+    def get_buckets(self, funcs: list):
+        """
+        Get buckets, and number of tokens to take from each, for a list of funcs (one per task)
+        :param funcs: funcs of all tasks in a payload
+        :return:
+        """
+        buckets = []
+        if self.global_bucket is not None:
+            buckets.append((self.global_bucket, len(funcs)))
+        for func in set(funcs):
+            if func in self.func_buckets:
+                buckets.append((self.func_buckets[func], funcs.count(func)))
+        return buckets
+
+    def acquire(self, funcs: list):
+        """
+        Block until all tasks with the given funcs are allowed to run
+        :param funcs: funcs of all tasks in a payload
+        :return:
+        """
+        wait_time = max([0] + [bucket._reserve(tokens) for bucket, tokens in self.get_buckets(funcs)])
+        if wait_time > 0:
+            self.wait_time += wait_time
+            time.sleep(wait_time)
+        return wait_time
+
+    async def async_acquire(self, funcs: list):
+        """
+        Wait (without blocking the event loop) until all tasks with the given funcs are allowed to run
+        :param funcs: funcs of all tasks in a payload
+        :return:
+        """
+        wait_time = max([0] + [bucket._reserve(tokens) for bucket, tokens in self.get_buckets(funcs)])
+        if wait_time > 0:
+            self.wait_time += wait_time
+            await asyncio.sleep(wait_time)
+        return wait_time
@@ -0,0 +1,421 @@
+"""
+Retry policy for byte-genie API calls
+"""
+
+import time
+import random
+import threading
+import email.utils
+
+from utils.logging import logger
+
+
+class RetryableStatusError(Exception):
+    """
+    Raised for api responses with a retryable http status (e.g. 429, 503), to trigger a retry
+    """
+
+    def __init__(self, status_code: int, headers: dict = None, response=None):
+        self.status_code = status_code
+        self.headers = headers if headers is not None else {}
+        self.response = response
+        self.retry_after = parse_retry_after(self.headers)
+        super().__init__(f"api call failed with retryable status {status_code}")
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when calling an endpoint whose circuit breaker is open
+    """
+
+    def __init__(self, func: str, retry_in: float):
+        self.func = func
+        self.retry_in = retry_in
+        super().__init__(f"circuit breaker for {func} is open: backend is unhealthy, retry in {retry_in:.0f}s")
+
+
+def parse_retry_after(headers: dict):
+    """
+    Parse the Retry-After header (seconds, or an http date) into seconds to wait
+    :param headers: response headers
+    :return: seconds to wait, or None if the header is missing or invalid
+    """
+    retry_after = None
+    for key, val in headers.items():
+        if key.lower() == 'retry-after':
+            retry_after = val
+    if retry_after is None:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except (TypeError, ValueError):
+        pass
+    try:
+        retry_date = email.utils.parsedate_to_datetime(retry_after)
+        return max(0.0, retry_date.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def get_backoff_interval(attempt: int, wait_interval: float = 5, max_interval: float = 60):
+    """
+    Wait time before the next poll, growing exponentially with the number of polls so far, with jitter,
+    so that many waiters started together do not poll in lockstep
+    :param attempt: number of polls so far (0 for the first wait)
+    :param wait_interval: base wait time (in seconds)
+    :param max_interval: max wait time (in seconds), before jitter
+    :return: wait time (in seconds), between half and all of the capped exponential wait time
+    """
+    backoff = min(max_interval, wait_interval * (2 ** min(attempt, 32)))
+    return backoff / 2 + random.uniform(0, backoff / 2)
+
+
+class PollingRounds:
+    """
+    State of a polling loop over pending items (e.g. files to wait for): the items still pending,
+    the number of rounds so far, and the wait before the next round, growing exponentially with jitter
+    (see get_backoff_interval()), within a max total wait time.
+    Each round, the caller checks the pending items, passes those that are done to update(),
+    and sleeps for next_wait(), until next_wait() returns None.
+    """
+
+    def __init__(
+            self,
+            items: list,
+            wait_interval: float = 5,
+            max_interval: float = 60,
+            wait_time_max: float = 15 * 60,
+            reset_on_progress: int = 0,
+    ):
+        """
+        :param items: items to poll
+        :param wait_interval: wait time (in seconds) after the first round
+        :param max_interval: max wait time (in seconds) between rounds
+        :param wait_time_max: max total wait time (in seconds)
+        :param reset_on_progress: whether to go back to waiting wait_interval after a round in which items were done
+        """
+        self.pending = list(items)
+        self.wait_interval = wait_interval
+        self.max_interval = max_interval
+        self.wait_time_max = wait_time_max
+        self.reset_on_progress = reset_on_progress
+        self.deadline = time.monotonic() + wait_time_max
+        self.n_rounds = 0
+
+    def update(self, done):
+        """
+        Drop items that are done from the pending items
+        :param done: items found to be done in the last round
+        :return:
+        """
+        done = set(done)
+        self.pending = [item for item in self.pending if item not in done]
+        if self.reset_on_progress and len(done):
+            self.n_rounds = 0
+
+    def next_wait(self):
+        """
+        Get the wait time before the next round
+        :return: wait time (in seconds), or None if there is no next round
+            (no pending items left, or the max total wait time is reached)
+        """
+        if not len(self.pending):
+            return None
+        wait_time = get_backoff_interval(
+            attempt=self.n_rounds,
+            wait_interval=self.wait_interval,
+            max_interval=self.max_interval,
+        )
+        wait_time = min(wait_time, self.deadline - time.monotonic())
+        if wait_time <= 0:
+            return None
+        self.n_rounds += 1
+        return wait_time
+
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of requests, so that retries cannot multiply load on an unhealthy backend.
+    Every request deposits `ratio` tokens, every retry withdraws one; `min_retries` tokens are always available.
+    """
+
+    def __init__(
+            self,
+            ratio: float = 0.2,
+            min_retries: int = 10,
+            max_tokens: float = 100,
+    ):
+        """
+        :param ratio: number of retries allowed per request
+        :param min_retries: number of retries allowed regardless of the number of requests
+        :param max_tokens: max number of unused retry tokens that can build up
+        """
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = float(min_retries)
+        self.n_retries = 0
+        self.n_exhausted = 0
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self):
+        """
+        Take a retry token
+        :return: whether a retry is allowed
+        """
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.n_retries += 1
+                return True
+            self.n_exhausted += 1
+            return False
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one endpoint.
+    Opens after `failure_threshold` consecutive retryable failures, rejecting calls for `reset_timeout` seconds;
+    then lets one trial call through (half-open), and closes again if it succeeds.
+    A trial call that ends without an outcome (e.g. cancelled) lets the next call through as a new trial,
+    and one that has not reported back within `trial_timeout` seconds counts as failed.
+    """
+
+    def __init__(
+            self,
+            failure_threshold: int = 5,
+            reset_timeout: float = 30,
+            trial_timeout: float = 60,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.trial_timeout = trial_timeout
+        self.state = 'closed'
+        self.n_failures = 0
+        self._opened_at = 0
+        self._trial_started_at = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Whether a call is allowed
+        :return: (allowed, seconds until calls are allowed again)
+        """
+        with self._lock:
+            if self.state == 'closed':
+                return True, 0
+            now = time.monotonic()
+            if self.state == 'half_open':
+                trial_time_left = self._trial_started_at + self.trial_timeout - now
+                if trial_time_left > 0:
+                    return False, trial_time_left
+                ## the trial call never reported back: count it as failed
+                self._open(now=now)
+            retry_in = self._opened_at + self.reset_timeout - now
+            if retry_in <= 0:
+                self.state = 'half_open'
+                self._trial_started_at = now
+                return True, 0
+            return False, retry_in
+
+    def _open(self, now: float):
+        self.state = 'open'
+        self._opened_at = now
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.n_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.n_failures += 1
+            if (self.state == 'half_open') or (self.n_failures >= self.failure_threshold):
+                self._open(now=time.monotonic())
+
+    def record_abandoned(self):
+        """
+        Record a call that ended without telling whether the backend is healthy
+        (cancelled, or failed with a non-retryable error); if it was the trial call, let the next call through
+        """
+        with self._lock:
+            if self.state == 'half_open':
+                self._open(now=time.monotonic() - self.reset_timeout)
+
+
+class RetryPolicy:
+    """
+    Retry policy for byte-genie API calls:
+    - only retries connection errors, timeouts, and retryable http statuses (429, 5xx), never other 4xx
+      responses or errors in handling the response;
+    - waits for exponential backoff with full jitter, or for the server's Retry-After hint, whichever is longer;
+    - stops after `max_attempts` attempts, or once `max_total_time` seconds have passed across attempts;
+    - draws every retry from a retry budget shared by all calls of the client;
+    - keeps a circuit breaker per endpoint, failing fast while the backend is unhealthy.
+    """
+
+    def __init__(
+            self,
+            max_attempts: int = 5,
+            max_total_time: float = 20 * 60,
+            wait_multiplier: float = 5,
+            wait_max: float = 120,
+            max_retry_after: float = 10 * 60,
+            retry_statuses: tuple = (429, 500, 502, 503, 504),
+            budget: RetryBudget = None,
+            failure_threshold: int = 5,
+            reset_timeout: float = 30,
+            trial_timeout: float = 60,
+            verbose: int = 1,
+    ):
+        """
+        :param max_attempts: max number of attempts per api call
+        :param max_total_time: max time (in seconds) spent on an api call across all attempts
+        :param wait_multiplier: base wait time (in seconds) of the exponential backoff
+        :param wait_max: max wait time (in seconds) of the exponential backoff
+        :param max_retry_after: max wait time (in seconds) accepted from a Retry-After header
+        :param retry_statuses: http statuses to retry
+        :param budget: retry budget (defaults to a new budget for this policy)
+        :param failure_threshold: number of consecutive failures that opens the circuit breaker of an endpoint
+        :param reset_timeout: time (in seconds) an open circuit breaker rejects calls, before trying again
+        :param trial_timeout: time (in seconds) after which a trial call of a half-open circuit breaker,
+            that has not completed, counts as failed
+        :param verbose: whether to write logs or not
+        """
+        self.max_attempts = max_attempts
+        self.max_total_time = max_total_time
+        self.wait_multiplier = wait_multiplier
+        self.wait_max = wait_max
+        self.max_retry_after = max_retry_after
+        self.retry_statuses = retry_statuses
+        self.budget = budget if budget is not None else RetryBudget()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.trial_timeout = trial_timeout
+        self.verbose = verbose
+        self.breakers = {}
+        self._lock = threading.Lock()
+
+    def get_breaker(self, func: str):
+        with self._lock:
+            if func not in self.breakers:
+                self.breakers[func] = CircuitBreaker(
+                    failure_threshold=self.failure_threshold,
+                    reset_timeout=self.reset_timeout,
+                    trial_timeout=self.trial_timeout,
+                )
+            return self.breakers[func]
+
+    def check_circuits(self, funcs: list):
+        """
+        Raise CircuitOpenError if the circuit breaker of any of the funcs is open
+        :param funcs: endpoints of the tasks in a payload
+        :return:
+        """
+        allowed, func, retry_in = self.allow_all(funcs=funcs)
+        if not allowed:
+            raise CircuitOpenError(func=func, retry_in=retry_in)
+
+    def allow_all(self, funcs: list):
+        """
+        Whether a call to all the funcs is allowed by their circuit breakers
+        (if not, trial calls granted to the other funcs are given up)
+        :param funcs: endpoints of the tasks in a payload
+        :return: (allowed, first func whose circuit breaker is open, seconds until calls to it are allowed again)
+        """
+        allowed_funcs = []
+        for func in set(funcs):
+            allowed, retry_in = self.get_breaker(func).allow()
+            if not allowed:
+                for allowed_func in allowed_funcs:
+                    self.get_breaker(allowed_func).record_abandoned()
+                return False, func, retry_in
+            allowed_funcs.append(func)
+        return True, None, 0
+
+    def record_outcome(self, funcs: list, failed: bool = None):
+        """
+        Record the outcome of an attempt with the circuit breakers of its endpoints
+        :param funcs: endpoints of the tasks in the payload
+        :param failed: whether the attempt failed with a retryable error;
+            None if it ended without an outcome (cancelled, or failed with a non-retryable error)
+        :return:
+        """
+        for func in set(funcs):
+            if failed is None:
+                self.get_breaker(func).record_abandoned()
+            elif failed:
+                self.get_breaker(func).record_failure()
+            else:
+                self.get_breaker(func).record_success()
+
+    def is_retryable_status(self, status_code: int):
+        return status_code in self.retry_statuses
+
+    def get_deadline(self):
+        return time.monotonic() + self.max_total_time
+
+    def get_attempt_timeout(self, timeout: float, deadline: float):
+        """
+        Timeout for one attempt, capped by the time left before the deadline of the api call
+        """
+        return max(1.0, min(timeout, deadline - time.monotonic()))
+
+    def _should_retry(self, retry_state, retry_exceptions: tuple, funcs: list):
+        if retry_state.outcome is None or not retry_state.outcome.failed:
+            return False
+        exception = retry_state.outcome.exception()
+        if not isinstance(exception, (RetryableStatusError,) + tuple(retry_exceptions)):
+            return False
+        allowed, func, retry_in = self.allow_all(funcs=funcs)
+        if not allowed:
+            return False
+        if not self.budget.withdraw():
+            if self.verbose:
+                logger.warning(f"Retry budget exhausted; not retrying {funcs}: {exception}")
+            return False
+        if self.verbose:
+            logger.warning(f"Retrying {funcs} (attempt {retry_state.attempt_number}): {exception}")
+        return True
+
+    def _get_wait(self, retry_state):
+        import tenacity
+        backoff = tenacity.wait_random_exponential(multiplier=self.wait_multiplier, max=self.wait_max)(retry_state)
+        exception = retry_state.outcome.exception()
+        retry_after = getattr(exception, 'retry_after', None)
+        if retry_after is not None:
+            return max(backoff, min(retry_after, self.max_retry_after))
+        return backoff
+
+    def create_retrying(self, funcs: list, retry_exceptions: tuple, is_async: bool = False):
+        """
+        Create a tenacity retrying controller for one api call
+        :param funcs: endpoints of the tasks in the payload
+        :param retry_exceptions: exception types of the http transport to retry on (connection errors, timeouts)
+        :param is_async: whether to create an AsyncRetrying controller
+        :return:
+        """
+        import tenacity
+        self.budget.deposit()
+        retrying_class = tenacity.AsyncRetrying if is_async else tenacity.Retrying
+        retrying = retrying_class(
+            retry=lambda retry_state: self._should_retry(retry_state, retry_exceptions, funcs),
+            wait=self._get_wait,
+            stop=tenacity.stop_after_attempt(self.max_attempts) | tenacity.stop_after_delay(self.max_total_time),
+            reraise=True,
+        )
+        return retrying
+
+    def get_stats(self):
+        stats = {
+            'n_retries': self.budget.n_retries,
+            'n_budget_exhausted': self.budget.n_exhausted,
+            'circuits': {
+                func: breaker.state
+                for func, breaker in self.breakers.items()
+            },
+        }
+        return stats
@@ -0,0 +1,118 @@
+"""
+Coalescing of duplicate concurrent byte-genie API calls
+"""
+
+import copy
+import asyncio
+import threading
+
+
+class _LeaderCancelled(Exception):
+    """Set on the future of an async flight whose leader was cancelled, so that its followers retry the call"""
+
+
+class _Flight:
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.n_waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight calls: while a call with a given key is running,
+    further calls with the same key wait for it, instead of making the same request again, and share its result.
+    Followers get a deep copy of the result, so that callers modifying their result do not affect each other.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._async_flights = {}
+        self._lock = threading.Lock()
+        self.n_calls = 0
+        self.n_coalesced = 0
+
+    def do(self, key: str, fn):
+        """
+        Run fn(), unless a call with the same key is already running, in which case wait for its result
+        :param key: key identifying identical calls
+        :param fn: function making the call
+        :return:
+        """
+        with self._lock:
+            self.n_calls += 1
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.n_coalesced += 1
+                flight.n_waiters += 1
+                leader = False
+            else:
+                flight = _Flight()
+                self._flights[key] = flight
+                leader = True
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result)
+        try:
+            flight.result = fn()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    async def async_do(self, key: str, coro_fn):
+        """
+        Await coro_fn(), unless a call with the same key is already running, in which case await its result
+        (if the running call is cancelled, its followers are not: they retry the call instead)
+        :param key: key identifying identical calls
+        :param coro_fn: function returning a coroutine that makes the call
+        :return:
+        """
+        ## futures are bound to their event loop, so only coalesce calls within the same loop
+        key = (key, id(asyncio.get_running_loop()))
+        ## counters are shared with do(), which may run on other threads
+        with self._lock:
+            self.n_calls += 1
+            future = self._async_flights.get(key)
+            if future is not None:
+                self.n_coalesced += 1
+        while future is not None:
+            try:
+                result = await asyncio.shield(future)
+                return copy.deepcopy(result)
+            except _LeaderCancelled:
+                ## the leader was cancelled by its own caller: retry the call, following a new leader, if any
+                future = self._async_flights.get(key)
+        future = asyncio.get_running_loop().create_future()
+        self._async_flights[key] = future
+        try:
+            result = await coro_fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            ## mark the exception as retrieved, in case no follower awaits it
+            future.exception()
+            raise
+        finally:
+            if self._async_flights.get(key) is future:
+                self._async_flights.pop(key)
+
+    def get_stats(self):
+        stats = {
+            'n_calls': self.n_calls,
+            'n_coalesced': self.n_coalesced,
+        }
+        return stats
@@ -0,0 +1,456 @@
+"""
+Streaming uploads of local files to byte-genie API
+"""
+
+import os
+import json
+import time
+import uuid
+import base64
+import hashlib
+import threading
+
+import utils.common
+
+## prefix of file contents in upload_data payloads
+CONTENT_PREFIX = 'data:;base64,'
+## size of raw chunks read from files; a multiple of 3, so that chunks encode to base64 without padding
+CHUNK_SIZE = 3 * 256 * 1024
+
+
+class FileContent:
+    """
+    Reference to the content of a local file, to pass as file content in upload_data payloads.
+    The file is read, and base64-encoded, in chunks, only while the payload is being sent
+    (see StreamedBody), so memory use does not grow with file size.
+    """
+
+    __slots__ = ('file_path', 'offset', 'length')
+
+    def __init__(self, file_path: str, offset: int = 0, length: int = None):
+        """
+        :param file_path: local file path
+        :param offset: byte offset in the file to start reading from
+        :param length: number of bytes to read (None to read up to the end of the file)
+        """
+        self.file_path = file_path
+        self.offset = offset
+        self.length = length
+
+    def get_size(self):
+        """
+        Size, in bytes, of the raw content
+        :return:
+        """
+        size = os.path.getsize(self.file_path) - self.offset
+        if self.length is not None:
+            size = min(size, self.length)
+        return max(0, size)
+
+    def get_encoded_size(self):
+        """
+        Size, in bytes, of the base64-encoded content, including its prefix
+        :return:
+        """
+        return len(CONTENT_PREFIX) + 4 * ((self.get_size() + 2) // 3)
+
+    def iter_raw_chunks(self, chunk_size: int = CHUNK_SIZE):
+        """
+        Read the content in chunks
+        :param chunk_size: size of chunks, in bytes
+        :return: generator of byte chunks
+        """
+        n_left = self.get_size()
+        with open(self.file_path, mode='rb') as f:
+            f.seek(self.offset)
+            while n_left > 0:
+                chunk = f.read(min(chunk_size, n_left))
+                if not chunk:
+                    break
+                n_left -= len(chunk)
+                yield chunk
+
+    def iter_encoded_chunks(self, chunk_size: int = CHUNK_SIZE):
+        """
+        Read and base64-encode the content in chunks, starting with the content prefix
+        :param chunk_size: size of raw chunks, in bytes (rounded down to a multiple of 3)
+        :return: generator of encoded byte chunks
+        """
+        chunk_size = max(3, chunk_size - chunk_size % 3)
+        yield CONTENT_PREFIX.encode('utf-8')
+        for chunk in self.iter_raw_chunks(chunk_size=chunk_size):
+            yield base64.b64encode(chunk)
+
+    def read_encoded(self):
+        """
+        Read the whole base64-encoded content, with its prefix, as a string
+        :return:
+        """
+        return b''.join(self.iter_encoded_chunks()).decode('utf-8')
+
+    def __repr__(self):
+        return f"FileContent({self.file_path!r}, offset={self.offset}, length={self.length})"
+
+
+def has_file_contents(payload: dict):
+    """
+    Whether a payload holds any FileContent, and so needs to be sent as a streamed body
+    :param payload: api payload
+    :return:
+    """
+    for task in payload.get('tasks', {}).values():
+        args = task.get('args', {}) if isinstance(task, dict) else {}
+        for val in args.values():
+            if isinstance(val, FileContent):
+                return True
+            if isinstance(val, (list, tuple)) and any([isinstance(val_, FileContent) for val_ in val]):
+                return True
+    return False
+
+
+def _replace_file_contents(obj, placeholders: dict):
+    """
+    Replace FileContent objects in obj with unique placeholder strings, recorded in placeholders
+    """
+    if isinstance(obj, FileContent):
+        placeholder = f"__file_content_{uuid.uuid4().hex}__"
+        placeholders[placeholder] = obj
+        return placeholder
+    if isinstance(obj, dict):
+        return {key: _replace_file_contents(val, placeholders) for key, val in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_replace_file_contents(val, placeholders) for val in obj]
+    return obj
+
+
+class StreamedBody:
+    """
+    Json body of a payload holding FileContent objects, which reads and encodes file contents only as it is sent.
+    Base64 and its prefix need no escaping in json, so encoded chunks are written into json strings as they are.
+    The body has a known length, so it is sent with a Content-Length header, rather than chunked,
+    and can be iterated over more than once (e.g. to send it again on retries).
+    """
+
+    def __init__(self, payload: dict, chunk_size: int = CHUNK_SIZE):
+        """
+        :param payload: api payload
+        :param chunk_size: size of raw chunks read from files, in bytes
+        """
+        self.chunk_size = chunk_size
+        placeholders = {}
+        payload_json = json.dumps(_replace_file_contents(payload, placeholders))
+        ## split the json around file contents, into [json part, file content, json part, ..., json part]
+        self.parts = []
+        for placeholder, content in placeholders.items():
+            head, payload_json = payload_json.split(f'"{placeholder}"', 1)
+            self.parts.append((head + '"').encode('utf-8'))
+            self.parts.append(content)
+            payload_json = '"' + payload_json
+        self.parts.append(payload_json.encode('utf-8'))
+
+    def __len__(self):
+        return sum([
+            part.get_encoded_size() if isinstance(part, FileContent) else len(part)
+            for part in self.parts
+        ])
+
+    def __iter__(self):
+        for part in self.parts:
+            if isinstance(part, FileContent):
+                for chunk in part.iter_encoded_chunks(chunk_size=self.chunk_size):
+                    yield chunk
+            else:
+                yield part
+
+    async def __aiter__(self):
+        for chunk in self:
+            yield chunk
+
+
+def list_upload_files(directory: str, recursive: int = 0):
+    """
+    List files to upload in a directory
+    :param directory: local directory
+    :param recursive: whether to include files in sub-directories
+    :return: list of file paths
+    """
+    if recursive:
+        file_paths = [
+            os.path.join(root, file_name)
+            for root, dirs, file_names in os.walk(directory)
+            for file_name in file_names
+        ]
+    else:
+        file_paths = [
+            os.path.join(directory, file_name)
+            for file_name in os.listdir(directory)
+        ]
+    file_paths = sorted([file_path for file_path in file_paths if os.path.isfile(file_path)])
+    return file_paths
+
+
+def create_upload_batches(file_paths: list, max_batch_size: int = 64 * 1024 ** 2, max_batch_files: int = 50):
+    """
+    Split files into batches to upload in one api call each, capped by total encoded size and number of files.
+    Files larger than max_batch_size are uploaded in a batch of their own.
+    :param file_paths: local file paths
+    :param max_batch_size: max total size of base64-encoded file contents per batch, in bytes
+    :param max_batch_files: max number of files per batch
+    :return: list of batches, each a list of file paths
+    """
+    batches = []
+    batch = []
+    batch_size = 0
+    for file_path in file_paths:
+        file_size = FileContent(file_path).get_encoded_size()
+        if batch and ((batch_size + file_size > max_batch_size) or (len(batch) >= max_batch_files)):
+            batches.append(batch)
+            batch = []
+            batch_size = 0
+        batch.append(file_path)
+        batch_size += file_size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class UploadManifest:
+    """
+    Local record of files already uploaded, to resume interrupted uploads (see ByteGenie.upload_files()).
+    Files are identified by their path, size and modification time, and the name and user they were uploaded under,
+    so a file is uploaded again if it changes. The manifest is written after every completed batch,
+    so that an upload that crashes midway resumes from its last completed batch.
+    """
+
+    def __init__(
+            self,
+            manifest_file: str = os.path.join(os.path.expanduser('~'), '.cache', 'byte-genie', 'upload-manifest.json'),
+    ):
+        """
+        :param manifest_file: json file to record uploaded files in
+        """
+        self.manifest_file = manifest_file
+        self._lock = threading.Lock()
+        try:
+            with open(manifest_file, mode='r') as f:
+                self.entries = json.loads(f.read())
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def get_key(file_path: str, filename: str, username: str):
+        """
+        Key of a file in the manifest
+        :param file_path: local file path
+        :param filename: file name the file is uploaded under
+        :param username: user the file is uploaded for
+        :return:
+        """
+        stat = os.stat(file_path)
+        return json.dumps([os.path.abspath(file_path), stat.st_size, stat.st_mtime, filename, username])
+
+    def is_uploaded(self, file_path: str, filename: str, username: str):
+        return self.get_key(file_path, filename, username) in self.entries
+
+    def mark_uploaded(self, file_paths: list, filenames: list, username: str):
+        """
+        Record files as uploaded, and write the manifest
+        :param file_paths: local file paths
+        :param filenames: file names the files were uploaded under
+        :param username: user the files were uploaded for
+        :return:
+        """
+        with self._lock:
+            for file_path, filename in zip(file_paths, filenames):
+                self.entries[self.get_key(file_path, filename, username)] = {
+                    'file_path': file_path,
+                    'filename': filename,
+                    'uploaded_at': time.time(),
+                }
+            if os.path.dirname(self.manifest_file):
+                os.makedirs(os.path.dirname(self.manifest_file), exist_ok=True)
+            ## write to a temp file, and move it in place, so that a crash never leaves a partial manifest
+            tmp_file = f"{self.manifest_file}.{os.getpid()}.tmp"
+            with open(tmp_file, mode='w') as f:
+                f.write(json.dumps(self.entries))
+            os.replace(tmp_file, self.manifest_file)
+
+    def get_pending(self, file_paths: list, filenames: list, username: str):
+        """
+        Get files not yet uploaded
+        :param file_paths: local file paths
+        :param filenames: file names for the files
+        :param username: user the files are uploaded for
+        :return: (file paths, file names) of files not in the manifest
+        """
+        pending = [
+            (file_path, filename) for file_path, filename in zip(file_paths, filenames)
+            if not self.is_uploaded(file_path, filename, username)
+        ]
+        return [file_path for file_path, filename in pending], [filename for file_path, filename in pending]
+
+    def clear(self):
+        with self._lock:
+            self.entries = {}
+            try:
+                os.remove(self.manifest_file)
+            except FileNotFoundError:
+                pass
+
+
+def is_upload_successful(resp):
+    """
+    Whether an upload_data response shows the upload was accepted
+    :param resp: `ByteGenieResponse`
+    :return:
+    """
+    return resp.get_status() in ['successful', 'scheduled']
+
+
+def hash_file(file_path: str, chunk_size: int = 1024 ** 2):
+    """
+    Content hash (sha256) of a local file, read in chunks
+    :param file_path: local file path
+    :param chunk_size: size of chunks to read, in bytes
+    :return:
+    """
+    file_hash = hashlib.sha256()
+    with open(file_path, mode='rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def get_upload_doc_name(filename: str, username: str):
+    """
+    Name of the document a file is stored as once uploaded, e.g. userid_demo-genie_uploadfilename_demo-portfoliocsv
+    :param filename: file name the file is uploaded under
+    :param username: user the file is uploaded for
+    :return:
+    """
+    return f"userid_{username}_uploadfilename_{utils.common.slugify(filename)}"
+
+
+class UploadIndex:
+    """
+    Locally persisted index of uploaded file contents, to skip uploading files whose content was uploaded before
+    (e.g. the same document, uploaded under another name, or for another project).
+    Maps content hashes of uploaded files to the documents they were stored as,
+    and keeps a cached listing of each user's uploaded documents (from show_uploads),
+    so that a file is only skipped if its document still exists.
+    Content hashes are cached by file path, size and modification time, so unchanged files are not hashed again.
+    """
+
+    def __init__(
+            self,
+            index_file: str = os.path.join(os.path.expanduser('~'), '.cache', 'byte-genie', 'upload-index.json'),
+            ttl: float = 10 * 60,
+    ):
+        """
+        :param index_file: json file to persist the index in
+        :param ttl: time (in seconds) after which cached listings of uploaded documents are refreshed
+        """
+        self.index_file = index_file
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        try:
+            with open(index_file, mode='r') as f:
+                index = json.loads(f.read())
+        except (FileNotFoundError, ValueError):
+            index = {}
+        ## {content hash: {username: doc_name}}
+        self.docs = index.get('docs', {})
+        ## {file key: content hash}
+        self.file_hashes = index.get('file_hashes', {})
+        ## {username: {'doc_names': [...], 'fetched_at': time}}
+        self.listings = index.get('listings', {})
+
+    def save(self):
+        with self._lock:
+            index = {
+                'docs': self.docs,
+                'file_hashes': self.file_hashes,
+                'listings': self.listings,
+            }
+            if os.path.dirname(self.index_file):
+                os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+            tmp_file = f"{self.index_file}.{os.getpid()}.tmp"
+            with open(tmp_file, mode='w') as f:
+                f.write(json.dumps(index))
+            os.replace(tmp_file, self.index_file)
+
+    def get_file_hash(self, file_path: str):
+        """
+        Content hash of a local file, hashing it only if it is new or has changed
+        :param file_path: local file path
+        :return:
+        """
+        stat = os.stat(file_path)
+        key = json.dumps([os.path.abspath(file_path), stat.st_size, stat.st_mtime])
+        file_hash = self.file_hashes.get(key)
+        if file_hash is None:
+            file_hash = hash_file(file_path)
+            with self._lock:
+                self.file_hashes[key] = file_hash
+        return file_hash
+
+    def get_doc_names(self, username: str):
+        """
+        Cached listing of documents uploaded by a user
+        :param username: user name
+        :return: set of doc names, or None if the listing is missing or has expired
+        """
+        listing = self.listings.get(username)
+        if (listing is None) or (listing['fetched_at'] + self.ttl < time.time()):
+            return None
+        return set(listing['doc_names'])
+
+    def set_doc_names(self, username: str, doc_names: list):
+        with self._lock:
+            self.listings[username] = {
+                'doc_names': list(doc_names),
+                'fetched_at': time.time(),
+            }
+
+    def find_doc_name(self, file_hash: str, username: str):
+        """
+        Document a file content was uploaded as
+        :param file_hash: content hash of the file
+        :param username: user name
+        :return: doc name, or None if the content was not uploaded for the user
+        """
+        return self.docs.get(file_hash, {}).get(username)
+
+    def add(self, file_hash: str, doc_name: str, username: str):
+        with self._lock:
+            self.docs.setdefault(file_hash, {})[username] = doc_name
+            listing = self.listings.get(username)
+            if (listing is not None) and (doc_name not in listing['doc_names']):
+                listing['doc_names'].append(doc_name)
+
+    def get_duplicates(self, file_paths: list, filenames: list, username: str):
+        """
+        Split files into new files, and files whose content is already uploaded (or repeated among file_paths)
+        :param file_paths: local file paths
+        :param filenames: file names for the files
+        :param username: user name
+        :return: (file paths of new files, file names of new files, {file path: doc name} of duplicate files);
+            doc names of files repeating a new file's content are those the new file will be uploaded as
+        """
+        doc_names = self.get_doc_names(username) or set()
+        new_file_paths = []
+        new_filenames = []
+        duplicates = {}
+        new_doc_names = {}
+        for file_path, filename in zip(file_paths, filenames):
+            file_hash = self.get_file_hash(file_path)
+            doc_name = self.find_doc_name(file_hash, username)
+            if (doc_name is not None) and (doc_name in doc_names):
+                duplicates[file_path] = doc_name
+            elif file_hash in new_doc_names:
+                duplicates[file_path] = new_doc_names[file_hash]
+            else:
+                new_doc_names[file_hash] = get_upload_doc_name(filename=filename, username=username)
+                new_file_paths.append(file_path)
+                new_filenames.append(filename)
+        return new_file_paths, new_filenames, duplicates
@@ -2,7 +2,6 @@
 
 import time
 import pandas as pd
-import utils.async_utils
 from utils.logging import logger
 from utils.byte_genie import ByteGenie
 
@@ -75,15 +74,18 @@ keyphrases = [
 selected_urls = df_homepage['url'].unique().tolist()[:1]
 
 # ### trigger search from selected URLs
-tasks = [
-    bg_sync.async_search_web(
-        keyphrases=keyphrases,
-        site=selected_url,
-    )
-    for selected_url in selected_urls
-]
-search_web_responses = utils.async_utils.run_async_tasks(tasks)
-df_search = [pd.DataFrame(resp.get_output()) for resp in search_web_responses]
+search_web_results = bg_sync.map(
+    'search_web',
+    [
+        dict(
+            keyphrases=keyphrases,
+            site=selected_url,
+        )
+        for selected_url in selected_urls
+    ],
+)
+logger.info(f"{len(search_web_results.get_failure_report())} failed searches")
+df_search = [pd.DataFrame(df) for df in search_web_results.get_output() if df is not None]
 df_search = pd.concat(df_search)
 
 # ### check search data